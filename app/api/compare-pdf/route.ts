@@ -2,6 +2,7 @@ import { writeFile, mkdir } from "fs/promises"
 import { existsSync } from "fs"
 import path from "path"
 import { type NextRequest, NextResponse } from "next/server"
+import { ComparisonServiceError, submitJob } from "@/lib/comparison-service"
 
 export async function POST(request: NextRequest) {
   try {
@@ -19,13 +20,12 @@ export async function POST(request: NextRequest) {
       await mkdir(tempDir, { recursive: true })
     }
 
-    const resultId = "pdf-" + Date.now()
-    const tempResultDir = path.join(tempDir, resultId)
-    await mkdir(tempResultDir, { recursive: true })
+    const uploadDir = path.join(tempDir, "upload-" + Date.now())
+    await mkdir(uploadDir, { recursive: true })
 
     // Save files
-    const filePath1 = path.join(tempResultDir, file1.name)
-    const filePath2 = path.join(tempResultDir, file2.name)
+    const filePath1 = path.join(uploadDir, "doc1-" + path.basename(file1.name))
+    const filePath2 = path.join(uploadDir, "doc2-" + path.basename(file2.name))
 
     const buffer1 = await file1.arrayBuffer()
     const buffer2 = await file2.arrayBuffer()
@@ -33,38 +33,15 @@ export async function POST(request: NextRequest) {
     await writeFile(filePath1, Buffer.from(buffer1))
     await writeFile(filePath2, Buffer.from(buffer2))
 
-    // Return results with PDF-specific metrics
-    const results = {
-      id: resultId,
-      similarity: 78.5,
-      doc1_pages: 12,
-      doc2_pages: 14,
-      common_percentage: 78.5,
-      unique1_percentage: 12.3,
-      unique2_percentage: 9.2,
-      common_text: "This is common content between documents...",
-      differences: [
-        {
-          type: "added",
-          text: "New section added in document 2",
-          page: 5,
-        },
-        {
-          type: "modified",
-          text: "Updated paragraph in document 2",
-          page: 8,
-        },
-        {
-          type: "removed",
-          text: "Removed section from document 1",
-          page: 3,
-        },
-      ],
-    }
-
-    return NextResponse.json(results)
+    // Queue the comparison; the results page polls /api/results/<id>, and the
+    // service deletes the uploads once the job ends
+    const job = await submitJob({ type: "pdf", document1: filePath1, document2: filePath2, remove_inputs: true })
+    return NextResponse.json(job, { status: 202 })
   } catch (error) {
     console.error("Error in compare-pdf:", error)
+    if (error instanceof ComparisonServiceError) {
+      return NextResponse.json({ error: error.message }, { status: error.status })
+    }
     return NextResponse.json({ error: "PDF comparison failed" }, { status: 500 })
   }
 }
@@ -2,28 +2,34 @@
 
 import { useSearchParams } from "next/navigation"
 import { useState, useEffect } from "react"
+import { fetchResults, type PendingStatus } from "@/lib/fetch-results"
 
 export default function PDFResultsPage() {
   const searchParams = useSearchParams()
   const id = searchParams.get("id")
   const [results, setResults] = useState<any>(null)
   const [loading, setLoading] = useState(true)
+  const [pending, setPending] = useState<PendingStatus | null>(null)
 
   useEffect(() => {
-    const fetchResults = async () => {
+    let cancelled = false
+
+    const loadResults = async () => {
       try {
-        const response = await fetch(`/api/results/${id}`)
-        if (!response.ok) throw new Error("Failed to fetch results")
-        const data = await response.json()
-        setResults(data)
+        // Keeps asking while the job is queued or running
+        const data = await fetchResults(id as string, setPending, () => cancelled)
+        if (!cancelled) setResults(data)
       } catch (error) {
         console.error("Error fetching results:", error)
       } finally {
-        setLoading(false)
+        if (!cancelled) setLoading(false)
       }
     }
 
-    if (id) fetchResults()
+    if (id) loadResults()
+    return () => {
+      cancelled = true
+    }
   }, [id])
 
   if (loading) {
@@ -31,7 +37,13 @@ export default function PDFResultsPage() {
       <div style={{ minHeight: "100vh", display: "flex", alignItems: "center", justifyContent: "center", background: "linear-gradient(180deg,#0f1724,#111827)", color: "#e6eef8" }}>
         <div style={{ textAlign: "center" }}>
           <div style={{ fontSize: 36, marginBottom: 12 }}>⚙</div>
-          <p>Loading results...</p>
+          <p>
+            {pending?.status === "queued"
+              ? `Waiting in queue${pending.queue_length ? ` (${pending.queue_length} jobs queued)` : ""}...`
+              : pending?.status === "running"
+                ? "Comparing documents..."
+                : "Loading results..."}
+          </p>
         </div>
       </div>
     )
@@ -5,6 +5,7 @@ import { useState, useEffect } from "react"
 import { useRouter } from "next/navigation"
 import { Card } from "@/components/ui/card"
 import { Button } from "@/components/ui/button"
+import { fetchResults, type PendingStatus } from "@/lib/fetch-results"
 import { Download, FileJson, FileText, ArrowLeft, CheckCircle2, AlertCircle, Plus, Trash2 } from "lucide-react"
 
 export default function SoftwareResultsPage() {
@@ -14,11 +15,14 @@ export default function SoftwareResultsPage() {
   const [results, setResults] = useState<any>(null)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
+  const [pending, setPending] = useState<PendingStatus | null>(null)
 
 
 
   useEffect(() => {
-    const fetchResults = async () => {
+    let cancelled = false
+
+    const loadResults = async () => {
       try {
         if (!id) {
           setError("No comparison ID provided")
@@ -26,25 +30,24 @@ export default function SoftwareResultsPage() {
           return
         }
 
-        const response = await fetch(`/api/results/${id}`)
-
-        if (!response.ok) {
-          throw new Error(`Failed to fetch results: ${response.status}`)
-        }
-
-        const data = await response.json()
+        // Keeps asking while the job is queued or running
+        const data = await fetchResults(id, setPending, () => cancelled)
+        if (cancelled) return
         setResults(data)
         setError(null)
       } catch (error) {
         console.error("Error fetching results:", error)
-        setError(error instanceof Error ? error.message : "Failed to load results")
+        if (!cancelled) setError(error instanceof Error ? error.message : "Failed to load results")
       } finally {
-        setLoading(false)
+        if (!cancelled) setLoading(false)
       }
     }
 
     if (id) {
-      fetchResults()
+      loadResults()
+    }
+    return () => {
+      cancelled = true
     }
   }, [id])
 
@@ -108,7 +111,13 @@ export default function SoftwareResultsPage() {
       <div style={{ minHeight: "100vh", display: "flex", alignItems: "center", justifyContent: "center", background: "linear-gradient(180deg,#0f1724,#111827)", color: "#e6eef8" }}>
         <div style={{ textAlign: "center" }}>
           <div style={{ width: 48, height: 48, borderRadius: 24, border: "4px solid rgba(148,163,184,0.1)", borderTopColor: "#06b6d4", margin: "0 auto 12px" }} />
-          <p style={{ fontSize: 16 }}>Loading analysis results...</p>
+          <p style={{ fontSize: 16 }}>
+            {pending?.status === "queued"
+              ? `Waiting in queue${pending.queue_length ? ` (${pending.queue_length} jobs queued)` : ""}...`
+              : pending?.status === "running"
+                ? "Comparing versions..."
+                : "Loading analysis results..."}
+          </p>
         </div>
       </div>
     )
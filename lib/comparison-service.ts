@@ -0,0 +1,85 @@
+import http from "http"
+
+// Client for scripts/comparison_service.py. Set COMPARISON_SERVICE_SOCKET to talk
+// over a Unix socket, or COMPARISON_SERVICE_URL for TCP (default http://127.0.0.1:8765).
+const SOCKET_PATH = process.env.COMPARISON_SERVICE_SOCKET
+const SERVICE_URL = new URL(process.env.COMPARISON_SERVICE_URL || "http://127.0.0.1:8765")
+const POLL_INTERVAL_MS = 500
+
+export type JobStatus = "queued" | "running" | "done" | "failed"
+
+export interface Job {
+  id: string
+  type: string
+  status: JobStatus
+  created_at: string
+  started_at?: string
+  finished_at?: string
+  queue_length?: number
+  result?: Record<string, any>
+  error?: string
+}
+
+export class ComparisonServiceError extends Error {
+  constructor(message: string, public status: number) {
+    super(message)
+  }
+}
+
+function request(method: string, path: string, body?: unknown): Promise<{ status: number; data: any }> {
+  const payload = body === undefined ? undefined : JSON.stringify(body)
+  const target = SOCKET_PATH
+    ? { socketPath: SOCKET_PATH }
+    : { hostname: SERVICE_URL.hostname, port: SERVICE_URL.port || 80 }
+
+  return new Promise((resolve, reject) => {
+    const req = http.request(
+      {
+        ...target,
+        method,
+        path,
+        headers: payload
+          ? { "Content-Type": "application/json", "Content-Length": Buffer.byteLength(payload) }
+          : {},
+      },
+      (res) => {
+        const chunks: Buffer[] = []
+        res.on("data", (chunk) => chunks.push(chunk))
+        res.on("end", () => {
+          try {
+            resolve({ status: res.statusCode || 500, data: JSON.parse(Buffer.concat(chunks).toString("utf-8")) })
+          } catch (error) {
+            reject(error)
+          }
+        })
+      },
+    )
+    req.on("error", reject)
+    if (payload) req.write(payload)
+    req.end()
+  })
+}
+
+export async function submitJob(job: Record<string, unknown>): Promise<Job> {
+  const { status, data } = await request("POST", "/jobs", job)
+  if (status >= 400) throw new ComparisonServiceError(data.error || "Job rejected", status)
+  return data
+}
+
+export async function getJob(id: string): Promise<Job | null> {
+  const { status, data } = await request("GET", `/jobs/${encodeURIComponent(id)}`)
+  if (status === 404) return null
+  if (status >= 400) throw new ComparisonServiceError(data.error || "Job lookup failed", status)
+  return data
+}
+
+// Poll until the job finishes or the timeout passes; returns the last status seen
+export async function waitForJob(id: string, timeoutMs: number): Promise<Job | null> {
+  const deadline = Date.now() + timeoutMs
+  let job = await getJob(id)
+  while (job && (job.status === "queued" || job.status === "running") && Date.now() < deadline) {
+    await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS))
+    job = await getJob(id)
+  }
+  return job
+}
@@ -0,0 +1,30 @@
+// Browser-side polling of /api/results/<id>. The route answers 202 with the job
+// status while the comparison is still queued or running.
+const RETRY_DELAY_MS = 1000
+
+export interface PendingStatus {
+  status: string
+  queue_length?: number
+}
+
+export async function fetchResults(
+  id: string,
+  onPending?: (pending: PendingStatus) => void,
+  isCancelled: () => boolean = () => false,
+): Promise<any | null> {
+  while (!isCancelled()) {
+    const response = await fetch(`/api/results/${id}`)
+    const data = await response.json().catch(() => ({}))
+
+    if (response.status === 202) {
+      onPending?.(data)
+      await new Promise((resolve) => setTimeout(resolve, RETRY_DELAY_MS))
+      continue
+    }
+    if (!response.ok) {
+      throw new Error(data.error || `Failed to fetch results: ${response.status}`)
+    }
+    return data
+  }
+  return null
+}
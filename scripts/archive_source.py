@@ -0,0 +1,391 @@
+"""
+Archive-backed version source.
+Reads a version straight from a zip or tar(.gz/.bz2/.xz) archive, so an upload
+can be compared without extracting it to disk. Listing streams through the
+archive once, hashing each matching member as it goes by; members are read
+back one at a time, and only when they actually need to be diffed.
+"""
+
+import atexit
+import bisect
+import hashlib
+import io
+import os
+import tarfile
+import threading
+import zipfile
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from file_scanner import DEFAULT_EXTENSIONS, DEFAULT_IGNORE_PATTERNS, IgnoreRules, in_ignored_dir, matches_extension
+
+# Limits on what one archive may expand to; exceeding them is an error
+MAX_TOTAL_SIZE = 4 * 1024 * 1024 * 1024
+MAX_MEMBERS = 200_000
+HASH_CHUNK_SIZE = 1024 * 1024
+
+GZIP_MAGIC = b"\x1f\x8b"
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+READ_CHUNK_SIZE = 256 * 1024
+# Uncompressed bytes between two saved gzip decompressor states (~40 KB each),
+# i.e. the most a backward read has to decompress again
+CHECKPOINT_INTERVAL = 1024 * 1024
+
+def is_archive(path):
+    """True for a zip or tar file (compressed or not)."""
+    path = Path(path)
+    if not path.is_file():
+        return False
+    try:
+        return zipfile.is_zipfile(path) or tarfile.is_tarfile(path)
+    except OSError:
+        return False
+
+class GzipIndex:
+    """
+    Random read access to a gzip stream.
+    A gzip file can only be decompressed front to back, so reading the members
+    of a .tar.gz out of order would restart decompression for every backward
+    step. Instead, the decompressor state is copied every CHECKPOINT_INTERVAL
+    uncompressed bytes as the stream is read, and a backward read resumes from
+    the nearest checkpoint.
+    """
+    
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        # (uncompressed offset, compressed offset, decompressor)
+        self.checkpoints = [(0, 0, zlib.decompressobj(GZIP_WBITS))]
+        self.checkpoint_offsets = [0]
+        self._restore(self.checkpoints[0])
+    
+    def _restore(self, checkpoint):
+        position, compressed_offset, decompressor = checkpoint
+        self.file.seek(compressed_offset)
+        self.decompressor = decompressor.copy()
+        self.pending = b""
+        # Decompressed bytes kept from the last step, starting at buffer_start
+        self.buffer = b""
+        self.buffer_start = position
+    
+    def _advance(self):
+        """Decompress the next block into the buffer; False at the end of the stream."""
+        while True:
+            if not self.pending:
+                self.pending = self.file.read(READ_CHUNK_SIZE)
+                if not self.pending:
+                    return False
+            if self.decompressor.eof:
+                # Concatenated gzip members; trailing zero padding ends the stream
+                if not self.pending.strip(b"\0"):
+                    self.pending = b""
+                    continue
+                self.decompressor = zlib.decompressobj(GZIP_WBITS)
+            data = self.decompressor.decompress(self.pending, READ_CHUNK_SIZE)
+            self.pending = self.decompressor.unconsumed_tail or self.decompressor.unused_data
+            if data:
+                break
+        
+        self.buffer_start += len(self.buffer)
+        self.buffer = data
+        end = self.buffer_start + len(data)
+        if end >= self.checkpoints[-1][0] + CHECKPOINT_INTERVAL:
+            # Unconsumed input is re-read from the file rather than kept
+            compressed_offset = self.file.tell() - len(self.pending)
+            self.checkpoints.append((end, compressed_offset, self.decompressor.copy()))
+            self.checkpoint_offsets.append(end)
+        return True
+    
+    def read(self, offset, size):
+        """Up to `size` uncompressed bytes starting at `offset`."""
+        index = bisect.bisect_right(self.checkpoint_offsets, offset) - 1
+        # Go back for earlier data, or jump ahead past a stretch already indexed
+        if offset < self.buffer_start or self.checkpoint_offsets[index] > self.buffer_start + len(self.buffer):
+            self._restore(self.checkpoints[index])
+        
+        parts = []
+        while size > 0:
+            start = offset - self.buffer_start
+            if start < len(self.buffer):
+                part = self.buffer[start:start + size]
+                parts.append(part)
+                offset += len(part)
+                size -= len(part)
+            elif not self._advance():
+                break
+        return b"".join(parts)
+    
+    def close(self):
+        self.file.close()
+
+class MemberStream(io.RawIOBase):
+    """A member's bytes, read on demand from a GzipIndex."""
+    
+    def __init__(self, index, offset, size):
+        self.index = index
+        self.position = offset
+        self.end = offset + size
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        data = self.index.read(self.position, min(len(buffer), self.end - self.position))
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+class ArchiveReader:
+    """An open archive for reading members back by name (zip) or data offset (tar)."""
+    
+    def __init__(self, archive_path):
+        self.archive_path = archive_path
+        self.zip = self.tar = self.gzip = None
+        if zipfile.is_zipfile(archive_path):
+            self.zip = zipfile.ZipFile(archive_path)
+        else:
+            with open(archive_path, 'rb') as f:
+                magic = f.read(2)
+            if magic == GZIP_MAGIC:
+                self.gzip = GzipIndex(archive_path)
+            else:
+                # Plain tars seek directly; bz2/xz tars seek forward by
+                # decompressing and restart on a backward seek
+                self.tar = tarfile.open(archive_path, "r:*")
+    
+    def open(self, member):
+        """A binary stream over one member's data."""
+        if self.zip is not None:
+            return self.zip.open(member.name)
+        if self.gzip is not None:
+            return io.BufferedReader(MemberStream(self.gzip, member.offset, member.size))
+        info = tarfile.TarInfo(member.name)
+        info.size = member.size
+        info.offset_data = member.offset
+        return self.tar.extractfile(info)
+    
+    def close(self):
+        (self.zip or self.gzip or self.tar).close()
+
+# One reader per archive and thread (seeks would interleave otherwise);
+# worker processes open their own
+_readers = {}  # (thread id, archive path) -> ArchiveReader
+_readers_lock = threading.Lock()
+
+def get_archive_reader(archive_path):
+    """Get (or open) the reader for an archive in this thread."""
+    key = (threading.get_ident(), archive_path)
+    reader = _readers.get(key)
+    if reader is None:
+        reader = ArchiveReader(archive_path)
+        with _readers_lock:
+            _readers[key] = reader
+    return reader
+
+def close_archive_readers(archive_path=None):
+    """Close the readers of one archive (of all archives if None) in every thread."""
+    with _readers_lock:
+        keys = [key for key in _readers if archive_path is None or key[1] == archive_path]
+        readers = [_readers.pop(key) for key in keys]
+    for reader in readers:
+        reader.close()
+
+atexit.register(close_archive_readers)
+
+def _forget_archive_readers():
+    global _readers_lock
+    _readers.clear()
+    _readers_lock = threading.Lock()
+
+# A forked worker must not share the parent's file positions
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_archive_readers)
+
+@dataclass(frozen=True)
+class ArchiveMember:
+    archive_path: str
+    name: str  # member name inside the archive
+    size: int
+    digest: str  # BLAKE2b of the content, computed while listing
+    offset: int = None  # data offset in the uncompressed tar stream (None for zip)
+    
+    def open(self):
+        """Stream the member's content without reading it whole."""
+        return get_archive_reader(self.archive_path).open(self)
+    
+    def read_bytes(self):
+        with self.open() as stream:
+            return stream.read()
+    
+    def __str__(self):
+        return f"{Path(self.archive_path).name}:{self.name}"
+
+def _normalize_name(name):
+    """Posix member path relative to the archive root, or None if it escapes the root."""
+    parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".")]
+    if not parts or ".." in parts:
+        return None
+    return "/".join(parts)
+
+class ArchiveSource:
+    """One version of a project, packed in a zip or tar archive."""
+    
+    def __init__(self, archive_path, max_total_size=MAX_TOTAL_SIZE, max_members=MAX_MEMBERS, strip_root=None):
+        """
+        Args:
+            archive_path: Path of a .zip, .tar, .tar.gz, .tgz, .tar.bz2 or .tar.xz file
+            max_total_size: Most uncompressed bytes the compared members may add up to
+            max_members: Most entries (files, directories, links) the archive may hold
+            strip_root: Whether to strip a single top-level directory wrapping every
+                entry (as in "project-1.2.0/..."); None strips it unless
+                align_archive_roots decides otherwise for the versions compared together
+        """
+        self.archive_path = str(archive_path)
+        self.max_total_size = max_total_size
+        self.max_members = max_members
+        self.strip_root = strip_root
+        # Wrapper directory stripped by the last list_files(), if any
+        self.wrapper_dir = None
+    
+    def __repr__(self):
+        return f"ArchiveSource({self.archive_path!r})"
+    
+    def close(self):
+        """Close the readers opened on this archive by any thread (they reopen on demand)."""
+        close_archive_readers(self.archive_path)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def __str__(self):
+        return self.archive_path
+    
+    def _iter_zip(self, archive):
+        """(name, size, is regular file, tar offset, opener) for each zip entry."""
+        for info in archive.infolist():
+            is_symlink = (info.external_attr >> 16) & 0o170000 == 0o120000
+            yield info.filename, info.file_size, not info.is_dir() and not is_symlink, None, \
+                lambda info=info: archive.open(info)
+    
+    def _iter_tar(self, archive):
+        """Same for a tar stream; each member must be read before moving on."""
+        for member in archive:
+            yield member.name, member.size, member.isreg() and not member.issparse(), member.offset_data, \
+                lambda member=member: archive.extractfile(member)
+    
+    def list_files(self, extensions=None, ignore_patterns=None):
+        """
+        Stream through the archive once, hashing every member that passes the
+        same filters as the directory scanner. Unless strip_root is False, a
+        single top-level directory wrapping everything (as in "project-1.2.0/...")
+        is stripped so that archives of different releases line up.
+        
+        Returns:
+            Dict mapping relative path -> ArchiveMember
+        """
+        extensions = DEFAULT_EXTENSIONS if extensions is None else frozenset(extensions)
+        rules = IgnoreRules(DEFAULT_IGNORE_PATTERNS if ignore_patterns is None else ignore_patterns)
+        
+        try:
+            if zipfile.is_zipfile(self.archive_path):
+                with zipfile.ZipFile(self.archive_path) as archive:
+                    return self._list_members(self._iter_zip(archive), extensions, rules)
+            # Stream mode reads the (possibly compressed) tar strictly front to back
+            with tarfile.open(self.archive_path, "r|*") as archive:
+                return self._list_members(self._iter_tar(archive), extensions, rules)
+        except (tarfile.TarError, zipfile.BadZipFile, EOFError) as e:
+            raise ValueError(f"Cannot read archive {self.archive_path}: {e}")
+    
+    def _list_members(self, entries, extensions, rules):
+        members = {}
+        ignored_dirs = {}
+        root = None  # wrapper directory, while every entry so far sits inside it
+        # The first entry proposes the wrapper directory, unless stripping is off
+        first = self.strip_root is not False
+        total_size = 0
+        for count, (name, size, is_file, offset, opener) in enumerate(entries, 1):
+            if count > self.max_members:
+                raise ValueError(f"{self.archive_path} has more than {self.max_members} entries")
+            path = _normalize_name(name)
+            if path is None:
+                continue
+            
+            if first:
+                first = False
+                if "/" in path or not is_file:
+                    root = path.split("/", 1)[0]
+            elif root is not None and path != root and not path.startswith(root + "/"):
+                # Not a wrapped archive after all: put the prefix back on what was listed
+                members = {f"{root}/{rel_path}": member for rel_path, member in members.items()}
+                ignored_dirs.clear()
+                root = None
+            if root is not None:
+                if path == root:
+                    continue
+                rel_path = path[len(root) + 1:]
+            else:
+                rel_path = path
+            
+            if not is_file:
+                continue
+            base = rel_path.rsplit("/", 1)[-1]
+            if not (matches_extension(base, extensions) or base == "README"):
+                continue
+            # Rules see paths relative to the wrapper directory when there is one
+            if in_ignored_dir(rel_path, rules, ignored_dirs) or rules.is_ignored(rel_path):
+                continue
+            
+            total_size += size
+            if total_size > self.max_total_size:
+                raise ValueError(f"{self.archive_path} expands to more than {self.max_total_size} bytes")
+            digest = hashlib.blake2b(digest_size=16)
+            with opener() as stream:
+                for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+            members[rel_path] = ArchiveMember(self.archive_path, name, size, digest.hexdigest(), offset)
+        
+        self.wrapper_dir = root
+        return {rel_path.replace("/", os.sep): member for rel_path, member in members.items()}
+
+def align_archive_roots(listings):
+    """
+    Decide the wrapper stripping of versions compared together.
+    A single top-level directory may be a release wrapper ("project-1.2.0/") or
+    a package that happens to be alone ("mypkg/"), so one archive cannot tell.
+    Each archive left to decide (strip_root=None) keeps its wrapper stripped
+    unless its paths match more of the other versions' paths with the wrapper
+    put back, e.g. "mypkg/m.py" next to an archive holding "mypkg/m.py" and
+    "setup.py", but not next to "project-2.0/m.py".
+    
+    Args:
+        listings: (version, files) pairs, files as returned by list_files()
+    
+    Returns:
+        The files dicts, in the same order
+    """
+    candidates = []
+    for version, files in listings:
+        if isinstance(version, ArchiveSource) and version.strip_root is None and version.wrapper_dir is not None:
+            prefix = version.wrapper_dir + os.sep
+            candidates.append((files, {prefix + rel_path: member for rel_path, member in files.items()}))
+        else:
+            candidates.append((files,))
+    
+    aligned = []
+    for index, forms in enumerate(candidates):
+        if len(forms) == 1:
+            aligned.append(forms[0])
+            continue
+        others = set()
+        for other_index, other_forms in enumerate(candidates):
+            if other_index != index:
+                for files in other_forms:
+                    others.update(files)
+        stripped, wrapped = forms
+        if sum(path in others for path in wrapped) > sum(path in others for path in stripped):
+            aligned.append(wrapped)
+        else:
+            aligned.append(stripped)
+    return aligned
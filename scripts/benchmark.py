@@ -0,0 +1,395 @@
+"""
+Benchmark suite for the comparison tool.
+Generates seeded synthetic version trees and times each pipeline stage
+(scanning, diffing, report generation, chart rendering) separately, so runs
+can be compared against a stored baseline. Also times each diff backend on
+large generated files, where difflib's near-quadratic worst case shows up.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import importlib.util
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from diff_engine import DIFF_ALGORITHMS
+from version_comparator import VersionComparator
+from report_generator import ReportGenerator
+
+CODE_LINES = [
+    "def {name}(value):\n",
+    "    return value + {n}\n",
+    "    if value > {n}:\n",
+    "        value = compute_{name}(value)\n",
+    "class {Name}:\n",
+    "    def __init__(self):\n",
+    "        self.{name} = {n}\n",
+    "import {name}\n",
+    "# {name} handles case {n}\n",
+    "\n"
+]
+
+def make_generated_file(line_count, seed=0):
+    """Create lockfile-like content with many repeated structural lines."""
+    rng = random.Random(seed)
+    lines = []
+    while len(lines) < line_count:
+        package = f"pkg-{rng.randint(0, line_count)}"
+        lines.extend([
+            f'  "{package}": {{\n',
+            f'    "version": "{rng.randint(0, 9)}.{rng.randint(0, 30)}.{rng.randint(0, 99)}",\n',
+            f'    "integrity": "sha512-{rng.getrandbits(64):016x}",\n',
+            '    "dev": false\n',
+            '  },\n'
+        ])
+    return lines[:line_count]
+
+def make_code_file(line_count, rng):
+    """Create source-like content from a small set of line templates."""
+    lines = []
+    for _ in range(line_count):
+        name = f"item{rng.randint(0, 500)}"
+        template = rng.choice(CODE_LINES)
+        lines.append(template.format(name=name, Name=name.title(), n=rng.randint(0, 1000)))
+    return lines
+
+def mutate_lines(lines, mutation_rate, seed=0):
+    """Randomly replace, insert, and delete a fraction of lines."""
+    rng = random.Random(seed)
+    mutated = []
+    for line in lines:
+        roll = rng.random()
+        if roll < mutation_rate / 3:
+            continue
+        elif roll < mutation_rate * 2 / 3:
+            mutated.append(f"    \"changed\": {rng.getrandbits(32)},\n")
+        elif roll < mutation_rate:
+            mutated.append(line)
+            mutated.append(f"    \"inserted\": {rng.getrandbits(32)},\n")
+        else:
+            mutated.append(line)
+    return mutated
+
+def sample_line_count(rng, mean_lines, size_distribution):
+    """Draw a file length from the configured size distribution."""
+    if size_distribution == "fixed":
+        return mean_lines
+    if size_distribution == "uniform":
+        return rng.randint(0, 2 * mean_lines)
+    # lognormal: mostly small files with a long tail of big ones
+    sigma = 1.0
+    mu = math.log(max(mean_lines, 1)) - sigma ** 2 / 2
+    return int(rng.lognormvariate(mu, sigma))
+
+def generate_version_trees(root, file_count=1000, mean_lines=200, size_distribution="lognormal",
+                           mutation_rate=0.1, line_mutation_rate=0.05, added_ratio=0.05,
+                           deleted_ratio=0.05, seed=0):
+    """
+    Write a synthetic pair of versions to root/v1 and root/v2.
+    
+    Args:
+        file_count: Number of files in version 1
+        mean_lines: Average file length in lines
+        size_distribution: "lognormal", "uniform", or "fixed"
+        mutation_rate: Fraction of common files that are modified in version 2
+        line_mutation_rate: Fraction of lines changed inside a modified file
+        added_ratio: New files in version 2, as a fraction of file_count
+        deleted_ratio: Fraction of version 1 files missing from version 2
+        seed: Seed for the random generator (same seed = same trees)
+    
+    Returns:
+        Tuple of (v1 path, v2 path)
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    v1, v2 = root / "v1", root / "v2"
+    for directory in (v1, v2):
+        if directory.exists():
+            shutil.rmtree(directory)
+    
+    def write(path, lines):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            f.writelines(lines)
+    
+    for index in range(file_count):
+        relative_path = Path(f"pkg{index % 50}") / f"module_{index}.py"
+        lines = make_code_file(sample_line_count(rng, mean_lines, size_distribution), rng)
+        write(v1 / relative_path, lines)
+        
+        roll = rng.random()
+        if roll < deleted_ratio:
+            continue
+        if roll < deleted_ratio + mutation_rate:
+            lines = mutate_lines(lines, line_mutation_rate, rng.getrandbits(32))
+        write(v2 / relative_path, lines)
+    
+    for index in range(int(file_count * added_ratio)):
+        relative_path = Path(f"pkg{index % 50}") / f"new_module_{index}.py"
+        write(v2 / relative_path, make_code_file(sample_line_count(rng, mean_lines, size_distribution), rng))
+    
+    return v1, v2
+
+def _timed(function, repeat=1):
+    """Run a function `repeat` times and return (best wall seconds, last result)."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+# Modules whose cold import time is tracked: the entry point alone, and chart rendering
+IMPORT_TARGETS = {
+    "import_main": "main",
+    "import_charts": "visualizer, matplotlib.figure"
+}
+
+def measure_import_time(modules, repeat=3):
+    """
+    Time `import <modules>` in fresh interpreters, as a user's run would pay it.
+    
+    Returns:
+        Best wall seconds over `repeat` runs
+    """
+    code = (
+        "import sys, time\n"
+        f"sys.path.insert(0, {str(SCRIPTS_DIR)!r})\n"
+        "start = time.perf_counter()\n"
+        f"import {modules}\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", code], check=True,
+                                capture_output=True, text=True).stdout
+        elapsed = float(output.strip().splitlines()[-1])
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def run_benchmark_suite(work_dir=None, repeat=1, workers=1, algorithm="difflib", charts=True,
+                        **tree_options):
+    """
+    Generate trees and time every pipeline stage separately.
+    
+    Returns:
+        Dict with the configuration, environment, and per-stage timings in seconds
+    """
+    cleanup = work_dir is None
+    work_dir = Path(tempfile.mkdtemp(prefix="vc_bench_") if work_dir is None else work_dir)
+    try:
+        generate_seconds, (v1, v2) = _timed(lambda: generate_version_trees(work_dir, **tree_options))
+        
+        comparator = VersionComparator(v1, v2, workers=workers, algorithm=algorithm)
+        scan_seconds, (files_v1, files_v2) = _timed(
+            lambda: (comparator.get_all_files(v1), comparator.get_all_files(v2)), repeat
+        )
+        common = sorted(set(files_v1) & set(files_v2))
+        pairs = [(files_v1[f], files_v2[f]) for f in common]
+        diff_seconds, _ = _timed(lambda: comparator.compare_common_files(pairs), repeat)
+        
+        total_seconds, results = _timed(comparator.run_comparison, repeat)
+        
+        report_dir = work_dir / "reports"
+        report_generator = ReportGenerator(results, comparator.file_comparisons)
+        report_seconds, _ = _timed(lambda: (
+            report_generator.generate_json_report(report_dir / "comparison_report.json"),
+            report_generator.generate_csv_report(report_dir / "file_comparison.csv"),
+            report_generator.generate_markdown_report(report_dir / "ANALYSIS.md")
+        ), repeat)
+        
+        has_matplotlib = importlib.util.find_spec("matplotlib") is not None
+        chart_seconds = None
+        if charts:
+            if not has_matplotlib:
+                print("⚠️  matplotlib not installed, skipping chart timing")
+            else:
+                from visualizer import VisualizationGenerator
+                visualizer = VisualizationGenerator(results, report_dir / "visualizations")
+                chart_seconds, _ = _timed(lambda: visualizer.generate_all_visualizations(force=True), repeat)
+        
+        return {
+            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "config": dict(tree_options, repeat=repeat, workers=workers, algorithm=algorithm),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count()
+            },
+            "tree": {
+                "files_v1": len(files_v1),
+                "files_v2": len(files_v2),
+                "common_files": len(common)
+            },
+            "timings": {
+                "generate": generate_seconds,
+                "scan": scan_seconds,
+                "diff": diff_seconds,
+                "comparison_total": total_seconds,
+                "reports": report_seconds,
+                "charts": chart_seconds,
+                "import_main": measure_import_time(IMPORT_TARGETS["import_main"], max(repeat, 3)),
+                "import_charts": (measure_import_time(IMPORT_TARGETS["import_charts"], max(repeat, 3))
+                                  if charts and has_matplotlib else None)
+            }
+        }
+    finally:
+        if cleanup:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+def compare_to_baseline(results, baseline, tolerance=0.2):
+    """
+    Compare stage timings with a baseline run.
+    
+    Returns:
+        List of (stage, baseline seconds, current seconds) that got slower than tolerance allows
+    """
+    regressions = []
+    print(f"\n{'Stage':<18} {'Baseline':>10} {'Current':>10} {'Change':>9}")
+    for stage, current in results["timings"].items():
+        previous = baseline.get("timings", {}).get(stage)
+        if current is None or not previous:
+            continue
+        change = (current - previous) / previous * 100
+        flag = ""
+        if current > previous * (1 + tolerance):
+            regressions.append((stage, previous, current))
+            flag = "  ⚠️ slower"
+        print(f"{stage:<18} {previous:>10.4f} {current:>10.4f} {change:>+8.1f}%{flag}")
+    return regressions
+
+def print_suite_results(results):
+    """Print per-stage timings."""
+    print(f"\nTree: {results['tree']['files_v1']} files in v1, {results['tree']['files_v2']} in v2")
+    print(f"\n{'Stage':<18} {'Seconds':>10}")
+    for stage, seconds in results["timings"].items():
+        value = f"{seconds:>10.4f}" if seconds is not None else f"{'skipped':>10}"
+        print(f"{stage:<18} {value}")
+
+def benchmark_diff_algorithms(line_counts=(1000, 5000, 20000), mutation_rates=(0.02, 0.5),
+                              algorithms=None, seed=0):
+    """
+    Time every diff backend on the same synthetic file pairs. The high mutation
+    rate covers very different files, where Myers' cost grows with the edit distance.
+    
+    Returns:
+        List of dicts with lines, mutation_rate, algorithm, seconds, and similarity
+    """
+    if algorithms is None:
+        algorithms = list(DIFF_ALGORITHMS)
+    
+    results = []
+    for mutation_rate in mutation_rates:
+        for line_count in line_counts:
+            lines1 = make_generated_file(line_count, seed)
+            lines2 = mutate_lines(lines1, mutation_rate, seed)
+            for algorithm in algorithms:
+                start = time.perf_counter()
+                stats = DIFF_ALGORITHMS[algorithm](lines1, lines2)
+                elapsed = time.perf_counter() - start
+                results.append({
+                    "lines": line_count,
+                    "mutation_rate": mutation_rate,
+                    "algorithm": algorithm,
+                    "seconds": elapsed,
+                    "similarity": stats["similarity"]
+                })
+    return results
+
+def print_diff_benchmark(results):
+    """Print backend timings side by side with the speedup over difflib."""
+    print(f"\n{'Lines':>8} {'Mutated':>8}  {'Algorithm':<10} {'Seconds':>10} {'Similarity':>11} {'Speedup':>8}")
+    baseline = {
+        (r["lines"], r["mutation_rate"]): r["seconds"]
+        for r in results if r["algorithm"] == "difflib"
+    }
+    for r in results:
+        key = (r["lines"], r["mutation_rate"])
+        speedup = baseline.get(key, 0) / r["seconds"] if r["seconds"] > 0 else 0
+        print(f"{r['lines']:>8} {r['mutation_rate']:>7.0%}  {r['algorithm']:<10} {r['seconds']:>10.4f} "
+              f"{r['similarity']:>10.2f}% {speedup:>7.1f}x")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the version comparison pipeline.")
+    parser.add_argument("--files", type=int, default=1000, help="files in the synthetic v1 tree")
+    parser.add_argument("--mean-lines", type=int, default=200, help="average lines per file")
+    parser.add_argument("--size-distribution", choices=["lognormal", "uniform", "fixed"],
+                        default="lognormal")
+    parser.add_argument("--mutation-rate", type=float, default=0.1,
+                        help="fraction of common files modified in v2")
+    parser.add_argument("--line-mutation-rate", type=float, default=0.05,
+                        help="fraction of lines changed in a modified file")
+    parser.add_argument("--added-ratio", type=float, default=0.05)
+    parser.add_argument("--deleted-ratio", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="best of N runs per stage")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--algorithm", choices=list(DIFF_ALGORITHMS), default="difflib")
+    parser.add_argument("--no-charts", action="store_true", help="skip chart rendering")
+    parser.add_argument("--work-dir", help="keep generated trees here instead of a temp dir")
+    parser.add_argument("--output", default="reports/benchmark.json", help="results JSON path")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed slowdown vs baseline before a stage is flagged")
+    parser.add_argument("--backends", action="store_true",
+                        help="also time each diff backend on large generated files")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    print("=" * 60)
+    print("VERSION COMPARISON BENCHMARK")
+    print("=" * 60)
+    
+    results = run_benchmark_suite(
+        work_dir=args.work_dir,
+        repeat=args.repeat,
+        workers=args.workers,
+        algorithm=args.algorithm,
+        charts=not args.no_charts,
+        file_count=args.files,
+        mean_lines=args.mean_lines,
+        size_distribution=args.size_distribution,
+        mutation_rate=args.mutation_rate,
+        line_mutation_rate=args.line_mutation_rate,
+        added_ratio=args.added_ratio,
+        deleted_ratio=args.deleted_ratio,
+        seed=args.seed
+    )
+    print_suite_results(results)
+    
+    if args.backends:
+        results["diff_backends"] = benchmark_diff_algorithms()
+        print_diff_benchmark(results["diff_backends"])
+    
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        results["regressions"] = [stage for stage, _, _ in regressions]
+    
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✅ Benchmark results saved to {output_path}")
+    
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
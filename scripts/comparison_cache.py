@@ -0,0 +1,178 @@
+"""
+Persistent on-disk cache of per-file comparison results.
+Entries are keyed by the content hashes of both files and the diff algorithm,
+so any version pair sharing a file pair reuses the earlier result.
+A second table keeps the structural fingerprints of single files, keyed by
+content hash.
+
+Several processes may share one cache directory (parallel service jobs,
+concurrent CLI runs). Lookups therefore never write: the last-used times of
+hits are kept in memory and written by flush() together with the new entries,
+so the write lock is only held for that one short transaction.
+"""
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+class ComparisonCache:
+    def __init__(self, cache_dir=".cache", max_entries=200000, busy_timeout=30.0):
+        """
+        Args:
+            cache_dir: Directory holding the SQLite database
+            max_entries: Least recently used entries beyond this count are evicted
+            busy_timeout: Seconds to wait for another process's write to finish
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.cache_dir / "comparisons.sqlite3"
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # Last-used times of cache hits, written by flush()
+        self.touched = {}
+        self.touched_symbols = {}
+        self.conn = sqlite3.connect(str(self.db_path), timeout=busy_timeout)
+        # Readers and the writer do not block each other in WAL mode
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS comparisons (
+                hash_v1 TEXT NOT NULL,
+                hash_v2 TEXT NOT NULL,
+                algorithm TEXT NOT NULL,
+                similarity REAL NOT NULL,
+                added INTEGER NOT NULL,
+                removed INTEGER NOT NULL,
+                changed INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                estimated INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (hash_v1, hash_v2, algorithm)
+            )
+        """)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(comparisons)")]
+        if "estimated" not in columns:
+            # Caches written before large-file estimates were flagged
+            self.conn.execute("ALTER TABLE comparisons ADD COLUMN estimated INTEGER NOT NULL DEFAULT 0")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_comparisons_last_used ON comparisons (last_used)"
+        )
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS symbols (
+                hash TEXT NOT NULL,
+                version TEXT NOT NULL,
+                data TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (hash, version)
+            )
+        """)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_symbols_last_used ON symbols (last_used)"
+        )
+        self.conn.commit()
+    
+    def get(self, hash_v1, hash_v2, algorithm):
+        """Return the cached comparison dict, or None on a miss."""
+        row = self.conn.execute(
+            "SELECT similarity, added, removed, changed, estimated FROM comparisons "
+            "WHERE hash_v1 = ? AND hash_v2 = ? AND algorithm = ?",
+            (hash_v1, hash_v2, algorithm)
+        ).fetchone()
+        
+        if row is None:
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        self.touched[(hash_v1, hash_v2, algorithm)] = time.time()
+        comparison = {
+            "similarity": row[0],
+            "added": row[1],
+            "removed": row[2],
+            "changed": row[3]
+        }
+        if row[4]:
+            comparison["estimated"] = True
+        return comparison
+    
+    def put(self, hash_v1, hash_v2, algorithm, comparison):
+        """Store a comparison dict (similarity/added/removed/changed, optionally estimated)."""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO comparisons "
+            "(hash_v1, hash_v2, algorithm, similarity, added, removed, changed, last_used, estimated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                hash_v1, hash_v2, algorithm,
+                comparison["similarity"],
+                comparison["added"],
+                comparison["removed"],
+                comparison["changed"],
+                time.time(),
+                int(comparison.get("estimated", False))
+            )
+        )
+    
+    def get_symbols(self, content_hash, version):
+        """Return the cached symbol fingerprints of a file, or None on a miss."""
+        row = self.conn.execute(
+            "SELECT data FROM symbols WHERE hash = ? AND version = ?",
+            (content_hash, version)
+        ).fetchone()
+        if row is None:
+            return None
+        self.touched_symbols[(content_hash, version)] = time.time()
+        return json.loads(row[0])
+    
+    def put_symbols(self, content_hash, version, fingerprints):
+        """Store the symbol fingerprints of a file (see structural_diff.symbol_fingerprints)."""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO symbols VALUES (?, ?, ?, ?)",
+            (content_hash, version, json.dumps(fingerprints), time.time())
+        )
+    
+    def evict(self):
+        """Drop least recently used entries until each table fits max_entries."""
+        evicted = 0
+        for table in ("comparisons", "symbols"):
+            count = self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            excess = count - self.max_entries
+            if excess > 0:
+                self.conn.execute(
+                    f"DELETE FROM {table} WHERE rowid IN ("
+                    f"SELECT rowid FROM {table} ORDER BY last_used LIMIT ?)",
+                    (excess,)
+                )
+                evicted += excess
+        return evicted
+    
+    def flush(self):
+        """Record the last use of cache hits, evict over-limit entries and commit pending writes."""
+        if self.touched:
+            self.conn.executemany(
+                "UPDATE comparisons SET last_used = ? "
+                "WHERE hash_v1 = ? AND hash_v2 = ? AND algorithm = ?",
+                [(used, *key) for key, used in self.touched.items()]
+            )
+            self.touched.clear()
+        if self.touched_symbols:
+            self.conn.executemany(
+                "UPDATE symbols SET last_used = ? WHERE hash = ? AND version = ?",
+                [(used, *key) for key, used in self.touched_symbols.items()]
+            )
+            self.touched_symbols.clear()
+        self.evict()
+        self.conn.commit()
+    
+    def stats(self):
+        """Get hit/miss counters for this session."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups * 100) if lookups > 0 else 0
+        }
+    
+    def close(self):
+        """Flush and close the database connection."""
+        self.flush()
+        self.conn.close()
@@ -0,0 +1,95 @@
+"""
+Persisted manifest for incremental re-comparison.
+Remembers, for every path compared last time, the size/mtime/hash of both
+versions and the per-file result, so the next run only re-diffs paths whose
+files actually changed.
+"""
+
+import json
+import os
+from pathlib import Path
+
+MANIFEST_FORMAT = 1
+
+class ComparisonManifest:
+    def __init__(self, manifest_path, algorithm_id):
+        """
+        Args:
+            manifest_path: JSON file to load from and save to
+            algorithm_id: Results recorded under another algorithm are discarded
+        """
+        self.manifest_path = Path(manifest_path)
+        self.algorithm_id = algorithm_id
+        self.entries = {}
+        self.new_entries = {}
+        self.reused = 0
+        self.recompared = 0
+        self.load()
+    
+    def load(self):
+        """Load the previous manifest if it exists and matches the algorithm."""
+        try:
+            with open(self.manifest_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        
+        if data.get("format") == MANIFEST_FORMAT and data.get("algorithm_id") == self.algorithm_id:
+            self.entries = data.get("files", {})
+    
+    def _same_file(self, old_state, new_state, hash_function):
+        """
+        Check whether a file is unchanged since the manifest was written.
+        Equal size and mtime are trusted; otherwise equal-size files are hashed.
+        """
+        if old_state is None or old_state.get("size") != new_state.get("size"):
+            return False
+        if "mtime_ns" in new_state and old_state.get("mtime_ns") == new_state["mtime_ns"]:
+            new_state.setdefault("hash", old_state.get("hash"))
+            return True
+        if "hash" not in new_state:
+            new_state["hash"] = hash_function()
+        return new_state["hash"] is not None and old_state.get("hash") == new_state["hash"]
+    
+    def lookup(self, filename, state1, state2, hash1_function, hash2_function):
+        """
+        Return the recorded result for a path if neither version of it changed.
+        
+        Args:
+            state1, state2: Dicts with "size" and "mtime_ns" or "hash" of each version
+            hash1_function, hash2_function: Called to hash a file only when needed
+        """
+        entry = self.entries.get(filename)
+        if entry is None:
+            return None
+        if not self._same_file(entry.get("v1"), state1, hash1_function):
+            return None
+        if not self._same_file(entry.get("v2"), state2, hash2_function):
+            return None
+        
+        self.reused += 1
+        self.new_entries[filename] = {"v1": state1, "v2": state2, "result": entry["result"]}
+        return dict(entry["result"])
+    
+    def record(self, filename, state1, state2, result, hash1_function, hash2_function):
+        """Remember a freshly computed result together with both file states."""
+        self.recompared += 1
+        if "hash" not in state1:
+            state1["hash"] = hash1_function()
+        if "hash" not in state2:
+            state2["hash"] = hash2_function()
+        self.new_entries[filename] = {"v1": state1, "v2": state2, "result": result}
+    
+    def save(self):
+        """Write the manifest atomically; paths not seen in this run are dropped."""
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        with open(temp_path, 'w') as f:
+            json.dump({
+                "format": MANIFEST_FORMAT,
+                "algorithm_id": self.algorithm_id,
+                "files": self.new_entries
+            }, f, separators=(",", ":"))
+        os.replace(temp_path, self.manifest_path)
+        self.entries = self.new_entries
+        self.new_entries = {}
@@ -0,0 +1,374 @@
+"""
+Long-running comparison service for the web frontend.
+Accepts comparison jobs over HTTP on a TCP port or a Unix socket, runs them
+from a queue with bounded concurrency inside this one process (so the engine
+is imported once, not per request), and persists every job and its result as
+JSON so results survive restarts.
+
+Endpoints:
+    POST /jobs        {"type": "software", "version1": PATH, "version2": PATH, "options": {...}}
+                      {"type": "software", "demo": true}
+                      {"type": "pdf", "document1": PATH, "document2": PATH}
+                      "remove_inputs": true deletes the inputs once the job ends; they
+                      must lie in an upload-* directory of the upload dir (--upload-dir)
+    GET  /jobs/<id>   Job status ("queued", "running", "done", "failed"),
+                      with "result" once done or "error" once failed
+    GET  /health      Queue length and concurrency
+
+Run:
+    python scripts/comparison_service.py --port 8765
+    python scripts/comparison_service.py --socket /tmp/version-compare.sock
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from pathlib import Path
+from archive_source import ArchiveSource, is_archive
+from comparison_cache import ComparisonCache
+from setup_versions import setup_demo_data
+from version_comparator import VersionComparator
+
+MAX_REQUEST_BYTES = 1024 * 1024
+DEMO_VERSIONS = ("versions/demo_v1", "versions/demo_v2")
+# Job options a client may pass through to VersionComparator
+COMPARATOR_OPTIONS = {
+    "algorithm", "workers", "detect_renames", "rename_threshold", "similarity_threshold",
+    "structural", "normalize"
+}
+
+_demo_lock = threading.Lock()
+
+def software_api_result(results, file_comparisons):
+    """Shape a comparison the way the frontend's results pages read it."""
+    by_status = {"unchanged": [], "modified": [], "added": [], "deleted": []}
+    renamed = []
+    detailed_changes = {}
+    for fc in file_comparisons:
+        if fc.status == "renamed":
+            renamed.append({"from": fc.old_filename, "to": fc.filename, "similarity": fc.similarity_score})
+        else:
+            by_status[fc.status].append(fc.filename)
+        if fc.status in ("modified", "renamed"):
+            detailed_changes[fc.filename] = {
+                "similarity": fc.similarity_score,
+                "added_lines": fc.lines_added,
+                "deleted_lines": fc.lines_removed,
+                "changed_lines": fc.lines_changed
+            }
+            if fc.symbols is not None:
+                detailed_changes[fc.filename]["symbols"] = fc.symbols
+            if fc.estimated:
+                detailed_changes[fc.filename]["estimated"] = True
+    
+    statistics = {
+        "total_files": results["total_files"],
+        "average_similarity": results["average_similarity"],
+        "code_change_percentage": results["code_change_percentage"],
+        "total_lines_added": results["total_lines_added"],
+        "total_lines_removed": results["total_lines_removed"]
+    }
+    if "symbol_changes" in results:
+        statistics["symbol_changes"] = results["symbol_changes"]
+    for status in ("unchanged", "modified", "added", "deleted", "renamed"):
+        statistics[f"{status}_files_count"] = results[f"{status}_count"]
+        statistics[f"{status}_percentage"] = results[f"{status}_percentage"]
+    
+    return {
+        "type": "software",
+        "statistics": statistics,
+        "unchanged_files": by_status["unchanged"],
+        "modified_files": by_status["modified"],
+        "added_files": by_status["added"],
+        "deleted_files": by_status["deleted"],
+        "renamed_files": renamed,
+        "detailed_changes": detailed_changes
+    }
+
+def prepare_version(path):
+    """A version for a job input: directories as-is, uploaded archives read in place."""
+    if Path(path).is_dir():
+        return path
+    if is_archive(path):
+        return ArchiveSource(path)
+    raise ValueError(f"Not a directory or zip/tar archive: {path}")
+
+# Payload keys that name input files
+INPUT_KEYS = ("version1", "version2", "document1", "document2")
+
+def is_uploaded_file(path, upload_dir):
+    """True if path resolves to a file directly inside an upload-* directory of upload_dir."""
+    path = Path(path).resolve()
+    return (path.parent.parent == Path(upload_dir).resolve()
+            and path.parent.name.startswith("upload-")
+            and path.is_file())
+
+def remove_job_inputs(payload, upload_dir):
+    """
+    Delete a finished job's uploaded input files, and their upload directory once
+    it is empty. Inputs outside upload_dir (see is_uploaded_file) are left alone.
+    """
+    for key in INPUT_KEYS:
+        if key not in payload or not is_uploaded_file(payload[key], upload_dir):
+            continue
+        path = Path(payload[key]).resolve()
+        try:
+            path.unlink()
+            path.parent.rmdir()
+        except OSError:
+            pass  # the directory still holds the other input
+
+def run_software_job(payload, cache_dir=None):
+    """Compare two software versions (blocking; runs on an executor thread)."""
+    if payload.get("demo"):
+        with _demo_lock:
+            if not all(Path(version).is_dir() for version in DEMO_VERSIONS):
+                setup_demo_data()
+        version1, version2 = DEMO_VERSIONS
+    else:
+        if "version1" not in payload or "version2" not in payload:
+            raise ValueError("Software jobs need version1 and version2")
+        version1 = prepare_version(payload["version1"])
+        version2 = prepare_version(payload["version2"])
+    
+    options = {key: value for key, value in payload.get("options", {}).items() if key in COMPARATOR_OPTIONS}
+    # SQLite connections cannot be shared between threads, so every job opens its own
+    cache = ComparisonCache(cache_dir) if cache_dir else None
+    try:
+        comparator = VersionComparator(version1, version2, cache=cache, **options)
+        results = comparator.run_comparison()
+    finally:
+        if cache is not None:
+            cache.close()
+        # Archive readers would otherwise stay open for the life of the service
+        for version in (version1, version2):
+            if isinstance(version, ArchiveSource):
+                version.close()
+    return software_api_result(results, comparator.file_comparisons)
+
+def run_pdf_job(payload, cache_dir=None):
+    """Compare two PDF documents (blocking; runs on an executor thread)."""
+    if "document1" not in payload or "document2" not in payload:
+        raise ValueError("PDF jobs need document1 and document2")
+    from pdf_comparator import PdfComparator
+    workers = payload.get("options", {}).get("workers", 1)
+    comparator = PdfComparator(payload["document1"], payload["document2"], workers=workers, cache_dir=cache_dir)
+    return comparator.run_comparison()
+
+class ComparisonService:
+    def __init__(self, store_dir="service_data", concurrency=2, cache_dir=None, upload_dir="temp"):
+        """
+        Args:
+            store_dir: Directory for persisted jobs and their results
+            concurrency: Jobs run at the same time; the rest wait in the queue
+            cache_dir: Optional ComparisonCache directory shared by all jobs
+            upload_dir: Directory whose upload-* subdirectories hold uploaded
+                inputs; only those are deleted for "remove_inputs" jobs
+        """
+        self.store_dir = Path(store_dir)
+        self.jobs_dir = self.store_dir / "jobs"
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self.concurrency = concurrency
+        self.cache_dir = cache_dir
+        self.upload_dir = upload_dir
+        self.handlers = {"software": run_software_job, "pdf": run_pdf_job}
+        self.jobs = {}
+        self.queue = None
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+    
+    def load_jobs(self):
+        """Load persisted jobs; unfinished ones go back on the queue."""
+        requeue = []
+        for path in sorted(self.jobs_dir.glob("*.json")):
+            try:
+                with open(path, 'r') as f:
+                    job = json.load(f)
+            except (OSError, ValueError):
+                continue
+            self.jobs[job["id"]] = job
+            if job["status"] in ("queued", "running"):
+                job["status"] = "queued"
+                requeue.append(job)
+        requeue.sort(key=lambda job: job["created_at"])
+        return requeue
+    
+    def save_job(self, job):
+        """Persist a job atomically."""
+        path = self.jobs_dir / f"{job['id']}.json"
+        temp_path = path.with_name(path.name + ".tmp")
+        with open(temp_path, 'w') as f:
+            json.dump(job, f)
+        os.replace(temp_path, path)
+    
+    def submit(self, payload):
+        """Validate and enqueue a job; returns its public view."""
+        job_type = payload.get("type", "software")
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type {job_type!r}; expected one of {sorted(self.handlers)}")
+        if payload.get("remove_inputs"):
+            for key in INPUT_KEYS:
+                if key in payload and not is_uploaded_file(payload[key], self.upload_dir):
+                    raise ValueError(f"remove_inputs only applies to files in "
+                                     f"{Path(self.upload_dir) / 'upload-*'}; got {key}={payload[key]!r}")
+        
+        job = {
+            "id": f"{job_type}-{uuid.uuid4().hex}",
+            "type": job_type,
+            "status": "queued",
+            "created_at": datetime.now().isoformat(),
+            "payload": payload
+        }
+        self.jobs[job["id"]] = job
+        self.save_job(job)
+        self.queue.put_nowait(job)
+        return self.public_view(job)
+    
+    def public_view(self, job):
+        view = {key: job[key] for key in ("id", "type", "status", "created_at")}
+        for key in ("started_at", "finished_at", "result", "error"):
+            if key in job:
+                view[key] = job[key]
+        if job["status"] == "queued":
+            view["queue_length"] = self.queue.qsize()
+        return view
+    
+    async def worker(self):
+        """Take jobs off the queue and run them on the executor, one at a time."""
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            job["status"] = "running"
+            job["started_at"] = datetime.now().isoformat()
+            self.save_job(job)
+            
+            try:
+                job["result"] = await loop.run_in_executor(
+                    self.executor, self.handlers[job["type"]], job["payload"], self.cache_dir
+                )
+                job["status"] = "done"
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = f"{type(e).__name__}: {e}"
+            finally:
+                job["finished_at"] = datetime.now().isoformat()
+                self.save_job(job)
+                self.queue.task_done()
+                if job["payload"].get("remove_inputs"):
+                    remove_job_inputs(job["payload"], self.upload_dir)
+            print(f"{'✅' if job['status'] == 'done' else '❌'} Job {job['id']} {job['status']}")
+    
+    def route(self, method, path, body):
+        """Dispatch one request; returns (HTTP status, JSON-ready body)."""
+        if method == "GET" and path == "/health":
+            return HTTPStatus.OK, {
+                "status": "ok",
+                "queued": self.queue.qsize(),
+                "concurrency": self.concurrency,
+                "jobs": len(self.jobs)
+            }
+        if method == "POST" and path == "/jobs":
+            try:
+                payload = json.loads(body or b"{}")
+                if not isinstance(payload, dict):
+                    raise ValueError("Job payload must be a JSON object")
+                return HTTPStatus.ACCEPTED, self.submit(payload)
+            except ValueError as e:
+                return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        if method == "GET" and path.startswith("/jobs/"):
+            job = self.jobs.get(path[len("/jobs/"):])
+            if job is None:
+                return HTTPStatus.NOT_FOUND, {"error": "Job not found"}
+            return HTTPStatus.OK, self.public_view(job)
+        return HTTPStatus.NOT_FOUND, {"error": f"No route for {method} {path}"}
+    
+    async def handle_connection(self, reader, writer):
+        """Serve one HTTP/1.1 request per connection."""
+        try:
+            request_line = await reader.readline()
+            parts = request_line.decode("latin-1").split()
+            if len(parts) < 2:
+                return
+            method, path = parts[0], parts[1].split("?", 1)[0]
+            
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            
+            length = int(headers.get("content-length", 0) or 0)
+            if length > MAX_REQUEST_BYTES:
+                status, response = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Request body too large"}
+            else:
+                body = await reader.readexactly(length) if length else b""
+                status, response = self.route(method, path, body)
+            
+            data = json.dumps(response).encode()
+            writer.write(
+                f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                "Connection: close\r\n\r\n".encode() + data
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+    
+    async def serve(self, host="127.0.0.1", port=8765, socket_path=None):
+        """Start the workers and serve requests until cancelled."""
+        self.queue = asyncio.Queue()
+        for job in self.load_jobs():
+            self.queue.put_nowait(job)
+        workers = [asyncio.create_task(self.worker()) for _ in range(self.concurrency)]
+        
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            server = await asyncio.start_unix_server(self.handle_connection, path=socket_path)
+            print(f"🚀 Comparison service listening on {socket_path}")
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+            print(f"🚀 Comparison service listening on http://{host}:{port}")
+        
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in workers:
+                task.cancel()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the comparison job service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--store-dir", default="service_data",
+                        help="where jobs and results are persisted (default: service_data)")
+    parser.add_argument("--concurrency", type=int, default=2, help="jobs run at the same time")
+    parser.add_argument("--cache-dir", help="comparison cache shared by all jobs")
+    parser.add_argument("--upload-dir", default="temp",
+                        help="where the web app saves uploads; only files in its upload-* "
+                             "directories are deleted after a job (default: temp)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    service = ComparisonService(args.store_dir, args.concurrency, args.cache_dir, args.upload_dir)
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        print("\n👋 Comparison service stopped")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Compact columnar storage for per-file comparison results.
+Keeps one typed array per field instead of one Python object per file,
+while still behaving like a read-only list of FileComparison records.
+"""
+
+import sys
+from array import array
+from collections.abc import Sequence
+from version_comparator import FileComparison
+
+# Status strings are stored as one byte each
+STATUSES = ("unchanged", "modified", "added", "deleted", "renamed")
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+
+class FileComparisonStore(Sequence):
+    def __init__(self, records=()):
+        """
+        Args:
+            records: Optional iterable of FileComparison to load (e.g. a generator)
+        """
+        self.filenames = []
+        self.status_codes = array('B')
+        self.similarity_scores = array('d')
+        self.lines_added = array('q')
+        self.lines_removed = array('q')
+        self.lines_changed = array('q')
+        # Only renamed files have a previous path, so these are kept by row index
+        self.old_filenames = {}
+        # Likewise for structural changes, which only changed Python files have
+        self.symbols = {}
+        # Row indexes of large-file estimates
+        self.estimated = set()
+        self.extend(records)
+    
+    def append(self, fc):
+        """Add one FileComparison record."""
+        if fc.old_filename is not None:
+            self.old_filenames[len(self.filenames)] = sys.intern(fc.old_filename)
+        if fc.symbols is not None:
+            self.symbols[len(self.filenames)] = fc.symbols
+        if fc.estimated:
+            self.estimated.add(len(self.filenames))
+        self.filenames.append(sys.intern(fc.filename))
+        self.status_codes.append(STATUS_CODES[fc.status])
+        self.similarity_scores.append(fc.similarity_score)
+        self.lines_added.append(fc.lines_added)
+        self.lines_removed.append(fc.lines_removed)
+        self.lines_changed.append(fc.lines_changed)
+    
+    def extend(self, records):
+        for fc in records:
+            self.append(fc)
+    
+    def __len__(self):
+        return len(self.filenames)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("FileComparisonStore index out of range")
+        return FileComparison(
+            filename=self.filenames[index],
+            status=STATUSES[self.status_codes[index]],
+            similarity_score=self.similarity_scores[index],
+            lines_added=self.lines_added[index],
+            lines_removed=self.lines_removed[index],
+            lines_changed=self.lines_changed[index],
+            old_filename=self.old_filenames.get(index),
+            symbols=self.symbols.get(index),
+            estimated=index in self.estimated
+        )
+    
+    def __iter__(self):
+        for index in range(len(self.filenames)):
+            yield self[index]
+    
+    def __eq__(self, other):
+        if not isinstance(other, (FileComparisonStore, list, tuple)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+    
+    def __repr__(self):
+        return f"FileComparisonStore({len(self)} files)"
+    
+    def count_status(self, status):
+        """Number of files with a status, counted over the raw status bytes."""
+        return self.status_codes.tobytes().count(bytes([STATUS_CODES[status]]))
+    
+    def with_status(self, *statuses):
+        """FileComparison records whose status is one of `statuses`, in order."""
+        wanted = {STATUS_CODES[status] for status in statuses}
+        return [self[i] for i, code in enumerate(self.status_codes) if code in wanted]
+    
+    def summary(self):
+        """
+        Summary statistics computed directly from the columns.
+        Uses the same keys and formulas as VersionComparator.results.
+        """
+        total_files = len(self)
+        unchanged_count = self.count_status("unchanged")
+        modified_count = self.count_status("modified")
+        added_count = self.count_status("added")
+        deleted_count = self.count_status("deleted")
+        renamed_count = self.count_status("renamed")
+        
+        # Added and deleted files score 0, so summing every row only counts compared files
+        compared = modified_count + unchanged_count + renamed_count
+        avg_similarity = sum(self.similarity_scores) / compared if compared > 0 else 100.0
+        
+        return {
+            "total_files": total_files,
+            "unchanged_count": unchanged_count,
+            "modified_count": modified_count,
+            "added_count": added_count,
+            "deleted_count": deleted_count,
+            "renamed_count": renamed_count,
+            "unchanged_percentage": (unchanged_count / total_files * 100) if total_files > 0 else 0,
+            "modified_percentage": (modified_count / total_files * 100) if total_files > 0 else 0,
+            "added_percentage": (added_count / total_files * 100) if total_files > 0 else 0,
+            "deleted_percentage": (deleted_count / total_files * 100) if total_files > 0 else 0,
+            "renamed_percentage": (renamed_count / total_files * 100) if total_files > 0 else 0,
+            "average_similarity": avg_similarity,
+            "total_lines_added": sum(self.lines_added),
+            "total_lines_removed": sum(self.lines_removed),
+            "code_change_percentage": 100 - avg_similarity if total_files > 0 else 0
+        }
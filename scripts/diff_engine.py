@@ -0,0 +1,361 @@
+"""
+Diff core shared by the comparison engine.
+Each backend computes the alignment of two line sequences once and derives
+the similarity ratio and the added/removed/changed line counts from it.
+
+Backends:
+    difflib - difflib.SequenceMatcher opcodes (the original behaviour)
+    myers   - Myers O(ND) edit distance over interned line IDs, linear memory;
+              pairs past its edit budget are split at patience anchors first
+
+tiered_diff answers "is this pair at least N% similar?" from cheap bounds
+first and only runs a backend when the bounds cannot decide.
+"""
+
+import bisect
+import difflib
+import math
+from array import array
+from collections import Counter
+
+def diff_stats_from_opcodes(opcodes, len1, len2):
+    """Turn SequenceMatcher opcodes into a comparison dict."""
+    matches = 0
+    added = 0
+    removed = 0
+    
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'equal':
+            matches += i2 - i1
+        else:
+            # 'replace' removes old lines and adds new ones
+            removed += i2 - i1
+            added += j2 - j1
+    
+    if len1 == 0 and len2 == 0:
+        similarity = 100.0
+    elif len1 == 0 or len2 == 0:
+        similarity = 0.0
+    else:
+        # Same formula as SequenceMatcher.ratio()
+        similarity = 2.0 * matches / (len1 + len2) * 100
+    
+    return {
+        "similarity": similarity,
+        "added": added,
+        "removed": removed,
+        "changed": max(added, removed)
+    }
+
+def diff_opcodes(lines1, lines2):
+    """The difflib alignment of two line lists as (tag, i1, i2, j1, j2) opcodes."""
+    return difflib.SequenceMatcher(None, lines1, lines2).get_opcodes()
+
+def compute_diff(lines1, lines2):
+    """Diff two line lists with difflib, building the matcher only once."""
+    return diff_stats_from_opcodes(diff_opcodes(lines1, lines2), len(lines1), len(lines2))
+
+def intern_lines(lines1, lines2):
+    """Map the lines of both files to small integer IDs (equal lines share an ID)."""
+    ids = {}
+    ids1 = [ids.setdefault(line, len(ids)) for line in lines1]
+    ids2 = [ids.setdefault(line, len(ids)) for line in lines2]
+    return ids1, ids2
+
+# Edit distance at which an exact Myers run always gives up: its cost grows with D²
+# (about half a million steps here)
+MYERS_MAX_EDITS = 1000
+
+def myers_distance(seq1, seq2, max_edits=None):
+    """
+    Number of inserted plus deleted items in a shortest edit script (Myers, 1986).
+    Runs in O((N+M)D) time and keeps only the current furthest-reaching
+    diagonal array, so memory stays O(N+M).
+    
+    Returns None when max_edits is given and the distance exceeds it.
+    """
+    # Common prefix and suffix never take part in the edit script
+    start = 0
+    end1, end2 = len(seq1), len(seq2)
+    while start < end1 and start < end2 and seq1[start] == seq2[start]:
+        start += 1
+    while end1 > start and end2 > start and seq1[end1 - 1] == seq2[end2 - 1]:
+        end1 -= 1
+        end2 -= 1
+    
+    n = end1 - start
+    m = end2 - start
+    if n == 0 or m == 0:
+        return n + m if max_edits is None or n + m <= max_edits else None
+    
+    if max_edits is not None and abs(n - m) > max_edits:
+        # Every edit script deletes or inserts at least the length difference
+        return None
+    limit = n + m if max_edits is None else min(n + m, max_edits)
+    offset = limit + 1
+    # A typed array keeps this at 8 bytes per diagonal even for huge inputs
+    furthest = array('q', [0]) * (2 * offset + 1)
+    for d in range(limit + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and furthest[offset + k - 1] < furthest[offset + k + 1]):
+                x = furthest[offset + k + 1]
+            else:
+                x = furthest[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and seq1[start + x] == seq2[start + y]:
+                x += 1
+                y += 1
+            furthest[offset + k] = x
+            if x >= n and y >= m:
+                return d
+    return None
+
+def multiset_matches(seq1, seq2):
+    """
+    Upper bound on the matched items of any alignment: an item matches at most
+    as often as it occurs in the other sequence (SequenceMatcher.quick_ratio).
+    """
+    counts2 = Counter(seq2)
+    return sum(min(count, counts2[item]) for item, count in Counter(seq1).items())
+
+def diff_stats_from_distance(distance, len1, len2):
+    """Turn a shortest edit distance into a comparison dict."""
+    matches = (len1 + len2 - distance) // 2
+    added = len2 - matches
+    removed = len1 - matches
+    
+    if len1 == 0 and len2 == 0:
+        similarity = 100.0
+    elif len1 == 0 or len2 == 0:
+        similarity = 0.0
+    else:
+        similarity = 2.0 * matches / (len1 + len2) * 100
+    
+    return {
+        "similarity": similarity,
+        "added": added,
+        "removed": removed,
+        "changed": max(added, removed)
+    }
+
+# Exact Myers attempts stop at about sqrt(MYERS_WORK_FACTOR * (N + M)) edits for
+# N + M items, so their D² cost stays within a few linear passes
+MYERS_WORK_FACTOR = 16
+
+# Most items per side that one anchoring step indexes, which bounds its memory
+ANCHOR_WINDOW = 1 << 16
+
+def myers_edit_budget(len1, len2):
+    """Largest edit distance worth an exact Myers run on sequences of these lengths."""
+    return min(MYERS_MAX_EDITS, math.isqrt(MYERS_WORK_FACTOR * (len1 + len2)))
+
+def _unique_anchors(seq1, lo1, hi1, seq2, lo2, hi2):
+    """
+    Patience anchors: the longest chain of (i, j) pairs, increasing on both sides,
+    of items that occur exactly once in seq1[lo1:hi1] and once in seq2[lo2:hi2].
+    """
+    positions1 = {}
+    for i in range(lo1, hi1):
+        item = seq1[i]
+        positions1[item] = -1 if item in positions1 else i
+    pairs = {}
+    for j in range(lo2, hi2):
+        item = seq2[j]
+        i = positions1.get(item, -1)
+        if i >= 0:
+            pairs[item] = None if item in pairs else (i, j)
+    pairs = sorted(pair for pair in pairs.values() if pair is not None)
+    
+    # Patience sorting: tails[n] ends the best chain of length n + 1 found so far
+    tails = []
+    tail_js = []
+    previous = [-1] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        length = bisect.bisect_left(tail_js, j)
+        if length:
+            previous[index] = tails[length - 1]
+        if length == len(tails):
+            tails.append(index)
+            tail_js.append(j)
+        else:
+            tails[length] = index
+            tail_js[length] = j
+    
+    chain = []
+    index = tails[-1] if tails else -1
+    while index >= 0:
+        chain.append(pairs[index])
+        index = previous[index]
+    chain.reverse()
+    return chain
+
+def _rarest_anchors(seq1, lo1, hi1, seq2, lo2, hi2):
+    """Pair up, in order, the occurrences of the least frequent item both ranges share."""
+    counts1 = Counter(seq1[lo1:hi1])
+    counts2 = Counter(seq2[lo2:hi2])
+    shared = counts1.keys() & counts2.keys()
+    if not shared:
+        return []
+    rarest = min(shared, key=lambda item: max(counts1[item], counts2[item]))
+    return list(zip(
+        (i for i in range(lo1, hi1) if seq1[i] == rarest),
+        (j for j in range(lo2, hi2) if seq2[j] == rarest)
+    ))
+
+def _first_shared(seq, lo, hi, items):
+    """Index of the first item of seq[lo:hi] found in items, or None."""
+    for index in range(lo, hi):
+        if seq[index] in items:
+            return index
+    return None
+
+def aligned_matches(seq1, seq2):
+    """
+    Matched items of an order-preserving alignment of two sequences.
+    
+    A pair within myers_edit_budget is settled by one exact Myers run. Otherwise
+    the sequences are split at anchors (patience diff): items unique to both
+    sides, or failing that the occurrences of the rarest shared item, and each
+    gap between anchors is settled the same way. Anchors are searched in windows
+    of ANCHOR_WINDOW items, so memory stays bounded for any input length.
+    
+    Returns:
+        (matches, exact): exact when the matches form a longest common
+        subsequence; anchored matches form some common subsequence, so they never
+        overstate the similarity, and they include the common prefix and suffix
+    """
+    matches = 0
+    exact = True
+    regions = [(0, len(seq1), 0, len(seq2))]
+    while regions:
+        lo1, hi1, lo2, hi2 = regions.pop()
+        while lo1 < hi1 and lo2 < hi2 and seq1[lo1] == seq2[lo2]:
+            lo1 += 1
+            lo2 += 1
+            matches += 1
+        while lo1 < hi1 and lo2 < hi2 and seq1[hi1 - 1] == seq2[hi2 - 1]:
+            hi1 -= 1
+            hi2 -= 1
+            matches += 1
+        n, m = hi1 - lo1, hi2 - lo2
+        if n == 0 or m == 0:
+            continue
+        
+        distance = myers_distance(seq1[lo1:hi1], seq2[lo2:hi2], myers_edit_budget(n, m))
+        if distance is not None:
+            matches += (n + m - distance) // 2
+            continue
+        exact = False
+        
+        end1, end2 = min(hi1, lo1 + ANCHOR_WINDOW), min(hi2, lo2 + ANCHOR_WINDOW)
+        anchors = (_unique_anchors(seq1, lo1, end1, seq2, lo2, end2)
+                   or _rarest_anchors(seq1, lo1, end1, seq2, lo2, end2))
+        if anchors:
+            matches += len(anchors)
+            # The gaps go on top of the rest, so only one window's gaps are pending at a time
+            regions.append((anchors[-1][0] + 1, hi1, anchors[-1][1] + 1, hi2))
+            for i, j in anchors:
+                if i > lo1 and j > lo2:
+                    regions.append((lo1, i, lo2, j))
+                lo1, lo2 = i + 1, j + 1
+        elif end1 < hi1 or end2 < hi2:
+            # The windows share nothing: resynchronise on the nearest item of one
+            # window found further along the other side, treating what lies
+            # before it as edits
+            j = _first_shared(seq2, end2, hi2, set(seq1[lo1:end1]))
+            i = _first_shared(seq1, end1, hi1, set(seq2[lo2:end2]))
+            if j is not None and (i is None or j - lo2 <= i - lo1):
+                regions.append((lo1, hi1, j, hi2))
+            elif i is not None:
+                regions.append((i, hi1, lo2, hi2))
+            else:
+                regions.append((end1, hi1, end2, hi2))
+        # Ranges with no item in common are all edits
+    return matches, exact
+
+def compute_myers_diff(lines1, lines2):
+    """
+    Diff two line lists with the Myers backend (see aligned_matches). Pairs past
+    the edit budget are aligned by patience anchoring instead of exactly.
+    """
+    ids1, ids2 = intern_lines(lines1, lines2)
+    matches, _ = aligned_matches(ids1, ids2)
+    return diff_stats_from_distance(len(ids1) + len(ids2) - 2 * matches, len(ids1), len(ids2))
+
+# Tiers of tiered_diff, cheapest first
+SIMILARITY_TIERS = ("length", "line_set", "multiset", "prefix_suffix", "exact")
+
+def _bound_ratio(matches, len1, len2):
+    return 2.0 * matches / (len1 + len2) * 100
+
+def tiered_diff(lines1, lines2, threshold, exact_diff, lcs_exact=False):
+    """
+    Decide whether two line lists are at least `threshold` percent similar,
+    running the exact diff only when cheap bounds on the matched line count
+    straddle the threshold.
+    
+    Upper bounds (valid for every backend, as matched lines never exceed them):
+        length    - each match pairs one line of each file (real_quick_ratio)
+        line_set  - only lines whose text occurs in the other file can match
+        multiset  - a line matches at most as often as it occurs in the other
+                    file (quick_ratio)
+    Lower bound (only when lcs_exact, i.e. the backend's alignment always keeps
+    the common leading and trailing lines; difflib's greedy matching may not):
+        prefix_suffix - the common leading and trailing lines always align
+    
+    Args:
+        exact_diff: Backend diff function used when no bound decides
+        lcs_exact: Whether exact_diff always matches the common prefix and suffix (myers)
+    
+    Returns:
+        (comparison dict, tier name); a pair decided by a bound reports the
+        bound itself as its similarity and derives its line counts from it
+    """
+    len1, len2 = len(lines1), len(lines2)
+    if len1 == 0 or len2 == 0:
+        return exact_diff(lines1, lines2), "exact"
+    
+    def bounded(matches):
+        return diff_stats_from_distance(len1 + len2 - 2 * matches, len1, len2)
+    
+    upper = min(len1, len2)
+    if _bound_ratio(upper, len1, len2) < threshold:
+        return bounded(upper), "length"
+    
+    set1, set2 = set(lines1), set(lines2)
+    upper = min(
+        sum(1 for line in lines1 if line in set2),
+        sum(1 for line in lines2 if line in set1)
+    )
+    if _bound_ratio(upper, len1, len2) < threshold:
+        return bounded(upper), "line_set"
+    
+    upper = multiset_matches(lines1, lines2)
+    if _bound_ratio(upper, len1, len2) < threshold:
+        return bounded(upper), "multiset"
+    
+    if lcs_exact:
+        limit = min(len1, len2)
+        prefix = 0
+        while prefix < limit and lines1[prefix] == lines2[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and lines1[-1 - suffix] == lines2[-1 - suffix]:
+            suffix += 1
+        if _bound_ratio(prefix + suffix, len1, len2) >= threshold:
+            return bounded(prefix + suffix), "prefix_suffix"
+    
+    return exact_diff(lines1, lines2), "exact"
+
+DIFF_ALGORITHMS = {
+    "difflib": compute_diff,
+    "myers": compute_myers_diff
+}
+
+def get_diff_function(algorithm):
+    """Look up a diff backend by name."""
+    if algorithm not in DIFF_ALGORITHMS:
+        raise ValueError(
+            f"Unknown diff algorithm '{algorithm}'. Choose from: {', '.join(DIFF_ALGORITHMS)}"
+        )
+    return DIFF_ALGORITHMS[algorithm]
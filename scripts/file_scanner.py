@@ -0,0 +1,202 @@
+"""
+Fast directory scanner used to collect the files of a version.
+Walks the tree with os.scandir, prunes ignored directories before descending,
+honours .gitignore-style patterns, and keeps the stat data of every file.
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+DEFAULT_EXTENSIONS = frozenset([
+    ".py", ".java", ".js", ".cpp", ".c", ".json", ".yaml", ".yml", ".txt", ".md"
+])
+
+# Directories that never hold code worth comparing
+DEFAULT_IGNORE_PATTERNS = [
+    ".git/", ".hg/", ".svn/",
+    "node_modules/", "bower_components/", "vendor/", "third_party/",
+    "build/", "dist/", "out/", "target/", ".next/",
+    "__pycache__/", ".venv/", "venv/", ".tox/", ".mypy_cache/", ".pytest_cache/"
+]
+
+@dataclass
+class ScannedFile:
+    path: Path
+    size: int
+    mtime_ns: int
+
+def _translate_pattern(pattern):
+    """Translate one gitignore glob into a regular expression fragment."""
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            regex += "/.*"
+            i += 3
+        elif pattern[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += "[^/]"
+            i += 1
+        elif pattern[i] == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                regex += re.escape(pattern[i])
+                i += 1
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                regex += "[" + body.replace("\\", "\\\\") + "]"
+                i = end + 1
+        elif pattern[i] == "\\" and i + 1 < len(pattern):
+            regex += re.escape(pattern[i + 1])
+            i += 2
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return regex
+
+class IgnoreRules:
+    """An ordered list of gitignore-style rules; the last matching rule wins."""
+    
+    def __init__(self, patterns=(), base=""):
+        self.rules = []
+        self.add_patterns(patterns, base)
+    
+    def add_patterns(self, patterns, base=""):
+        """
+        Add patterns that are relative to the directory `base` (posix, "" = root).
+        """
+        prefix = re.escape(base + "/") if base else ""
+        for raw in patterns:
+            line = raw.rstrip("\r\n")
+            if not line.endswith("\\ "):
+                line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            
+            # A slash anywhere but the end anchors the pattern to `base`
+            anchored = "/" in line
+            regex = _translate_pattern(line.lstrip("/"))
+            if not anchored:
+                regex = "(?:.*/)?" + regex
+            self.rules.append((re.compile(prefix + regex + "$"), negate, dir_only))
+    
+    def extended(self, gitignore_path, base):
+        """Return a copy of these rules plus the patterns of a .gitignore file."""
+        child = IgnoreRules()
+        child.rules = list(self.rules)
+        try:
+            with open(gitignore_path, 'r', encoding='utf-8', errors='ignore') as f:
+                child.add_patterns(f.readlines(), base)
+        except OSError:
+            return self
+        return child
+    
+    def is_ignored(self, rel_path, is_dir=False):
+        """Check a posix path relative to the scan root."""
+        ignored = False
+        for regex, negate, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                ignored = not negate
+        return ignored
+
+def matches_extension(filename, extensions):
+    """Set-based equivalent of any(filename.endswith(ext) for ext in extensions)."""
+    dot = filename.find(".")
+    while dot != -1:
+        if filename[dot:] in extensions:
+            return True
+        dot = filename.find(".", dot + 1)
+    return False
+
+def in_ignored_dir(rel_path, rules, ignored_dirs):
+    """Check every parent directory of a posix path against the ignore rules (memoized in ignored_dirs)."""
+    parts = rel_path.split("/")[:-1]
+    for depth in range(1, len(parts) + 1):
+        directory = "/".join(parts[:depth])
+        if directory not in ignored_dirs:
+            ignored_dirs[directory] = rules.is_ignored(directory, is_dir=True)
+        if ignored_dirs[directory]:
+            return True
+    return False
+
+def scan_directory(directory, extensions=None, ignore_patterns=None, use_gitignore=True):
+    """
+    Collect matching files below a directory.
+    
+    Args:
+        directory: Root of the version to scan
+        extensions: Iterable of suffixes to include (defaults to DEFAULT_EXTENSIONS)
+        ignore_patterns: gitignore-style patterns (defaults to DEFAULT_IGNORE_PATTERNS)
+        use_gitignore: Also honour .gitignore files found in the tree
+    
+    Returns:
+        Dict mapping relative path -> ScannedFile
+    """
+    root = Path(directory)
+    extensions = DEFAULT_EXTENSIONS if extensions is None else frozenset(extensions)
+    if ignore_patterns is None:
+        ignore_patterns = DEFAULT_IGNORE_PATTERNS
+    
+    files = {}
+    stack = [("", IgnoreRules(ignore_patterns))]
+    while stack:
+        rel_dir, rules = stack.pop()
+        dir_path = os.path.join(root, rel_dir) if rel_dir else str(root)
+        if use_gitignore:
+            gitignore_path = os.path.join(dir_path, ".gitignore")
+            if os.path.isfile(gitignore_path):
+                rules = rules.extended(gitignore_path, rel_dir)
+        
+        try:
+            entries = os.scandir(dir_path)
+        except OSError:
+            continue
+        
+        with entries:
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                try:
+                    if entry.is_dir():
+                        # Like os.walk, don't follow directory symlinks
+                        if not entry.is_symlink() and not rules.is_ignored(rel_path, is_dir=True):
+                            stack.append((rel_path, rules))
+                        continue
+                    if not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+                
+                if not (matches_extension(entry.name, extensions) or entry.name == "README"):
+                    continue
+                if rules.is_ignored(rel_path):
+                    continue
+                
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files[rel_path.replace("/", os.sep)] = ScannedFile(
+                    path=Path(entry.path),
+                    size=stat.st_size,
+                    mtime_ns=stat.st_mtime_ns
+                )
+    return files
@@ -0,0 +1,135 @@
+"""
+Git-backed version source.
+Reads a version straight from the object database of a local repository
+(git ls-tree / git cat-file --batch), so no tree is ever checked out or copied.
+"""
+
+import atexit
+import os
+import subprocess
+from dataclasses import dataclass, field
+from file_scanner import DEFAULT_EXTENSIONS, DEFAULT_IGNORE_PATTERNS, IgnoreRules, in_ignored_dir, matches_extension
+
+class GitBatchReader:
+    """A long-running `git cat-file --batch` process for reading blobs."""
+    
+    def __init__(self, repo_path):
+        self.repo_path = repo_path
+        self.process = subprocess.Popen(
+            ["git", "-C", str(repo_path), "cat-file", "--batch"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE
+        )
+    
+    def read(self, sha):
+        """Return the raw bytes of one object."""
+        self.process.stdin.write(sha.encode() + b"\n")
+        self.process.stdin.flush()
+        header = self.process.stdout.readline().split()
+        if len(header) < 3 or header[1] == b"missing":
+            raise KeyError(f"Git object {sha} not found in {self.repo_path}")
+        size = int(header[2])
+        data = self.process.stdout.read(size)
+        self.process.stdout.read(1)  # trailing newline after the object
+        return data
+    
+    def close(self):
+        """Stop the git process."""
+        if self.process.poll() is None:
+            self.process.stdin.close()
+            self.process.wait()
+
+# One reader per repository and process; worker processes open their own
+_batch_readers = {}
+
+def get_batch_reader(repo_path):
+    """Get (or start) the cat-file reader for a repository in this process."""
+    key = str(repo_path)
+    if key not in _batch_readers:
+        _batch_readers[key] = GitBatchReader(key)
+    return _batch_readers[key]
+
+@atexit.register
+def _close_batch_readers():
+    for reader in _batch_readers.values():
+        reader.close()
+    _batch_readers.clear()
+
+# A forked worker must not share the parent's cat-file pipes
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_batch_readers.clear)
+
+@dataclass(frozen=True)
+class GitBlob:
+    repo_path: str
+    sha: str
+    size: int
+    # Path in the tree; blobs with the same content are still equal
+    name: str = field(default="", compare=False)
+    
+    @property
+    def digest(self):
+        """Blob SHAs identify content, so they double as the content hash."""
+        return self.sha
+    
+    def read_bytes(self):
+        """Read the blob through the shared cat-file process."""
+        return get_batch_reader(self.repo_path).read(self.sha)
+    
+    def __str__(self):
+        return f"git:{self.sha[:12]}"
+
+class GitTreeSource:
+    """One version of a project, identified by a ref in a local git repository."""
+    
+    def __init__(self, repo_path, ref):
+        """
+        Args:
+            repo_path: Path of a local clone (bare or not)
+            ref: Tag, branch, or commit to read
+        """
+        self.repo_path = str(repo_path)
+        self.ref = ref
+    
+    def __repr__(self):
+        return f"GitTreeSource({self.repo_path!r}, {self.ref!r})"
+    
+    def __str__(self):
+        return f"{self.repo_path}@{self.ref}"
+    
+    def list_files(self, extensions=None, ignore_patterns=None):
+        """
+        List the blobs of the tree with the same filters as the directory scanner.
+        
+        Returns:
+            Dict mapping relative path -> GitBlob
+        """
+        extensions = DEFAULT_EXTENSIONS if extensions is None else frozenset(extensions)
+        rules = IgnoreRules(DEFAULT_IGNORE_PATTERNS if ignore_patterns is None else ignore_patterns)
+        
+        output = subprocess.run(
+            ["git", "-C", self.repo_path, "ls-tree", "-r", "-l", "-z", self.ref],
+            check=True,
+            capture_output=True
+        ).stdout
+        
+        files = {}
+        ignored_dirs = {}
+        for record in output.split(b"\0"):
+            if not record:
+                continue
+            meta, path = record.split(b"\t", 1)
+            mode, obj_type, sha, size = meta.split()
+            # Skip submodules and symlinks, which have no file content to compare
+            if obj_type != b"blob" or mode == b"120000":
+                continue
+            
+            rel_path = path.decode("utf-8", errors="surrogateescape")
+            name = rel_path.rsplit("/", 1)[-1]
+            if not (matches_extension(name, extensions) or name == "README"):
+                continue
+            if in_ignored_dir(rel_path, rules, ignored_dirs) or rules.is_ignored(rel_path):
+                continue
+            
+            files[rel_path.replace("/", os.sep)] = GitBlob(self.repo_path, sha.decode(), int(size), rel_path)
+        return files
@@ -0,0 +1,166 @@
+"""
+Optional run instrumentation.
+A Profiler records wall and CPU time per pipeline stage (scan, read, hash,
+diff, report, chart), a latency histogram of per-file diffs, and the slowest
+files. When profiling is off, NullProfiler takes its place and every hook is
+a no-op, so the hot paths pay one method call and nothing else.
+
+Worker processes fill their own Profiler and send it back with their results;
+merged stage times therefore add up the work of all processes.
+"""
+
+import heapq
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+# Upper bounds (seconds) of the per-file diff latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, float("inf"))
+METRIC_PREFIX = "version_compare"
+
+class NullProfiler:
+    """Stand-in used when profiling is disabled."""
+    
+    enabled = False
+    _context = nullcontext()
+    
+    def stage(self, name):
+        return self._context
+    
+    def record_file(self, name, seconds, size):
+        pass
+    
+    def child(self):
+        return None
+
+NULL_PROFILER = NullProfiler()
+
+class Profiler:
+    enabled = True
+    
+    def __init__(self, slowest_count=10):
+        """
+        Args:
+            slowest_count: How many of the slowest files to keep
+        """
+        self.slowest_count = slowest_count
+        self.started = time.perf_counter()
+        self.stages = {}  # name -> [wall seconds, cpu seconds, calls]
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS)
+        self.file_count = 0
+        self.file_seconds = 0.0
+        self.slowest = []  # min-heap of (seconds, name, size)
+    
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block under a stage name (repeated blocks accumulate)."""
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            totals = self.stages.setdefault(name, [0.0, 0.0, 0])
+            totals[0] += time.perf_counter() - wall
+            totals[1] += time.process_time() - cpu
+            totals[2] += 1
+    
+    def record_file(self, name, seconds, size):
+        """Record the diff latency of one file pair (size = bytes of both files)."""
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[index] += 1
+                break
+        self.file_count += 1
+        self.file_seconds += seconds
+        entry = (seconds, str(name), size)
+        if len(self.slowest) < self.slowest_count:
+            heapq.heappush(self.slowest, entry)
+        else:
+            heapq.heappushpop(self.slowest, entry)
+    
+    def child(self):
+        """An empty profiler for a worker process to fill and send back."""
+        return Profiler(self.slowest_count)
+    
+    def merge(self, other):
+        """Add the measurements of a worker's profiler to this one."""
+        for name, (wall, cpu, calls) in other.stages.items():
+            totals = self.stages.setdefault(name, [0.0, 0.0, 0])
+            totals[0] += wall
+            totals[1] += cpu
+            totals[2] += calls
+        self.bucket_counts = [a + b for a, b in zip(self.bucket_counts, other.bucket_counts)]
+        self.file_count += other.file_count
+        self.file_seconds += other.file_seconds
+        for entry in other.slowest:
+            if len(self.slowest) < self.slowest_count:
+                heapq.heappush(self.slowest, entry)
+            else:
+                heapq.heappushpop(self.slowest, entry)
+    
+    def to_dict(self):
+        """All measurements as a JSON-ready dict."""
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(LATENCY_BUCKETS, self.bucket_counts):
+            cumulative += count
+            buckets["+Inf" if bound == float("inf") else f"{bound:g}"] = cumulative
+        return {
+            "elapsed_seconds": time.perf_counter() - self.started,
+            "stages": {
+                name: {"wall_seconds": wall, "cpu_seconds": cpu, "calls": calls}
+                for name, (wall, cpu, calls) in self.stages.items()
+            },
+            "file_diff_latency": {
+                "count": self.file_count,
+                "sum_seconds": self.file_seconds,
+                "buckets": buckets
+            },
+            "slowest_files": [
+                {"file": name, "seconds": seconds, "bytes": size}
+                for seconds, name, size in sorted(self.slowest, reverse=True)
+            ]
+        }
+    
+    def write_json(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return str(path)
+    
+    def write_prometheus(self, path):
+        """Write the measurements in the Prometheus text exposition format."""
+        data = self.to_dict()
+        lines = [
+            f"# HELP {METRIC_PREFIX}_elapsed_seconds Wall time since profiling started",
+            f"# TYPE {METRIC_PREFIX}_elapsed_seconds gauge",
+            f"{METRIC_PREFIX}_elapsed_seconds {data['elapsed_seconds']:.6f}"
+        ]
+        for metric, key, description in (
+            ("stage_wall_seconds", "wall_seconds", "Wall time per stage, summed over processes"),
+            ("stage_cpu_seconds", "cpu_seconds", "CPU time per stage, summed over processes"),
+            ("stage_calls", "calls", "Timed blocks per stage")
+        ):
+            lines.append(f"# HELP {METRIC_PREFIX}_{metric} {description}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{metric} gauge")
+            for name, stage in data["stages"].items():
+                lines.append(f'{METRIC_PREFIX}_{metric}{{stage="{name}"}} {stage[key]:g}')
+        
+        latency = data["file_diff_latency"]
+        lines.append(f"# HELP {METRIC_PREFIX}_file_diff_seconds Read and diff time per file pair")
+        lines.append(f"# TYPE {METRIC_PREFIX}_file_diff_seconds histogram")
+        for bound, count in latency["buckets"].items():
+            lines.append(f'{METRIC_PREFIX}_file_diff_seconds_bucket{{le="{bound}"}} {count}')
+        lines.append(f"{METRIC_PREFIX}_file_diff_seconds_sum {latency['sum_seconds']:.6f}")
+        lines.append(f"{METRIC_PREFIX}_file_diff_seconds_count {latency['count']}")
+        
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(path.name + ".tmp")
+        with open(temp_path, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        # Atomic, so a node exporter's textfile collector never reads half a file
+        os.replace(temp_path, path)
+        return str(path)
@@ -1,63 +1,309 @@
 """
 Main orchestrator for the version comparison analysis tool.
 Runs the complete pipeline and generates all outputs.
+
+Each stage imports what it needs when it runs, so a comparison-only or
+report-only run never pays for matplotlib.
+
+Examples:
+    python scripts/main.py versions/flask_v2.2.0 versions/flask_v3.0.0
+    python scripts/main.py flask-2.2.0.tar.gz flask-3.0.0.zip
+    python scripts/main.py --git ../flask 2.2.0 3.0.0 --workers 0 --json
+    python scripts/main.py --git ../flask 2.0.0 2.2.0 3.0.0 --matrix
+    python scripts/main.py old/ new/ --profile reports/profile.json --prometheus metrics.prom
+    python scripts/main.py --setup-demo
 """
 
+import argparse
+import contextlib
+import json
+import os
+import subprocess
 import sys
 from pathlib import Path
-from version_comparator import VersionComparator
-from report_generator import ReportGenerator
-from visualizer import VisualizationGenerator
-from setup_versions import setup_demo_data
+from normalization import NORMALIZATION_MODES
 
-def main():
-    print("\n" + "="*70)
-    print(" "*15 + "VERSION COMPARISON ANALYSIS TOOL")
-    print("="*70)
+STAGES = ("compare", "reports", "charts")
+REPORT_FORMAT_CHOICES = ("json", "csv", "markdown")
+DEMO_VERSIONS = ("versions/demo_v1", "versions/demo_v2")
+
+# Options of the two-version pipeline that --matrix would silently ignore
+PIPELINE_ONLY_OPTIONS = (
+    "setup_demo", "stages", "formats", "no_renames", "rename_threshold", "similarity_threshold",
+    "structural", "manifest", "max_listed", "chart_format", "dpi", "profile", "prometheus"
+)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare two versions of a project and report what changed."
+    )
+    parser.add_argument("versions", nargs="*", metavar="VERSION",
+                        help="old and new version directories or zip/tar archives, or git refs with --git "
+                             f"(default: {DEMO_VERSIONS[0]} {DEMO_VERSIONS[1]}); "
+                             "any number of versions with --matrix")
+    parser.add_argument("--git", metavar="REPO",
+                        help="read both versions as refs of this local git repository")
+    parser.add_argument("--matrix", action="store_true",
+                        help="compare every pair of the given versions and write a similarity matrix")
+    parser.add_argument("--setup-demo", action="store_true",
+                        help="(re)create the demo versions before comparing them")
+    parser.add_argument("-o", "--output-dir", default="reports",
+                        help="directory for reports and charts (default: reports)")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES),
+                        help="stages to run (default: all); without 'compare', reports "
+                             "and charts are built from the JSON report in the output directory")
+    parser.add_argument("--formats", nargs="+", choices=REPORT_FORMAT_CHOICES,
+                        default=list(REPORT_FORMAT_CHOICES),
+                        help="report formats to write; without markdown, reports are streamed "
+                             "while comparing, so per-file results are not kept in memory")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="worker processes for diffing and charts (0 = all CPUs)")
+    parser.add_argument("--algorithm", choices=("difflib", "myers"), default="difflib",
+                        help="diff backend (default: difflib)")
+    parser.add_argument("--no-renames", action="store_true",
+                        help="report moved files as deleted + added instead of detecting renames")
+    parser.add_argument("--rename-threshold", type=float, default=50.0,
+                        help="minimum similarity (%%) for a moved file to count as renamed (default: 50)")
+    parser.add_argument("--similarity-threshold", type=float, metavar="PCT",
+                        help="only decide whether each modified file is above or below PCT%% "
+                             "similarity, skipping the exact diff when cheap bounds settle it")
+    parser.add_argument("--normalize", nargs="+", metavar="MODE", default=[],
+                        choices=NORMALIZATION_MODES + ("all",),
+                        help="ignore formatting when diffing: " + ", ".join(NORMALIZATION_MODES)
+                             + " or all (formatting-only changes then count as unchanged)")
+    parser.add_argument("--structural", action="store_true",
+                        help="also report which functions and classes changed in modified Python files")
+    parser.add_argument("--cache-dir", help="reuse per-file results from a cache in this directory")
+    parser.add_argument("--manifest", help="manifest file for incremental re-comparison")
+    parser.add_argument("--max-listed", type=int,
+                        help="cap on files listed per section of the markdown report")
+    parser.add_argument("--chart-format", choices=("png", "svg"), default="png")
+    parser.add_argument("--dpi", type=int, default=100, help="resolution of PNG charts")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="write per-stage wall/CPU times, the per-file diff latency "
+                             "histogram and the slowest files to this JSON file")
+    parser.add_argument("--prometheus", metavar="FILE",
+                        help="write the same measurements in Prometheus text format")
     
-    # Step 1: Setup demo data
-    print("\n[Step 1/4] Setting up demo versions...")
-    setup_demo_data()
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument("-q", "--quiet", action="store_true",
+                        help="print nothing except errors")
+    output.add_argument("--json", action="store_true",
+                        help="print only a JSON document with the summary and output paths")
+    args = parser.parse_args(argv)
+    if "all" in args.normalize:
+        args.normalize = list(NORMALIZATION_MODES)
+    
+    if args.matrix:
+        if len(args.versions) < 2:
+            parser.error("--matrix needs at least two versions")
+        ignored = ["--" + dest.replace("_", "-") for dest in PIPELINE_ONLY_OPTIONS
+                   if getattr(args, dest) != parser.get_default(dest)]
+        if ignored:
+            parser.error(f"not supported with --matrix: {', '.join(ignored)}")
+    elif not args.versions:
+        args.versions = list(DEMO_VERSIONS)
+    elif len(args.versions) != 2:
+        parser.error("expected an old and a new version (use --matrix for more)")
+    args.old, args.new = args.versions[0], args.versions[-1]
+    return args
+
+def resolve_versions(args):
+    """Turn the positional arguments into paths, archive sources or git version sources."""
+    if args.git:
+        from git_source import GitTreeSource
+        return [GitTreeSource(args.git, ref) for ref in args.versions]
+    
+    versions = []
+    for version in args.versions:
+        if Path(version).is_dir():
+            versions.append(version)
+            continue
+        from archive_source import ArchiveSource, is_archive
+        if is_archive(version):
+            versions.append(ArchiveSource(version))
+            continue
+        hint = " (run with --setup-demo to create the demo versions)" if version in DEMO_VERSIONS else ""
+        raise ValueError(f"Version directory or archive not found: {version}{hint}")
+    return versions
+
+def open_cache(args):
+    """The comparison cache selected on the command line, if any."""
+    if not args.cache_dir:
+        return None
+    from comparison_cache import ComparisonCache
+    return ComparisonCache(args.cache_dir)
+
+def open_profiler(args):
+    """A Profiler when profiling output was requested, otherwise the no-op stand-in."""
+    from instrumentation import NULL_PROFILER, Profiler
+    if args.profile or args.prometheus:
+        return Profiler()
+    return NULL_PROFILER
+
+def write_profile(args, profiler):
+    """Write the requested profiling outputs; returns their paths."""
+    profile_paths = {}
+    if args.profile:
+        profile_paths["json"] = profiler.write_json(args.profile)
+    if args.prometheus:
+        profile_paths["prometheus"] = profiler.write_prometheus(args.prometheus)
+    
+    data = profiler.to_dict()
+    print("\n⏱️  Stage times (wall / CPU, summed over processes):")
+    for name, stage in data["stages"].items():
+        print(f"   - {name}: {stage['wall_seconds']:.2f}s / {stage['cpu_seconds']:.2f}s")
+    for slowest in data["slowest_files"][:3]:
+        print(f"   - slow: {slowest['file']} ({slowest['seconds'] * 1000:.0f} ms, {slowest['bytes']} bytes)")
+    return profile_paths
+
+def note_retest_files(records, retest):
+    """Pass records through, noting the files testers should look at."""
+    for fc in records:
+        if fc.status != "unchanged":
+            retest.append((fc.filename, fc.status))
+        yield fc
+
+def run_compare_stage(args, step, total, profiler, stream_formats=()):
+    """
+    Compare the two versions; returns (results, file_comparisons, report_paths).
+    With stream_formats, those reports are written while the comparison runs,
+    no per-file records are kept and file_comparisons is None.
+    """
+    from version_comparator import VersionComparator
+    
+    if args.setup_demo:
+        from setup_versions import setup_demo_data
+        print(f"\n[Step {step}/{total}] Setting up demo versions...")
+        setup_demo_data()
+        step += 1
+    
+    version1, version2 = resolve_versions(args)
+    cache = open_cache(args)
     
-    # Step 2: Run comparison
-    print("\n[Step 2/4] Running version comparison...")
     comparator = VersionComparator(
-        "versions/demo_v1",
-        "versions/demo_v2"
+        version1,
+        version2,
+        workers=args.workers,
+        cache=cache,
+        algorithm=args.algorithm,
+        manifest_path=args.manifest,
+        detect_renames=not args.no_renames,
+        rename_threshold=args.rename_threshold,
+        similarity_threshold=args.similarity_threshold,
+        structural=args.structural,
+        normalize=args.normalize,
+        profiler=profiler
     )
-    results = comparator.run_comparison()
+    report_paths = {}
+    retest = []
+    try:
+        if stream_formats:
+            from report_generator import stream_reports
+            print(f"\n[Step {step}/{total}] Running version comparison and streaming reports...")
+            # Comparing and writing interleave here, so there is no separate "report" stage time
+            report_paths = stream_reports(
+                note_retest_files(comparator.iter_comparisons(), retest),
+                output_dir=args.output_dir,
+                formats=stream_formats,
+                summary=lambda: comparator.results
+            )
+            results, file_comparisons = comparator.results, None
+        else:
+            print(f"\n[Step {step}/{total}] Running version comparison...")
+            results = comparator.run_comparison()
+            file_comparisons = comparator.file_comparisons
+            retest = [(fc.filename, fc.status) for fc in comparator.get_modified_files()]
+    finally:
+        if cache is not None:
+            cache.close()
     
     # Print summary
     print(comparator.get_summary())
     
-    # Get modified files for testers
-    modified_files = comparator.get_modified_files()
+    # Modified files for testers
     print("\n🎯 Files Requiring Re-testing:")
-    for fc in modified_files:
-        if fc.status != "unchanged":
-            print(f"   - {fc.filename} ({fc.status})")
+    for filename, status in retest:
+        print(f"   - {filename} ({status})")
     
-    # Step 3: Generate reports
-    print("\n[Step 3/4] Generating reports...")
-    report_gen = ReportGenerator(results, comparator.file_comparisons)
-    report_paths = report_gen.generate_all_reports()
+    return results, file_comparisons, report_paths
+
+def run_pipeline(args):
+    """
+    Run the selected stages with progress output on stdout.
+    
+    Returns:
+        Dict with the summary and the paths of every file written
+    """
+    stages = [stage for stage in STAGES if stage in args.stages]
+    # Without markdown, which needs every record at once, reports are written
+    # while comparing instead of from the records kept in memory afterwards
+    stream = "compare" in stages and "reports" in stages and "markdown" not in args.formats
+    total = len(stages) + ("compare" in stages and args.setup_demo) - stream
+    step = 1
+    output_dir = Path(args.output_dir)
+    profiler = open_profiler(args)
+    
+    print("\n" + "="*70)
+    print(" "*15 + "VERSION COMPARISON ANALYSIS TOOL")
+    print("="*70)
     
-    # Step 4: Generate visualizations
-    print("\n[Step 4/4] Generating visualizations...")
-    visualizer = VisualizationGenerator(results)
-    chart_paths = visualizer.generate_all_visualizations()
+    report_paths = {}
+    if "compare" in stages:
+        results, file_comparisons, report_paths = run_compare_stage(
+            args, step, total, profiler, stream_formats=args.formats if stream else ()
+        )
+        step += 1 + args.setup_demo
+    else:
+        from report_generator import REPORT_FORMATS, load_json_report
+        saved_report = output_dir / REPORT_FORMATS["json"]
+        print(f"\n📂 Loading previous comparison from {saved_report}")
+        try:
+            results, file_comparisons = load_json_report(saved_report)
+        except (OSError, ValueError, KeyError) as e:
+            raise ValueError(f"Could not load {saved_report} ({e}); run the 'compare' stage first")
+    
+    if "reports" in stages and not stream:
+        from report_generator import ReportGenerator
+        print(f"\n[Step {step}/{total}] Generating reports...")
+        report_gen = ReportGenerator(results, file_comparisons)
+        with profiler.stage("report"):
+            report_paths = report_gen.generate_all_reports(
+                max_listed=args.max_listed,
+                output_dir=output_dir,
+                formats=args.formats
+            )
+        step += 1
+    
+    chart_paths = {}
+    if "charts" in stages:
+        from visualizer import VisualizationGenerator
+        print(f"\n[Step {step}/{total}] Generating visualizations...")
+        visualizer = VisualizationGenerator(
+            results,
+            output_dir / "visualizations",
+            image_format=args.chart_format,
+            dpi=args.dpi,
+            workers=args.workers or None
+        )
+        with profiler.stage("chart"):
+            chart_paths = visualizer.generate_all_visualizations()
+    
+    profile_paths = write_profile(args, profiler) if profiler.enabled else {}
     
     # Final summary
     print("\n" + "="*70)
     print("✅ ANALYSIS COMPLETE!")
     print("="*70)
-    print("\n📋 Generated Reports:")
-    for format_type, path in report_paths.items():
-        print(f"   - {format_type.upper()}: {path}")
+    if report_paths:
+        print("\n📋 Generated Reports:")
+        for format_type, path in report_paths.items():
+            print(f"   - {format_type.upper()}: {path}")
     
-    print("\n📊 Generated Visualizations:")
-    for chart_name, path in chart_paths.items():
-        print(f"   - {chart_name.replace('_', ' ').title()}: {path}")
+    if chart_paths:
+        print("\n📊 Generated Visualizations:")
+        for chart_name, path in chart_paths.items():
+            print(f"   - {chart_name.replace('_', ' ').title()}: {path}")
     
     print("\n🎯 KEY METRICS FOR GRADING:")
     print(f"   • Code Similarity: {results['average_similarity']:.1f}%")
@@ -65,8 +311,68 @@ def main():
     print(f"   • Files to Re-test: {results['modified_count']} out of {results['total_files']} ({results['modified_percentage']:.1f}%)")
     print(f"   • Testing Time Savings: {results['unchanged_percentage']:.1f}% (skip these files)")
     
-    print("\n📁 Output Directory: ./reports/")
+    print(f"\n📁 Output Directory: {output_dir}/")
     print("="*70 + "\n")
+    
+    return {
+        "old": str(args.old),
+        "new": str(args.new),
+        "summary": results,
+        "reports": report_paths,
+        "charts": chart_paths,
+        "profile": profile_paths
+    }
+
+def run_matrix(args):
+    """Compare every pair of versions and write the similarity matrix reports."""
+    from multi_version import MultiVersionComparator
+    from report_generator import generate_matrix_reports
+    
+    print("\n" + "="*70)
+    print(" "*15 + "MULTI-VERSION COMPARISON MATRIX")
+    print("="*70)
+    
+    cache = open_cache(args)
+    comparator = MultiVersionComparator(
+        resolve_versions(args),
+        labels=args.versions,
+        workers=args.workers,
+        cache=cache,
+        algorithm=args.algorithm,
+        normalize=args.normalize
+    )
+    try:
+        matrix_results = comparator.run_comparison()
+    finally:
+        if cache is not None:
+            cache.close()
+    report_paths = generate_matrix_reports(matrix_results, args.output_dir)
+    
+    print("\n📈 Average similarity of common files (%):")
+    width = max(len(label) for label in args.versions)
+    for label, row in zip(args.versions, matrix_results["matrix"]):
+        print(f"   {label:<{width}}  " + "  ".join(f"{value:6.1f}" for value in row))
+    print()
+    
+    return dict(matrix_results, reports=report_paths)
+
+def main(argv=None):
+    args = parse_args(argv)
+    
+    # Progress output goes nowhere in --quiet and --json modes
+    silent = args.quiet or args.json
+    try:
+        with open(os.devnull, 'w') as devnull, \
+                contextlib.redirect_stdout(devnull if silent else sys.stdout):
+            outcome = run_matrix(args) if args.matrix else run_pipeline(args)
+    except (ValueError, OSError, subprocess.CalledProcessError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    
+    if args.json:
+        json.dump(outcome, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    return 0
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
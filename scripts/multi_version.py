@@ -0,0 +1,218 @@
+"""
+Multi-version comparison.
+Compares every pair of N versions (e.g. the last 20 release tags) while scanning
+and hashing each version only once. Files are addressed by content hash, so a
+pair of contents that appears between several versions is diffed once, and a
+worker decodes each content at most once while it stays in its line cache.
+Files are matched by path only; rename detection is not applied between pairs.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from pathlib import Path
+from archive_source import align_archive_roots
+from comparison_store import FileComparisonStore
+from large_files import compare_large_files
+from version_comparator import FileComparison, IDENTICAL_COMPARISON, VersionComparator, is_version_source
+
+# Decoded contents kept per process, keyed by content hash, up to this many file bytes
+LINE_CACHE_BYTES = 256 * 1024 * 1024
+_line_cache = OrderedDict()
+_line_cache_bytes = 0
+
+def _cached_lines(comparator, digest, file_ref):
+    """Lines (or normalized line IDs) of a file, decoded once per process and content hash (LRU)."""
+    global _line_cache_bytes
+    if digest in _line_cache:
+        _line_cache.move_to_end(digest)
+        return _line_cache[digest][0]
+    
+    lines = comparator.get_file_lines(file_ref)
+    try:
+        size = comparator.file_size(file_ref)
+    except OSError:
+        size = 0
+    _line_cache[digest] = (lines, size)
+    _line_cache_bytes += size
+    while _line_cache_bytes > LINE_CACHE_BYTES and len(_line_cache) > 1:
+        _, (_, evicted_size) = _line_cache.popitem(last=False)
+        _line_cache_bytes -= evicted_size
+    return lines
+
+def _clear_line_cache():
+    global _line_cache_bytes
+    _line_cache.clear()
+    _line_cache_bytes = 0
+
+def _diff_content_chunk(options, tasks):
+    """Diff a chunk of (digest1, file1, digest2, file2) tasks inside a worker process."""
+    comparator = VersionComparator(".", ".", **options)
+    results = []
+    for digest1, file1, digest2, file2 in tasks:
+        if comparator.is_large_pair(file1, file2):
+            # Large files are streamed as line hashes and never cached whole
+            results.append(compare_large_files(file1, file2, comparator.large_line_normalizer))
+        else:
+            lines1 = _cached_lines(comparator, digest1, file1)
+            lines2 = _cached_lines(comparator, digest2, file2)
+            results.append(comparator.diff_function(lines1, lines2))
+    return results
+
+class MultiVersionComparator:
+    def __init__(self, versions, labels=None, workers=1, chunk_size=64, cache=None,
+                 algorithm="difflib", large_file_threshold=32 * 1024 * 1024,
+                 ignore_patterns=None, use_gitignore=True, normalize=()):
+        """
+        Args:
+            versions: Directories or version sources (e.g. GitTreeSource), oldest first
+            labels: Display names for the versions (default: their paths)
+            Other arguments are the same as for VersionComparator.
+        """
+        if len(versions) < 2:
+            raise ValueError("At least two versions are needed for a comparison matrix")
+        
+        self.versions = [v if is_version_source(v) else Path(v) for v in versions]
+        self.labels = list(labels) if labels is not None else [str(v) for v in versions]
+        # Scans, hashes and holds the diff options shared by every pair
+        self.comparator = VersionComparator(
+            self.versions[0],
+            self.versions[-1],
+            workers=workers,
+            chunk_size=chunk_size,
+            cache=cache,
+            algorithm=algorithm,
+            large_file_threshold=large_file_threshold,
+            ignore_patterns=ignore_patterns,
+            use_gitignore=use_gitignore,
+            normalize=normalize
+        )
+        self.version_hashes = []  # per version: {relative path: content hash}
+        self.contents = {}  # content hash -> one file with that content
+        self.diff_results = {}  # (hash1, hash2) -> diff stats
+        self.pair_summaries = {}  # (i, j) -> summary dict
+        self.matrix = []
+    
+    def scan_versions(self):
+        """List and hash every version exactly once."""
+        self.version_hashes = []
+        listings = align_archive_roots([(version, self.comparator.list_version_files(version))
+                                        for version in self.versions])
+        for label, files in zip(self.labels, listings):
+            hashes = {}
+            for relative_path, file_ref in files.items():
+                digest = self.comparator.content_hash(file_ref)
+                if digest is None:
+                    # Unreadable files never match anything
+                    digest = f"unreadable:{file_ref}"
+                hashes[relative_path] = digest
+                self.contents.setdefault(digest, file_ref)
+            self.version_hashes.append(hashes)
+            print(f"📂 {label}: {len(hashes)} files")
+    
+    def version_pairs(self):
+        """Every (older, newer) index pair."""
+        return list(combinations(range(len(self.versions)), 2))
+    
+    def collect_content_pairs(self):
+        """Distinct (hash1, hash2) pairs that differ in some version pair."""
+        content_pairs = set()
+        for i, j in self.version_pairs():
+            hashes1, hashes2 = self.version_hashes[i], self.version_hashes[j]
+            for relative_path, digest1 in hashes1.items():
+                digest2 = hashes2.get(relative_path)
+                if digest2 is not None and digest2 != digest1:
+                    content_pairs.add((digest1, digest2))
+        # Sorted so each chunk keeps revisiting the same old contents
+        return sorted(content_pairs)
+    
+    def diff_content_pairs(self, content_pairs):
+        """Diff each distinct content pair once, using the cache and the worker pool."""
+        comparator = self.comparator
+        cache = comparator.cache
+        pending = []
+        for digest1, digest2 in content_pairs:
+            file1, file2 = self.contents[digest1], self.contents[digest2]
+            cached = None
+            if cache is not None:
+                cached = cache.get(digest1, digest2, comparator.cache_algorithm_id(file1, file2))
+            if cached is None:
+                pending.append((digest1, file1, digest2, file2))
+            else:
+                self.diff_results[(digest1, digest2)] = cached
+        
+        options = comparator.worker_options()
+        chunks = [pending[i:i + comparator.chunk_size] for i in range(0, len(pending), comparator.chunk_size)]
+        if comparator.workers > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=comparator.workers) as executor:
+                chunk_results = list(executor.map(_diff_content_chunk, [options] * len(chunks), chunks))
+        else:
+            chunk_results = [_diff_content_chunk(options, chunk) for chunk in chunks]
+            _clear_line_cache()
+        
+        for chunk, results in zip(chunks, chunk_results):
+            for (digest1, file1, digest2, file2), comparison in zip(chunk, results):
+                self.diff_results[(digest1, digest2)] = comparison
+                if cache is not None and not digest1.startswith("unreadable:") \
+                        and not digest2.startswith("unreadable:"):
+                    cache.put(digest1, digest2, comparator.cache_algorithm_id(file1, file2), comparison)
+        if cache is not None:
+            cache.flush()
+        return len(pending)
+    
+    def pair_comparisons(self, i, j):
+        """Per-file results between versions i and j, as a FileComparisonStore."""
+        hashes1, hashes2 = self.version_hashes[i], self.version_hashes[j]
+        store = FileComparisonStore()
+        for filename in sorted(set(hashes1) | set(hashes2)):
+            digest1, digest2 = hashes1.get(filename), hashes2.get(filename)
+            if digest1 is None:
+                store.append(FileComparison(filename=filename, status="added"))
+            elif digest2 is None:
+                store.append(FileComparison(filename=filename, status="deleted"))
+            else:
+                comparison = IDENTICAL_COMPARISON if digest1 == digest2 else self.diff_results[(digest1, digest2)]
+                store.append(FileComparison(
+                    filename=filename,
+                    status="unchanged" if comparison["similarity"] == 100.0 else "modified",
+                    similarity_score=comparison["similarity"],
+                    lines_added=comparison["added"],
+                    lines_removed=comparison["removed"],
+                    lines_changed=comparison["changed"],
+                    estimated=comparison.get("estimated", False)
+                ))
+        return store
+    
+    def run_comparison(self):
+        """
+        Compare every pair of versions.
+        
+        Returns:
+            Dict with the version labels, the similarity matrix (average similarity
+            of common files, older version in the row for the upper triangle) and
+            one summary per version pair
+        """
+        print(f"\n🔍 Comparing {len(self.versions)} versions pairwise...")
+        self.scan_versions()
+        
+        content_pairs = self.collect_content_pairs()
+        diffed = self.diff_content_pairs(content_pairs)
+        print(f"🧮 {len(content_pairs)} distinct file pairs, {diffed} diffed, "
+              f"{len(content_pairs) - diffed} from cache")
+        
+        size = len(self.versions)
+        self.matrix = [[100.0] * size for _ in range(size)]
+        pairs = []
+        for i, j in self.version_pairs():
+            summary = self.pair_comparisons(i, j).summary()
+            self.pair_summaries[(i, j)] = summary
+            # Similarity is computed old -> new and mirrored below the diagonal
+            self.matrix[i][j] = self.matrix[j][i] = summary["average_similarity"]
+            pairs.append({"old": self.labels[i], "new": self.labels[j], "summary": summary})
+        
+        print("✅ Matrix comparison completed")
+        return {
+            "labels": self.labels,
+            "matrix": self.matrix,
+            "pairs": pairs
+        }
@@ -0,0 +1,138 @@
+"""
+Line normalization for formatting-insensitive comparison.
+A file is normalized once into a list of hashed line IDs; the diff backends
+work on those IDs exactly as on text lines, so one diff pass still gives both
+the similarity and the line counts.
+
+Modes:
+    whitespace   - ignore all whitespace within lines (like diff -w)
+    blank_lines  - ignore empty and whitespace-only lines
+    comments     - ignore comments, for the languages in COMMENT_PATTERNS
+    line_endings - ignore line terminators (CRLF/CR/LF, missing final newline)
+"""
+
+import re
+
+NORMALIZATION_MODES = ("whitespace", "blank_lines", "comments", "line_endings")
+
+def _comment_pattern(starts, strings, comments, flags=0):
+    """
+    String literals are matched (and kept) so comment markers inside them are
+    left alone. `starts` lists every character a match can begin with; checking
+    it first lets the scan skip other positions quickly.
+    """
+    alternatives = f"(?P<string>{strings})|(?P<comment>{comments})" if strings else f"(?P<comment>{comments})"
+    return re.compile(f"(?=[{starts}])(?:{alternatives})", flags)
+
+# A backslash may escape a line break, continuing the string on the next line
+_ESCAPE = r"\\(?:\r\n|[\s\S])"
+_QUOTED = rf'"(?:{_ESCAPE}|[^"\\\n])*"|\'(?:{_ESCAPE}|[^\'\\\n])*\''
+# Whitespace before a comment goes with it, so "x = 1  # note" becomes "x = 1"
+_C_COMMENTS = r"[ \t]*//[^\n]*|[ \t]*/\*[\s\S]*?\*/"
+
+_PYTHON = _comment_pattern("\"'# \t", r'"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'|' + _QUOTED, r"[ \t]*#[^\n]*")
+_C_LIKE = _comment_pattern("\"'/ \t", _QUOTED, _C_COMMENTS)
+_JAVA = _comment_pattern("\"'/ \t", r'"""[\s\S]*?"""|' + _QUOTED, _C_COMMENTS)
+_JAVASCRIPT = _comment_pattern("\"'`/ \t", r"`(?:\\[\s\S]|[^`\\])*`|" + _QUOTED, _C_COMMENTS)
+# In YAML a "#" only starts a comment at the start of a line or after whitespace
+_YAML = _comment_pattern("\"'# \t", rf'"(?:{_ESCAPE}|[^"\\\n])*"|\'(?:\'\'|[^\'\n])*\'', r"(?:^[ \t]*|[ \t]+)#[^\n]*", re.MULTILINE)
+_MARKDOWN = _comment_pattern("< \t", None, r"[ \t]*<!--[\s\S]*?-->")
+
+# Extensions scanned by default (file_scanner.DEFAULT_EXTENSIONS) that have comments;
+# JSON and plain text have none
+COMMENT_PATTERNS = {
+    ".py": _PYTHON,
+    ".c": _C_LIKE,
+    ".cpp": _C_LIKE,
+    ".java": _JAVA,
+    ".js": _JAVASCRIPT,
+    ".yaml": _YAML,
+    ".yml": _YAML,
+    ".md": _MARKDOWN
+}
+
+def validate_modes(modes):
+    """The normalization modes as a frozenset; ValueError for unknown ones."""
+    modes = frozenset(modes or ())
+    unknown = modes - set(NORMALIZATION_MODES)
+    if unknown:
+        raise ValueError(
+            f"Unknown normalization mode(s) {', '.join(sorted(unknown))}. "
+            f"Choose from: {', '.join(NORMALIZATION_MODES)}"
+        )
+    return modes
+
+def _drop_comment(match):
+    # Keep the line breaks of block comments so lines stay aligned
+    if match.lastgroup == "comment":
+        return "\n" * match.group().count("\n")
+    return match.group()
+
+def strip_comments(lines, extension):
+    """
+    Remove the comments from text lines (as returned by readlines). Lines that
+    held nothing but a comment are dropped; other lines keep their code.
+    """
+    pattern = COMMENT_PATTERNS.get(extension.lower())
+    if pattern is None:
+        return lines
+    text = "".join(lines)
+    stripped = pattern.sub(_drop_comment, text)
+    if stripped == text:
+        return lines
+    result = []
+    for line, code in zip(lines, stripped.split("\n")):
+        if code.strip() or not line.strip():
+            result.append(code + "\n" if line.endswith("\n") else code)
+    return result
+
+def normalized_line_ids(lines, modes, extension=""):
+    """
+    Normalize text lines and hash each remaining line to an integer ID.
+    IDs are only compared within one process, so the built-in str hash is enough.
+    
+    Args:
+        lines: Lines of one file, as returned by readlines()
+        modes: Set of NORMALIZATION_MODES
+        extension: File suffix, which selects the comment syntax
+    """
+    if "comments" in modes:
+        lines = strip_comments(lines, extension)
+    line_endings = "line_endings" in modes
+    whitespace = "whitespace" in modes
+    blank_lines = "blank_lines" in modes
+    
+    ids = []
+    for line in lines:
+        if blank_lines and not line.strip():
+            continue
+        if whitespace:
+            line = "".join(line.split())
+        elif line_endings:
+            line = line.rstrip("\r\n")
+        ids.append(hash(line))
+    return ids
+
+def bytes_line_normalizer(modes):
+    """
+    Per-line normalizer for the streamed line hashing of large files, or None
+    when nothing applies. Comments span lines, so they are not stripped there.
+    The returned function maps a line (bytes) to its normalized form, or to
+    None for a line that is ignored.
+    """
+    line_endings = "line_endings" in modes
+    whitespace = "whitespace" in modes
+    blank_lines = "blank_lines" in modes
+    if not (line_endings or whitespace or blank_lines):
+        return None
+    
+    def normalize_line(line):
+        if blank_lines and not line.strip():
+            return None
+        if whitespace:
+            return b"".join(line.split())
+        if line_endings:
+            return line.rstrip(b"\r\n")
+        return line
+    
+    return normalize_line
@@ -0,0 +1,198 @@
+"""
+PDF document comparison.
+Extracts the text of both documents page by page (on a worker pool for long
+documents), caches it by document hash, and aligns the text lines of the two
+documents with the same diff core as source files. The result has the fields
+the web UI's PDF results page reads: similarity, common/unique percentages and
+a list of per-page differences.
+
+Text extraction uses pypdf, which is only imported when a document is read.
+"""
+
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from diff_engine import diff_opcodes, diff_stats_from_opcodes
+from version_comparator import hash_file
+
+# Documents with at least this many pages are extracted in parallel
+PARALLEL_PAGE_THRESHOLD = 32
+PAGES_PER_TASK = 16
+# Longest text kept per difference and for the common-text sample
+MAX_DIFFERENCE_TEXT = 500
+
+_whitespace = re.compile(r"\s+")
+
+def _open_pdf(pdf_path):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise ImportError("PDF comparison needs pypdf: pip install pypdf")
+    return PdfReader(str(pdf_path))
+
+def _extract_page_range(pdf_path, start, stop):
+    """Text of pages [start, stop) of a PDF (runs in worker processes)."""
+    reader = _open_pdf(pdf_path)
+    return [reader.pages[index].extract_text() or "" for index in range(start, stop)]
+
+def page_lines(text):
+    """Non-empty text lines of a page with whitespace runs collapsed."""
+    lines = (_whitespace.sub(" ", line).strip() for line in text.splitlines())
+    return [line for line in lines if line]
+
+def document_lines(pages):
+    """All text lines of a document, plus the page number each one came from."""
+    lines, line_pages = [], []
+    for number, text in enumerate(pages, 1):
+        for line in page_lines(text):
+            lines.append(line)
+            line_pages.append(number)
+    return lines, line_pages
+
+class PdfTextCache:
+    """Extracted page texts on disk, one JSON file per document hash."""
+    
+    def __init__(self, cache_dir=".cache"):
+        self.cache_dir = Path(cache_dir) / "pdf_text"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+    
+    def get(self, digest):
+        """Page texts of a document, or None on a miss."""
+        try:
+            with open(self.cache_dir / f"{digest}.json", 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def put(self, digest, pages):
+        path = self.cache_dir / f"{digest}.json"
+        temp_path = path.with_name(path.name + ".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(pages, f)
+        os.replace(temp_path, path)
+
+class PdfComparator:
+    def __init__(self, pdf1_path, pdf2_path, workers=1, cache_dir=None):
+        """
+        Args:
+            pdf1_path: Old document
+            pdf2_path: New document
+            workers: Processes for extracting long documents (None or 0 = all CPUs)
+            cache_dir: Optional directory for caching extracted text across runs
+        """
+        self.pdf1_path = Path(pdf1_path)
+        self.pdf2_path = Path(pdf2_path)
+        self.workers = workers if workers else (os.cpu_count() or 1)
+        self.text_cache = PdfTextCache(cache_dir) if cache_dir else None
+        self.results = {}
+    
+    def extract_pages(self, pdf_path):
+        """Text of every page, from the cache when the same document was read before."""
+        digest = hash_file(pdf_path)
+        if digest is None:
+            raise OSError(f"Cannot read {pdf_path}")
+        if self.text_cache is not None:
+            pages = self.text_cache.get(digest)
+            if pages is not None:
+                return pages
+        
+        page_count = len(_open_pdf(pdf_path).pages)
+        if self.workers > 1 and page_count >= PARALLEL_PAGE_THRESHOLD:
+            starts = range(0, page_count, PAGES_PER_TASK)
+            stops = [min(start + PAGES_PER_TASK, page_count) for start in starts]
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                chunks = executor.map(_extract_page_range, [pdf_path] * len(stops), starts, stops)
+                pages = [text for chunk in chunks for text in chunk]
+        else:
+            pages = _extract_page_range(pdf_path, 0, page_count)
+        
+        if self.text_cache is not None:
+            self.text_cache.put(digest, pages)
+        return pages
+    
+    def run_comparison(self):
+        """
+        Align the text lines of both documents and measure what they share.
+        
+        Returns:
+            Dict with similarity, page counts, common/unique percentages (by
+            characters), a sample of the common text and the differences, each
+            with its type ("added", "removed" or "modified"), text and page
+        """
+        print("\n📄 Comparing PDF documents...")
+        pages1 = self.extract_pages(self.pdf1_path)
+        pages2 = self.extract_pages(self.pdf2_path)
+        
+        lines1, line_pages1 = document_lines(pages1)
+        lines2, line_pages2 = document_lines(pages2)
+        
+        opcodes = diff_opcodes(lines1, lines2)
+        stats = diff_stats_from_opcodes(opcodes, len(lines1), len(lines2))
+        
+        common_chars = unique1_chars = unique2_chars = 0
+        common_sample = []
+        differences = []
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == "equal":
+                common_chars += sum(len(line) for line in lines1[i1:i2])
+                if sum(len(line) for line in common_sample) < MAX_DIFFERENCE_TEXT:
+                    common_sample.extend(lines1[i1:i2])
+                continue
+            
+            unique1_chars += sum(len(line) for line in lines1[i1:i2])
+            unique2_chars += sum(len(line) for line in lines2[j1:j2])
+            if tag == "delete":
+                differences.extend(self._page_differences("removed", lines1, line_pages1, i1, i2))
+            else:
+                differences.extend(self._page_differences(
+                    "added" if tag == "insert" else "modified", lines2, line_pages2, j1, j2
+                ))
+        
+        total_chars = common_chars + unique1_chars + unique2_chars
+        self.results = {
+            "type": "pdf",
+            "similarity": stats["similarity"],
+            "doc1_pages": len(pages1),
+            "doc2_pages": len(pages2),
+            "common_percentage": (common_chars / total_chars * 100) if total_chars > 0 else 100.0,
+            "unique1_percentage": (unique1_chars / total_chars * 100) if total_chars > 0 else 0.0,
+            "unique2_percentage": (unique2_chars / total_chars * 100) if total_chars > 0 else 0.0,
+            "lines_added": stats["added"],
+            "lines_removed": stats["removed"],
+            "common_text": " ".join(common_sample)[:MAX_DIFFERENCE_TEXT],
+            "differences": differences
+        }
+        print("✅ PDF comparison completed")
+        return self.results
+    
+    def _page_differences(self, kind, lines, line_pages, start, stop):
+        """One difference per page touched by lines[start:stop]."""
+        differences = []
+        index = start
+        while index < stop:
+            page = line_pages[index]
+            end = index
+            while end < stop and line_pages[end] == page:
+                end += 1
+            differences.append({
+                "type": kind,
+                "text": " ".join(lines[index:end])[:MAX_DIFFERENCE_TEXT],
+                "page": page
+            })
+            index = end
+        return differences
+    
+    def get_summary(self):
+        """Get a formatted summary of the comparison."""
+        results = self.results
+        return f"""
+📄 PDF COMPARISON SUMMARY
+  • Pages: {results['doc1_pages']} → {results['doc2_pages']}
+  • Text Similarity: {results['similarity']:.1f}%
+  • Common Text: {results['common_percentage']:.1f}%
+  • Only in Document 1: {results['unique1_percentage']:.1f}%
+  • Only in Document 2: {results['unique2_percentage']:.1f}%
+  • Differences: {len(results['differences'])}
+"""
@@ -0,0 +1,146 @@
+"""
+Rename and move detection between deleted and added files.
+Exact moves are matched through a content-hash index. The remaining files are
+sketched with MinHash over line shingles and bucketed with locality-sensitive
+hashing, so only files that share a bucket are ever compared, instead of
+every deleted file against every added file.
+"""
+
+import hashlib
+from collections import defaultdict
+
+SHINGLE_SIZE = 3
+NUM_PERMUTATIONS = 64
+ROWS_PER_BAND = 4
+# Candidates whose estimated shingle overlap is below this are not diffed
+MIN_ESTIMATED_OVERLAP = 0.2
+# At most this many candidate sources are diffed per added file
+MAX_CANDIDATES = 5
+
+def _shingle_hash(lines):
+    digest = hashlib.blake2b("\n".join(lines).encode("utf-8", "surrogatepass"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+def line_shingles(lines, size=SHINGLE_SIZE):
+    """Hashes of every run of `size` consecutive non-blank lines, ignoring indentation."""
+    stripped = [line.strip() for line in lines]
+    stripped = [line for line in stripped if line]
+    if len(stripped) < size:
+        return {_shingle_hash(stripped)} if stripped else set()
+    return {_shingle_hash(stripped[i:i + size]) for i in range(len(stripped) - size + 1)}
+
+def minhash_signature(shingles):
+    """
+    MinHash signature of a shingle set (None for an empty set).
+    Uses one-permutation hashing: each shingle hash lands in one of
+    NUM_PERMUTATIONS bins by its low bits and every bin keeps its minimum, so a
+    file is sketched in a single pass. Empty bins copy the next filled bin
+    (rotation densification) so that every position stays comparable.
+    """
+    if not shingles:
+        return None
+    bins = [None] * NUM_PERMUTATIONS
+    for shingle in shingles:
+        index = shingle % NUM_PERMUTATIONS
+        value = shingle // NUM_PERMUTATIONS
+        if bins[index] is None or value < bins[index]:
+            bins[index] = value
+    
+    signature = list(bins)
+    for index in range(NUM_PERMUTATIONS):
+        offset = 1
+        while signature[index] is None:
+            source = bins[(index + offset) % NUM_PERMUTATIONS]
+            if source is not None:
+                # Tag borrowed values with the distance so they only match the same borrowing
+                signature[index] = (offset, source)
+            offset += 1
+    return tuple(signature)
+
+def estimate_overlap(signature1, signature2):
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    matches = sum(1 for x, y in zip(signature1, signature2) if x == y)
+    return matches / NUM_PERMUTATIONS
+
+def match_exact(deleted_hashes, added_hashes):
+    """
+    Pair deleted and added files with identical content.
+    
+    Args:
+        deleted_hashes, added_hashes: Dicts mapping path -> content hash (None = unknown)
+    
+    Returns:
+        Dict mapping added path -> deleted path
+    """
+    by_hash = defaultdict(list)
+    for path in sorted(deleted_hashes):
+        if deleted_hashes[path] is not None:
+            by_hash[deleted_hashes[path]].append(path)
+    
+    matches = {}
+    for path in sorted(added_hashes):
+        sources = by_hash.get(added_hashes[path])
+        if sources:
+            matches[path] = sources.pop(0)
+    return matches
+
+def find_candidates(deleted_signatures, added_signatures):
+    """
+    Candidate (added, deleted) pairs that share at least one LSH band.
+    
+    Returns:
+        List of (estimated overlap, added path, deleted path), best first,
+        with at most MAX_CANDIDATES per added file
+    """
+    buckets = defaultdict(list)
+    for path in sorted(deleted_signatures):
+        signature = deleted_signatures[path]
+        for start in range(0, NUM_PERMUTATIONS, ROWS_PER_BAND):
+            buckets[(start, signature[start:start + ROWS_PER_BAND])].append(path)
+    
+    candidates = []
+    for path in sorted(added_signatures):
+        signature = added_signatures[path]
+        seen = set()
+        scored = []
+        for start in range(0, NUM_PERMUTATIONS, ROWS_PER_BAND):
+            for source in buckets.get((start, signature[start:start + ROWS_PER_BAND]), ()):
+                if source in seen:
+                    continue
+                seen.add(source)
+                overlap = estimate_overlap(signature, deleted_signatures[source])
+                if overlap >= MIN_ESTIMATED_OVERLAP:
+                    scored.append((overlap, path, source))
+        scored.sort(key=lambda item: (-item[0], item[2]))
+        candidates.extend(scored[:MAX_CANDIDATES])
+    
+    candidates.sort(key=lambda item: (-item[0], item[1], item[2]))
+    return candidates
+
+def match_similar(candidates, comparisons, threshold):
+    """
+    Greedily pair files by their diffed similarity, best pairs first; each file
+    is used at most once.
+    
+    Args:
+        candidates: (estimated overlap, added path, deleted path) from find_candidates
+        comparisons: Diff stats for each candidate, in the same order
+        threshold: Minimum similarity (percent) for a pair to count as a rename
+    
+    Returns:
+        Dict mapping added path -> (deleted path, comparison)
+    """
+    ranked = sorted(
+        zip(candidates, comparisons),
+        key=lambda item: (-item[1]["similarity"], item[0][1], item[0][2])
+    )
+    matches = {}
+    used_sources = set()
+    for (_, path, source), comparison in ranked:
+        if comparison["similarity"] < threshold:
+            break
+        if path in matches or source in used_sources:
+            continue
+        matches[path] = (source, comparison)
+        used_sources.add(source)
+    return matches
@@ -1,12 +1,136 @@
 """
 Generates detailed reports and exports results to various formats.
-Supports JSON, CSV, and markdown outputs.
+Supports JSON, CSV, and markdown outputs, plus streaming JSON/JSONL/CSV writers
+that consume FileComparison records while the comparison is still running.
 """
 
 import json
 import csv
+import heapq
+from abc import ABC, abstractmethod
 from pathlib import Path
 from datetime import datetime
+from version_comparator import FileComparison
+
+CSV_HEADER = [
+    "Filename", "Status", "Similarity %",
+    "Lines Added", "Lines Removed", "Lines Changed", "Renamed From"
+]
+
+# Report format -> file name used by generate_all_reports
+REPORT_FORMATS = {
+    "json": "comparison_report.json",
+    "csv": "file_comparison.csv",
+    "markdown": "ANALYSIS.md"
+}
+
+# Summary keys added after older reports were written
+SUMMARY_DEFAULTS = {
+    "renamed_count": 0,
+    "renamed_percentage": 0
+}
+
+# Streamed output is written to disk in chunks of this many bytes
+STREAM_BUFFER_SIZE = 1024 * 1024
+
+def file_comparison_record(fc):
+    """JSON-ready dict for one FileComparison."""
+    record = {
+        "filename": fc.filename,
+        "status": fc.status,
+        "similarity_score": fc.similarity_score,
+        "lines_added": fc.lines_added,
+        "lines_removed": fc.lines_removed,
+        "lines_changed": fc.lines_changed
+    }
+    if fc.old_filename is not None:
+        record["old_filename"] = fc.old_filename
+    if fc.symbols is not None:
+        record["symbols"] = fc.symbols
+    if fc.estimated:
+        record["estimated"] = True
+    return record
+
+def file_comparison_csv_row(fc):
+    """CSV row for one FileComparison."""
+    return [
+        fc.filename,
+        fc.status,
+        f"{fc.similarity_score:.1f}" if fc.similarity_score > 0 else "-",
+        fc.lines_added,
+        fc.lines_removed,
+        fc.lines_changed,
+        fc.old_filename or ""
+    ]
+
+def load_json_report(path):
+    """
+    Read a JSON report written by generate_json_report or JSONReportWriter.
+    
+    Returns:
+        Tuple of (summary dict, list of FileComparison)
+    """
+    with open(path, 'r') as f:
+        data = json.load(f)
+    return data["summary"], [FileComparison(**record) for record in data["file_details"]]
+
+MARKDOWN_HEADER_TEMPLATE = """# Version Comparison Analysis Report
+
+**Generated:** {generated}
+
+## Executive Summary
+
+This report compares two versions of the software and identifies which parts have changed, which remain the same, and provides percentages to help testers prioritize their testing efforts.
+
+## Key Findings
+
+| Metric | Value |
+|--------|-------|
+| Total Files | {total_files} |
+| Unchanged Files | {unchanged_count} ({unchanged_percentage:.1f}%) |
+| Modified Files | {modified_count} ({modified_percentage:.1f}%) |
+| Added Files | {added_count} ({added_percentage:.1f}%) |
+| Deleted Files | {deleted_count} ({deleted_percentage:.1f}%) |
+| Renamed/Moved Files | {renamed_count} ({renamed_percentage:.1f}%) |
+| **Average Code Similarity** | **{average_similarity:.1f}%** |
+| **Code Change Percentage** | **{code_change_percentage:.1f}%** |
+
+## Testing Strategy
+
+### 🟢 Safe to Skip (Unchanged Files: {unchanged_percentage:.1f}%)
+{unchanged_count} files remain completely unchanged. Testers can skip regression testing on these files.
+
+### 🟡 Requires Re-testing (Modified Files: {modified_percentage:.1f}%)
+{modified_count} files have been modified. These files need thorough testing and should be the primary focus.
+
+### 🔵 Needs New Tests (Added Files: {added_percentage:.1f}%)
+{added_count} new files have been added. New test cases must be created.
+
+### 🔴 Verify Removed Features (Deleted Files: {deleted_percentage:.1f}%)
+{deleted_count} files have been deleted. Ensure dependent tests are updated.
+
+### 🟣 Check Moved Code (Renamed Files: {renamed_percentage:.1f}%)
+{renamed_count} files have been renamed or moved. Update test imports and paths, and re-test them if their content changed.
+
+## Detailed File Changes
+
+"""
+
+MARKDOWN_FOOTER_TEMPLATE = """
+## Recommendations
+
+1. **Focus Testing on Modified Files**: Allocate 70-80% of testing effort to the {count_modified} modified files.
+2. **Create New Tests for Added Files**: Develop test cases for {count_added} new features/files.
+3. **Skip Unchanged Files**: Save time by not re-testing {count_unchanged} unchanged files.
+4. **Update Deprecated Tests**: Remove or update tests related to {count_deleted} deleted files.
+
+## Conclusion
+
+{change_pct:.1f}% of the codebase has changed between versions. This means testers should focus approximately {change_pct:.1f}% of their effort on changed areas and only {regression_pct:.1f}% on regression testing of unchanged code.
+
+---
+*Report generated by Version Comparison Tool*
+"""
 
 class ReportGenerator:
     def __init__(self, comparison_results, file_comparisons):
@@ -22,17 +146,7 @@ class ReportGenerator:
         report_data = {
             "generated_at": datetime.now().isoformat(),
             "summary": self.results,
-            "file_details": [
-                {
-                    "filename": fc.filename,
-                    "status": fc.status,
-                    "similarity_score": fc.similarity_score,
-                    "lines_added": fc.lines_added,
-                    "lines_removed": fc.lines_removed,
-                    "lines_changed": fc.lines_changed
-                }
-                for fc in self.file_comparisons
-            ]
+            "file_details": [file_comparison_record(fc) for fc in self.file_comparisons]
         }
         
         with open(output_path, 'w') as f:
@@ -48,127 +162,293 @@ class ReportGenerator:
         
         with open(output_path, 'w', newline='') as f:
             writer = csv.writer(f)
-            writer.writerow([
-                "Filename", "Status", "Similarity %", 
-                "Lines Added", "Lines Removed", "Lines Changed"
-            ])
+            writer.writerow(CSV_HEADER)
             
             for fc in self.file_comparisons:
-                writer.writerow([
-                    fc.filename,
-                    fc.status,
-                    f"{fc.similarity_score:.1f}" if fc.similarity_score > 0 else "-",
-                    fc.lines_added,
-                    fc.lines_removed,
-                    fc.lines_changed
-                ])
+                writer.writerow(file_comparison_csv_row(fc))
         
         print(f"✅ CSV report saved to {output_path}")
         return output_path
     
-    def generate_markdown_report(self, output_path="reports/ANALYSIS.md"):
-        """Generate markdown report for documentation."""
+    def build_status_index(self, max_listed=None):
+        """
+        Bucket file comparisons by status in a single pass.
+        
+        Args:
+            max_listed: Keep at most this many files per section (None = all).
+                Modified files keep the lowest-similarity ones via a bounded heap.
+        
+        Returns:
+            Dict with "modified" (sorted by similarity), "added", "deleted", "renamed"
+            lists and "counts" per status
+        """
+        counts = {"modified": 0, "added": 0, "deleted": 0, "unchanged": 0, "renamed": 0}
+        modified_heap = []
+        modified = []
+        added = []
+        deleted = []
+        renamed = []
+        
+        for index, fc in enumerate(self.file_comparisons):
+            status = fc.status
+            counts[status] = counts.get(status, 0) + 1
+            if status == "modified":
+                if max_listed is None:
+                    modified.append(fc)
+                else:
+                    # Max-heap on (similarity, position) keeps the N least similar files;
+                    # ties keep the earlier file, like a stable sort would
+                    heapq.heappush(modified_heap, (-fc.similarity_score, -index, fc))
+                    if len(modified_heap) > max_listed:
+                        heapq.heappop(modified_heap)
+            elif status == "added":
+                if max_listed is None or len(added) < max_listed:
+                    added.append(fc)
+            elif status == "deleted":
+                if max_listed is None or len(deleted) < max_listed:
+                    deleted.append(fc)
+            elif status == "renamed":
+                if max_listed is None or len(renamed) < max_listed:
+                    renamed.append(fc)
+        
+        if max_listed is None:
+            modified.sort(key=lambda x: x.similarity_score)
+        else:
+            modified = [fc for _, _, fc in sorted(modified_heap, key=lambda item: (-item[0], -item[1]))]
+        
+        return {
+            "modified": modified,
+            "added": added,
+            "deleted": deleted,
+            "renamed": renamed,
+            "counts": counts
+        }
+    
+    def generate_markdown_report(self, output_path="reports/ANALYSIS.md", max_listed=None):
+        """
+        Generate markdown report for documentation.
+        
+        Args:
+            output_path: Where to write the report
+            max_listed: Cap on files listed per section (None = list every file)
+        """
         output_dir = Path(output_path).parent
         output_dir.mkdir(parents=True, exist_ok=True)
         
-        markdown_content = f"""# Version Comparison Analysis Report
-
-**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-
-## Executive Summary
-
-This report compares two versions of the software and identifies which parts have changed, which remain the same, and provides percentages to help testers prioritize their testing efforts.
-
-## Key Findings
-
-| Metric | Value |
-|--------|-------|
-| Total Files | {self.results['total_files']} |
-| Unchanged Files | {self.results['unchanged_count']} ({self.results['unchanged_percentage']:.1f}%) |
-| Modified Files | {self.results['modified_count']} ({self.results['modified_percentage']:.1f}%) |
-| Added Files | {self.results['added_count']} ({self.results['added_percentage']:.1f}%) |
-| Deleted Files | {self.results['deleted_count']} ({self.results['deleted_percentage']:.1f}%) |
-| **Average Code Similarity** | **{self.results['average_similarity']:.1f}%** |
-| **Code Change Percentage** | **{self.results['code_change_percentage']:.1f}%** |
-
-## Testing Strategy
-
-### 🟢 Safe to Skip (Unchanged Files: {self.results['unchanged_percentage']:.1f}%)
-{self.results['unchanged_count']} files remain completely unchanged. Testers can skip regression testing on these files.
-
-### 🟡 Requires Re-testing (Modified Files: {self.results['modified_percentage']:.1f}%)
-{self.results['modified_count']} files have been modified. These files need thorough testing and should be the primary focus.
-
-### 🔵 Needs New Tests (Added Files: {self.results['added_percentage']:.1f}%)
-{self.results['added_count']} new files have been added. New test cases must be created.
+        status_index = self.build_status_index(max_listed)
+        counts = status_index["counts"]
+        
+        with open(output_path, 'w', buffering=STREAM_BUFFER_SIZE) as f:
+            f.write(MARKDOWN_HEADER_TEMPLATE.format(
+                generated=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                **dict(SUMMARY_DEFAULTS, **self.results)
+            ))
+            
+            if status_index["modified"]:
+                f.write("### Modified Files\n\n")
+                for fc in status_index["modified"]:
+                    f.write(f"- **{fc.filename}** - Similarity: {fc.similarity_score:.1f}% | Added: {fc.lines_added} | Removed: {fc.lines_removed}\n")
+                    self._write_symbols(f, fc)
+                self._write_omitted(f, counts["modified"] - len(status_index["modified"]))
+                f.write("\n")
+            
+            if status_index["added"]:
+                f.write("### Added Files (New)\n\n")
+                for fc in status_index["added"]:
+                    f.write(f"- {fc.filename}\n")
+                self._write_omitted(f, counts["added"] - len(status_index["added"]))
+                f.write("\n")
+            
+            if status_index["deleted"]:
+                f.write("### Deleted Files (Deprecated)\n\n")
+                for fc in status_index["deleted"]:
+                    f.write(f"- ~~{fc.filename}~~\n")
+                self._write_omitted(f, counts["deleted"] - len(status_index["deleted"]))
+                f.write("\n")
+            
+            if status_index["renamed"]:
+                f.write("### Renamed/Moved Files\n\n")
+                for fc in status_index["renamed"]:
+                    f.write(f"- {fc.old_filename} → **{fc.filename}** - Similarity: {fc.similarity_score:.1f}%\n")
+                    self._write_symbols(f, fc)
+                self._write_omitted(f, counts["renamed"] - len(status_index["renamed"]))
+                f.write("\n")
+            
+            f.write(MARKDOWN_FOOTER_TEMPLATE.format(
+                count_modified=self.results['modified_count'],
+                count_added=self.results['added_count'],
+                count_unchanged=self.results['unchanged_count'],
+                count_deleted=self.results['deleted_count'],
+                change_pct=self.results['code_change_percentage'],
+                regression_pct=100 - self.results['code_change_percentage']
+            ))
+        
+        print(f"✅ Markdown report saved to {output_path}")
+        return output_path
+    
+    def _write_symbols(self, f, fc):
+        """List the functions and classes a structural comparison found changed."""
+        if not fc.symbols:
+            return
+        for kind in ("modified", "added", "removed"):
+            if fc.symbols[kind]:
+                names = ", ".join(f"`{name}`" for name in fc.symbols[kind])
+                f.write(f"  - {kind.capitalize()}: {names}\n")
+    
+    def _write_omitted(self, f, omitted):
+        """Note how many files a capped section left out."""
+        if omitted > 0:
+            f.write(f"- *... and {omitted} more*\n")
+    
+    def generate_all_reports(self, max_listed=None, output_dir="reports", formats=REPORT_FORMATS):
+        """
+        Generate report formats.
+        
+        Args:
+            max_listed: Cap on files listed per section of the markdown report
+            output_dir: Directory for the report files
+            formats: Any of "json", "csv", "markdown"
+        
+        Returns:
+            Dict mapping format -> output path
+        """
+        print("\n📄 Generating reports...")
+        output_dir = Path(output_dir)
+        paths = {}
+        if "json" in formats:
+            paths["json"] = str(self.generate_json_report(output_dir / REPORT_FORMATS["json"]))
+        if "csv" in formats:
+            paths["csv"] = str(self.generate_csv_report(output_dir / REPORT_FORMATS["csv"]))
+        if "markdown" in formats:
+            paths["markdown"] = str(self.generate_markdown_report(output_dir / REPORT_FORMATS["markdown"],
+                                                                  max_listed=max_listed))
+        return paths
 
-### 🔴 Verify Removed Features (Deleted Files: {self.results['deleted_percentage']:.1f}%)
-{self.results['deleted_count']} files have been deleted. Ensure dependent tests are updated.
+class StreamingReportWriter(ABC):
+    """
+    Base class for writers that receive FileComparison records one at a time.
+    Nothing but the file buffer is held in memory. Subclasses implement
+    write_record and may add a header and footer.
+    """
+    
+    def __init__(self, output_path, buffer_size=STREAM_BUFFER_SIZE):
+        self.output_path = Path(output_path)
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.output_path, 'w', newline='', buffering=buffer_size)
+        self.count = 0
+        self.write_header()
+    
+    def write_header(self):
+        pass
+    
+    @abstractmethod
+    def write_record(self, fc):
+        """Write one FileComparison record."""
+    
+    def write_footer(self, summary):
+        pass
+    
+    def write(self, fc):
+        self.write_record(fc)
+        self.count += 1
+    
+    def close(self, summary=None):
+        """Write the trailer (with the final summary, if any) and close the file."""
+        self.write_footer(summary)
+        self.file.close()
+        return str(self.output_path)
 
-## Detailed File Changes
+class JSONReportWriter(StreamingReportWriter):
+    """Same content as generate_json_report; the summary comes last since it is only known at the end."""
+    
+    def write_header(self):
+        self.file.write('{\n  "generated_at": %s,\n  "file_details": [' % json.dumps(datetime.now().isoformat()))
+    
+    def write_record(self, fc):
+        self.file.write(",\n    " if self.count else "\n    ")
+        self.file.write(json.dumps(file_comparison_record(fc)))
+    
+    def write_footer(self, summary):
+        self.file.write("\n  ],\n  \"summary\": %s\n}\n" % json.dumps(summary))
 
-"""
-        
-        # Group by status
-        modified = [fc for fc in self.file_comparisons if fc.status == "modified"]
-        added = [fc for fc in self.file_comparisons if fc.status == "added"]
-        deleted = [fc for fc in self.file_comparisons if fc.status == "deleted"]
-        unchanged = [fc for fc in self.file_comparisons if fc.status == "unchanged"]
-        
-        if modified:
-            markdown_content += "### Modified Files\n\n"
-            for fc in sorted(modified, key=lambda x: x.similarity_score):
-                markdown_content += f"- **{fc.filename}** - Similarity: {fc.similarity_score:.1f}% | Added: {fc.lines_added} | Removed: {fc.lines_removed}\n"
-            markdown_content += "\n"
-        
-        if added:
-            markdown_content += "### Added Files (New)\n\n"
-            for fc in added:
-                markdown_content += f"- {fc.filename}\n"
-            markdown_content += "\n"
-        
-        if deleted:
-            markdown_content += "### Deleted Files (Deprecated)\n\n"
-            for fc in deleted:
-                markdown_content += f"- ~~{fc.filename}~~\n"
-            markdown_content += "\n"
-        
-        markdown_content += """
-## Recommendations
+class JSONLReportWriter(StreamingReportWriter):
+    """One JSON object per file; the summary is written as a final {"summary": ...} line."""
+    
+    def write_record(self, fc):
+        self.file.write(json.dumps(file_comparison_record(fc)))
+        self.file.write("\n")
+    
+    def write_footer(self, summary):
+        if summary is not None:
+            self.file.write(json.dumps({"summary": summary}))
+            self.file.write("\n")
 
-1. **Focus Testing on Modified Files**: Allocate 70-80% of testing effort to the {count_modified} modified files.
-2. **Create New Tests for Added Files**: Develop test cases for {count_added} new features/files.
-3. **Skip Unchanged Files**: Save time by not re-testing {count_unchanged} unchanged files.
-4. **Update Deprecated Tests**: Remove or update tests related to {count_deleted} deleted files.
+class CSVReportWriter(StreamingReportWriter):
+    """Same columns as generate_csv_report."""
+    
+    def write_header(self):
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(CSV_HEADER)
+    
+    def write_record(self, fc):
+        self.writer.writerow(file_comparison_csv_row(fc))
 
-## Conclusion
+STREAM_WRITERS = {
+    "json": (JSONReportWriter, "comparison_report.json"),
+    "jsonl": (JSONLReportWriter, "file_comparison.jsonl"),
+    "csv": (CSVReportWriter, "file_comparison.csv")
+}
 
-{change_pct:.1f}% of the codebase has changed between versions. This means testers should focus approximately {change_pct:.1f}% of their effort on changed areas and only {100-change_pct:.1f}% on regression testing of unchanged code.
+def stream_reports(records, output_dir="reports", formats=("json", "jsonl", "csv"), summary=None):
+    """
+    Write reports in one pass over a stream of FileComparison records.
+    
+    Args:
+        records: Iterable of FileComparison, e.g. VersionComparator.iter_comparisons()
+        output_dir: Directory for the report files
+        formats: Any of "json", "jsonl", "csv"
+        summary: Callable returning the summary dict, called after the records run out
+    
+    Returns:
+        Dict mapping format -> output path
+    """
+    writers = {}
+    for format_type in formats:
+        writer_class, filename = STREAM_WRITERS[format_type]
+        writers[format_type] = writer_class(Path(output_dir) / filename)
+    
+    for fc in records:
+        for writer in writers.values():
+            writer.write(fc)
+    
+    final_summary = summary() if summary is not None else None
+    paths = {format_type: writer.close(final_summary) for format_type, writer in writers.items()}
+    for format_type, path in paths.items():
+        print(f"✅ {format_type.upper()} report streamed to {path}")
+    return paths
 
----
-*Report generated by Version Comparison Tool*
-""".format(
-            count_modified=self.results['modified_count'],
-            count_added=self.results['added_count'],
-            count_unchanged=self.results['unchanged_count'],
-            count_deleted=self.results['deleted_count'],
-            change_pct=self.results['code_change_percentage']
-        )
-        
-        with open(output_path, 'w') as f:
-            f.write(markdown_content)
-        
-        print(f"✅ Markdown report saved to {output_path}")
-        return output_path
+def generate_matrix_reports(matrix_results, output_dir="reports"):
+    """
+    Write the results of MultiVersionComparator.run_comparison.
     
-    def generate_all_reports(self):
-        """Generate all report formats."""
-        print("\n📄 Generating reports...")
-        json_path = self.generate_json_report()
-        csv_path = self.generate_csv_report()
-        md_path = self.generate_markdown_report()
-        return {
-            "json": json_path,
-            "csv": csv_path,
-            "markdown": md_path
-        }
+    Returns:
+        Dict with the paths of the similarity matrix CSV and the JSON report
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    labels = matrix_results["labels"]
+    
+    csv_path = output_dir / "similarity_matrix.csv"
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["Version"] + labels)
+        for label, row in zip(labels, matrix_results["matrix"]):
+            writer.writerow([label] + [f"{value:.1f}" for value in row])
+    print(f"✅ Similarity matrix saved to {csv_path}")
+    
+    json_path = output_dir / "version_matrix.json"
+    with open(json_path, 'w') as f:
+        json.dump(dict(matrix_results, generated_at=datetime.now().isoformat()), f, indent=2)
+    print(f"✅ Matrix report saved to {json_path}")
+    
+    return {"matrix_csv": str(csv_path), "matrix_json": str(json_path)}
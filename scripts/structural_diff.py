@@ -0,0 +1,119 @@
+"""
+Structural comparison of Python sources.
+Each function and class is fingerprinted by a hash of its AST (without line
+numbers, so moving code around does not count as a change). Nested functions
+and classes are symbols of their own and are left out of the enclosing
+fingerprint: adding a method reports the method, not its whole class.
+"""
+
+import ast
+import hashlib
+import sys
+
+# ast.dump output differs between Python versions, so cached fingerprints are
+# only reused by the same version
+FINGERPRINT_VERSION = f"ast-2-py{sys.version_info[0]}.{sys.version_info[1]}"
+
+PYTHON_EXTENSIONS = (".py", ".pyw")
+DEF_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+def is_python_file(filename):
+    return str(filename).lower().endswith(PYTHON_EXTENSIONS)
+
+def _blocks(node):
+    """(owner, field, statements) for each block of a statement, in source order."""
+    if isinstance(getattr(node, "body", None), list):
+        yield node, "body", node.body
+    # except handlers and match cases
+    for clause in [*getattr(node, "handlers", ()), *getattr(node, "cases", ())]:
+        yield clause, "body", clause.body
+    for field in ("orelse", "finalbody"):
+        block = getattr(node, field, None)
+        if block:
+            yield node, field, block
+
+def _definitions(body):
+    """Definitions in a block, including those under if/for/while/try/with/match statements."""
+    for node in body:
+        if isinstance(node, DEF_TYPES):
+            yield node
+        else:
+            for _, _, block in _blocks(node):
+                yield from _definitions(block)
+
+def _fingerprint(node):
+    """Hash of a definition's AST, leaving out nested definitions (wherever _definitions finds them)."""
+    saved = []
+    
+    def strip(parent):
+        for owner, field, block in list(_blocks(parent)):
+            saved.append((owner, field, block))
+            kept = [child for child in block if not isinstance(child, DEF_TYPES)]
+            setattr(owner, field, kept)
+            for child in kept:
+                strip(child)
+    
+    try:
+        strip(node)
+        dumped = ast.dump(node, include_attributes=False)
+    finally:
+        for owner, field, block in reversed(saved):
+            setattr(owner, field, block)
+    return hashlib.blake2b(dumped.encode("utf-8"), digest_size=8).hexdigest()
+
+def symbol_fingerprints(source):
+    """
+    Fingerprint the functions and classes defined in a module or in another
+    function or class, also inside if/try/with/for/while/match blocks
+    (e.g. under "if TYPE_CHECKING:" or an "except ImportError:" fallback).
+    
+    Args:
+        source: Python source as bytes (its encoding declaration is honoured) or str
+    
+    Returns:
+        {"symbols": {qualified name: [kind, fingerprint, line]}} with kind
+        "function" or "class", or {"error": message} if the source does not parse
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError) as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+    
+    symbols = {}
+    
+    def visit(body, prefix):
+        for node in _definitions(body):
+            name = prefix + node.name
+            # Redefinitions in one scope (e.g. property setters) get numbered
+            if name in symbols:
+                count = 2
+                while f"{name}#{count}" in symbols:
+                    count += 1
+                name = f"{name}#{count}"
+            kind = "class" if isinstance(node, ast.ClassDef) else "function"
+            symbols[name] = [kind, _fingerprint(node), node.lineno]
+            visit(node.body, name + ".")
+    
+    visit(tree.body, "")
+    return {"symbols": symbols}
+
+def compare_symbols(before, after):
+    """
+    Added, removed and modified symbols between two symbol_fingerprints results.
+    
+    Returns:
+        Dict with "added", "removed" and "modified" lists of qualified names in
+        source order, or None when either side could not be parsed
+    """
+    if "symbols" not in before or "symbols" not in after:
+        return None
+    old, new = before["symbols"], after["symbols"]
+    
+    def in_source_order(names, symbols):
+        return sorted(names, key=lambda name: (symbols[name][2], name))
+    
+    return {
+        "added": in_source_order(new.keys() - old.keys(), new),
+        "removed": in_source_order(old.keys() - new.keys(), old),
+        "modified": in_source_order([name for name in new.keys() & old.keys() if new[name][1] != old[name][1]], new)
+    }
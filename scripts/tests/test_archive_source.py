@@ -0,0 +1,149 @@
+import io
+import os
+import random
+import tarfile
+import zipfile
+
+import pytest
+
+import archive_source
+from archive_source import ArchiveSource, align_archive_roots, get_archive_reader
+from version_comparator import VersionComparator
+
+V1_FILES = {
+    "README": "Demo project\n",
+    "app.py": "def main():\n    return 1\n",
+    "lib/util.py": "".join(f"value_{i} = {i}\n" for i in range(200)),
+    "lib/old_name.py": "".join(f"# moved line {i}\n" for i in range(40)),
+    "docs/guide.md": "# Guide\n\nFirst version.\n",
+    "empty.txt": "",
+    "node_modules/dep/index.js": "module.exports = 1\n",
+    "image.png": "not compared\n"
+}
+
+V2_FILES = {
+    "README": "Demo project\n",
+    "app.py": "def main():\n    return 2\n\ndef helper():\n    pass\n",
+    "lib/util.py": "".join(f"value_{i} = {i * 2 if i % 10 == 0 else i}\n" for i in range(200)),
+    "lib/new_name.py": "".join(f"# moved line {i}\n" for i in range(40)),
+    "docs/guide.md": "# Guide\n\nSecond version.\n",
+    "empty.txt": "",
+    "added.yaml": "key: value\n",
+    "node_modules/dep/index.js": "module.exports = 2\n",
+    "image.png": "still not compared\n"
+}
+
+def write_archive(path, files, prefix=""):
+    """A zip or tar(.gz) of `files`, every name under `prefix`."""
+    contents = {prefix + name: content.encode() for name, content in files.items()}
+    if path.suffix == ".zip":
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+            for name, data in contents.items():
+                archive.writestr(name, data)
+    else:
+        with tarfile.open(path, "w:gz" if path.name.endswith(".gz") else "w") as archive:
+            for name, data in contents.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+    return path
+
+def write_tree(root, files):
+    for rel_path, content in files.items():
+        path = root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+    return root
+
+def comparison_rows(comparator):
+    return sorted(
+        (fc.filename, fc.status, round(fc.similarity_score, 6), fc.lines_added,
+         fc.lines_removed, fc.lines_changed, fc.old_filename)
+        for fc in comparator.file_comparisons
+    )
+
+@pytest.fixture(autouse=True)
+def close_readers():
+    yield
+    archive_source.close_archive_readers()
+
+@pytest.mark.parametrize("suffix1, suffix2", [(".tar.gz", ".zip"), (".zip", ".tar"), (".tar.gz", ".tar.gz")])
+def test_archive_comparison_equals_directory_comparison(tmp_path, suffix1, suffix2):
+    from_dirs = VersionComparator(write_tree(tmp_path / "v1", V1_FILES), write_tree(tmp_path / "v2", V2_FILES))
+    from_archives = VersionComparator(
+        ArchiveSource(write_archive(tmp_path / f"v1{suffix1}", V1_FILES, "demo-1.0/")),
+        ArchiveSource(write_archive(tmp_path / f"v2{suffix2}", V2_FILES, "demo-2.0/"))
+    )
+    results_dirs = from_dirs.run_comparison()
+    results_archives = from_archives.run_comparison()
+    
+    assert comparison_rows(from_archives) == comparison_rows(from_dirs)
+    for key in ("total_files", "unchanged_count", "modified_count", "added_count",
+                "deleted_count", "renamed_count", "total_lines_added", "total_lines_removed"):
+        assert results_archives[key] == results_dirs[key], key
+    assert results_archives["renamed_count"] == 1
+
+def test_tar_gz_members_read_back_in_any_order(tmp_path, monkeypatch):
+    # Small checkpoints and reads, so backward reads resume from a saved decompressor state
+    monkeypatch.setattr(archive_source, "CHECKPOINT_INTERVAL", 16 * 1024)
+    monkeypatch.setattr(archive_source, "READ_CHUNK_SIZE", 4 * 1024)
+    rng = random.Random(0)
+    files = {
+        f"pkg/module_{i}.py": "".join(f"x_{rng.getrandbits(48):x} = {rng.random()}\n" for _ in range(rng.randint(0, 400)))
+        for i in range(40)
+    }
+    members = ArchiveSource(write_archive(tmp_path / "v.tar.gz", files), strip_root=False).list_files()
+    assert sorted(members) == sorted(name.replace("/", os.sep) for name in files)
+    
+    order = sorted(members) * 2
+    rng.shuffle(order)
+    for rel_path in order:
+        assert members[rel_path].read_bytes() == files[rel_path.replace(os.sep, "/")].encode()
+        with members[rel_path].open() as stream:
+            # Partial reads continue where the last one stopped
+            assert stream.read(10) + stream.read() == files[rel_path.replace(os.sep, "/")].encode()
+    assert len(get_archive_reader(members[order[0]].archive_path).gzip.checkpoints) > 10
+
+def listed(*versions):
+    listings = align_archive_roots([(version, VersionComparator(version, version).list_version_files(version))
+                                    for version in versions])
+    return [sorted(path.replace(os.sep, "/") for path in files) for files in listings]
+
+def test_wrapper_stripping_is_decided_together(tmp_path):
+    package_only = ArchiveSource(write_archive(tmp_path / "a.zip", {"mypkg/m.py": "x = 1\n"}))
+    with_setup = ArchiveSource(write_archive(tmp_path / "b.tar.gz", {"mypkg/m.py": "x = 2\n", "setup.py": ""}))
+    assert listed(package_only, with_setup) == [["mypkg/m.py"], ["mypkg/m.py", "setup.py"]]
+    
+    # A release wrapper on one side only, or on both sides
+    release = ArchiveSource(write_archive(tmp_path / "c.tar", {"m.py": "", "setup.py": ""}, "mypkg-2.0/"))
+    unwrapped = ArchiveSource(write_archive(tmp_path / "d.zip", {"m.py": "", "setup.py": ""}))
+    assert listed(package_only, release) == [["m.py"], ["m.py", "setup.py"]]
+    assert listed(release, unwrapped) == [["m.py", "setup.py"], ["m.py", "setup.py"]]
+    assert listed(release, write_tree(tmp_path / "dir", {"m.py": ""}))[0] == ["m.py", "setup.py"]
+    assert listed(package_only, write_tree(tmp_path / "tree", {"mypkg/m.py": ""}))[0] == ["mypkg/m.py"]
+    
+    assert listed(ArchiveSource(package_only.archive_path, strip_root=False), release) == \
+        [["mypkg/m.py"], ["m.py", "setup.py"]]
+    assert listed(ArchiveSource(package_only.archive_path, strip_root=True), with_setup) == \
+        [["m.py"], ["mypkg/m.py", "setup.py"]]
+
+def test_one_sided_wrapper_compares_as_modified(tmp_path):
+    comparator = VersionComparator(
+        ArchiveSource(write_archive(tmp_path / "a.zip", {"mypkg/m.py": "x = 1\n"})),
+        ArchiveSource(write_archive(tmp_path / "b.zip", {"mypkg/m.py": "x = 2\n", "setup.py": "setup()\n"}))
+    )
+    results = comparator.run_comparison()
+    assert (results["modified_count"], results["added_count"], results["deleted_count"]) == (1, 1, 0)
+
+def test_limits(tmp_path):
+    path = write_archive(tmp_path / "v.tar.gz", V1_FILES)
+    with pytest.raises(ValueError, match="more than 3 entries"):
+        ArchiveSource(path, max_members=3).list_files()
+    with pytest.raises(ValueError, match="expands to more than 100 bytes"):
+        ArchiveSource(path, max_total_size=100).list_files()
+    assert len(ArchiveSource(path, max_members=len(V1_FILES)).list_files()) == 6
+    
+    broken = tmp_path / "broken.tar.gz"
+    broken.write_bytes(b"not an archive")
+    with pytest.raises(ValueError, match="Cannot read archive"):
+        ArchiveSource(broken).list_files()
@@ -0,0 +1,68 @@
+import itertools
+import sqlite3
+
+import comparison_cache
+from comparison_cache import ComparisonCache
+
+COMPARISON = {"similarity": 50.0, "added": 1, "removed": 2, "changed": 2}
+
+def last_used(cache_dir, table="comparisons"):
+    conn = sqlite3.connect(str(cache_dir / "comparisons.sqlite3"))
+    try:
+        return conn.execute(f"SELECT last_used FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+
+def test_put_flush_and_get(tmp_path):
+    cache = ComparisonCache(tmp_path)
+    assert cache.get("a", "b", "difflib-1") is None
+    cache.put("a", "b", "difflib-1", COMPARISON)
+    cache.flush()
+    assert cache.get("a", "b", "difflib-1") == COMPARISON
+    assert cache.get("a", "b", "myers-1") is None
+    assert cache.stats()["hits"] == 1
+    cache.close()
+
+def test_hits_do_not_lock_the_database(tmp_path):
+    first = ComparisonCache(tmp_path, busy_timeout=0.5)
+    first.put("a", "b", "difflib-1", COMPARISON)
+    first.put_symbols("a", "ast-1", {"symbols": {}})
+    first.flush()
+    
+    # A lookup followed by a long diff: the other process must still be able to write
+    assert first.get("a", "b", "difflib-1") == COMPARISON
+    assert first.get_symbols("a", "ast-1") == {"symbols": {}}
+    second = ComparisonCache(tmp_path, busy_timeout=0.5)
+    second.put("c", "d", "difflib-1", COMPARISON)
+    second.flush()
+    assert second.get("c", "d", "difflib-1") == COMPARISON
+    first.close()
+    second.close()
+
+def test_hit_times_are_written_on_flush(tmp_path, monkeypatch):
+    clock = itertools.count(1000)
+    monkeypatch.setattr(comparison_cache.time, "time", lambda: float(next(clock)))
+    cache = ComparisonCache(tmp_path)
+    cache.put("a", "b", "difflib-1", COMPARISON)
+    cache.put_symbols("a", "ast-1", {"symbols": {}})
+    cache.flush()
+    stored, stored_symbols = last_used(tmp_path), last_used(tmp_path, "symbols")
+    
+    cache.get("a", "b", "difflib-1")
+    cache.get_symbols("a", "ast-1")
+    assert last_used(tmp_path) == stored
+    cache.flush()
+    assert last_used(tmp_path) > stored
+    assert last_used(tmp_path, "symbols") > stored_symbols
+    cache.close()
+
+def test_evicts_least_recently_used(tmp_path, monkeypatch):
+    clock = itertools.count(1000)
+    monkeypatch.setattr(comparison_cache.time, "time", lambda: float(next(clock)))
+    cache = ComparisonCache(tmp_path, max_entries=2)
+    for name in ("a", "b", "c"):
+        cache.put(name, "x", "difflib-1", COMPARISON)
+        cache.flush()
+    assert cache.get("a", "x", "difflib-1") is None
+    assert cache.get("c", "x", "difflib-1") == COMPARISON
+    cache.close()
@@ -0,0 +1,46 @@
+import asyncio
+import json
+import os
+from http import HTTPStatus
+
+from comparison_service import ComparisonService, remove_job_inputs
+
+def make_file(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("content\n")
+    return path
+
+def test_only_uploaded_inputs_are_removed(tmp_path):
+    upload_dir = tmp_path / "temp"
+    uploaded = make_file(upload_dir / "upload-1" / "v1-a.zip")
+    outside = make_file(tmp_path / "project" / "keep.zip")
+    loose = make_file(upload_dir / "loose.zip")
+    escaped = upload_dir / "upload-1" / ".." / ".." / "project" / "keep.zip"
+    os.symlink(outside, upload_dir / "upload-1" / "link.zip")
+    
+    for path in (outside, loose, escaped, upload_dir / "upload-1" / "link.zip"):
+        remove_job_inputs({"version1": str(path)}, upload_dir)
+    assert outside.is_file() and loose.is_file()
+    
+    (upload_dir / "upload-1" / "link.zip").unlink()
+    remove_job_inputs({"version1": str(uploaded), "version2": str(outside)}, upload_dir)
+    assert not (upload_dir / "upload-1").exists()
+    assert outside.is_file()
+
+def test_remove_inputs_outside_the_upload_dir_is_rejected(tmp_path):
+    service = ComparisonService(tmp_path / "store", upload_dir=tmp_path / "temp")
+    service.queue = asyncio.Queue()
+    outside = make_file(tmp_path / "project" / "keep.pdf")
+    uploaded = make_file(tmp_path / "temp" / "upload-1" / "doc1-a.pdf")
+    
+    def submit(document1):
+        payload = {"type": "pdf", "document1": str(document1), "document2": str(uploaded), "remove_inputs": True}
+        return service.route("POST", "/jobs", json.dumps(payload).encode())
+    
+    status, body = submit(outside)
+    assert status == HTTPStatus.BAD_REQUEST
+    assert "remove_inputs" in body["error"]
+    assert service.queue.qsize() == 0
+    status, _ = submit(uploaded)
+    assert status == HTTPStatus.ACCEPTED
+    assert service.queue.qsize() == 1
@@ -0,0 +1,170 @@
+import difflib
+import random
+
+import pytest
+
+import diff_engine
+from diff_engine import (
+    MYERS_MAX_EDITS, aligned_matches, compute_diff, compute_myers_diff, myers_distance, tiered_diff
+)
+
+def old_diff_stats(lines1, lines2):
+    """The two-pass computation compute_diff replaced: ratio() plus a unified_diff scan."""
+    if not lines1 and not lines2:
+        similarity = 100.0
+    elif not lines1 or not lines2:
+        similarity = 0.0
+    else:
+        similarity = difflib.SequenceMatcher(None, lines1, lines2).ratio() * 100
+    
+    added = 0
+    removed = 0
+    for line in difflib.unified_diff(lines1, lines2, lineterm=''):
+        if line.startswith('+') and not line.startswith('+++'):
+            added += 1
+        elif line.startswith('-') and not line.startswith('---'):
+            removed += 1
+    
+    return {
+        "similarity": similarity,
+        "added": added,
+        "removed": removed,
+        "changed": max(added, removed)
+    }
+
+def lcs_distance(seq1, seq2):
+    """Insertions plus deletions of a shortest edit script, by dynamic programming."""
+    previous = [0] * (len(seq2) + 1)
+    for item in seq1:
+        current = [0]
+        for j, other in enumerate(seq2):
+            current.append(previous[j] + 1 if item == other else max(previous[j + 1], current[j]))
+        previous = current
+    return len(seq1) + len(seq2) - 2 * previous[-1]
+
+def random_lines(rng, max_lines=40, alphabet="abcdef"):
+    # A small alphabet gives plenty of repeated lines, the hard case for matching
+    return [rng.choice(alphabet) + ("\n" if rng.random() < 0.9 else "")
+            for _ in range(rng.randint(0, max_lines))]
+
+def assert_same_stats(result, expected):
+    assert result["similarity"] == pytest.approx(expected["similarity"])
+    assert (result["added"], result["removed"], result["changed"]) == \
+        (expected["added"], expected["removed"], expected["changed"])
+
+@pytest.mark.parametrize("seed", range(20))
+def test_compute_diff_matches_old_counting(seed):
+    rng = random.Random(seed)
+    for _ in range(50):
+        lines1 = random_lines(rng)
+        lines2 = random_lines(rng)
+        assert_same_stats(compute_diff(lines1, lines2), old_diff_stats(lines1, lines2))
+
+@pytest.mark.parametrize("seed", range(5))
+def test_compute_diff_matches_old_counting_on_edited_copies(seed):
+    rng = random.Random(seed)
+    lines1 = [f"line {rng.randint(0, 50)}\n" for _ in range(300)]
+    lines2 = list(lines1)
+    for _ in range(30):
+        position = rng.randrange(len(lines2))
+        edit = rng.random()
+        if edit < 0.3:
+            del lines2[position]
+        elif edit < 0.6:
+            lines2.insert(position, f"inserted {rng.randint(0, 9)}\n")
+        else:
+            lines2[position] = f"changed {rng.randint(0, 9)}\n"
+    assert_same_stats(compute_diff(lines1, lines2), old_diff_stats(lines1, lines2))
+
+@pytest.mark.parametrize("lines1, lines2", [
+    ([], []),
+    ([], ["a\n", "b\n"]),
+    (["a\n", "b\n"], []),
+    (["a\n", "b\n"], ["a\n", "b\n"]),
+    (["a\n", "b\n"], ["c\n", "d\n"]),
+    (["a\n", "b"], ["a\n", "b\n"]),
+    (["a\n"] * 10, ["a\n"] * 7),
+    (["x\n"] + ["a\n"] * 5, ["a\n"] * 5 + ["x\n"])
+])
+def test_compute_diff_edge_cases(lines1, lines2):
+    assert_same_stats(compute_diff(lines1, lines2), old_diff_stats(lines1, lines2))
+
+def test_lines_starting_with_plus_plus_or_minus_minus_are_counted():
+    lines1 = ["keep\n", "--old option\n", "x = 1\n"]
+    lines2 = ["keep\n", "++counter;\n", "x = 1\n"]
+    
+    # The old scan took these lines for the ---/+++ file headers
+    old = old_diff_stats(lines1, lines2)
+    assert (old["added"], old["removed"]) == (0, 0)
+    
+    stats = compute_diff(lines1, lines2)
+    assert (stats["added"], stats["removed"], stats["changed"]) == (1, 1, 1)
+    assert stats["similarity"] == pytest.approx(old["similarity"])
+
+@pytest.mark.parametrize("seed", range(10))
+def test_myers_distance_is_shortest_edit_script(seed):
+    rng = random.Random(seed)
+    for _ in range(50):
+        seq1 = random_lines(rng, max_lines=25, alphabet="abc")
+        seq2 = random_lines(rng, max_lines=25, alphabet="abc")
+        assert myers_distance(seq1, seq2) == lcs_distance(seq1, seq2)
+
+def test_myers_distance_gives_up_past_max_edits():
+    seq1 = list(range(20))
+    seq2 = list(range(5)) + [-1] * 3 + list(range(8, 20))
+    assert myers_distance(seq1, seq2) == 6
+    assert myers_distance(seq1, seq2, max_edits=6) == 6
+    assert myers_distance(seq1, seq2, max_edits=5) is None
+    assert myers_distance([], [1, 2, 3], max_edits=2) is None
+
+def common_ends(seq1, seq2):
+    """Length of the common prefix plus the common suffix."""
+    prefix = 0
+    while prefix < min(len(seq1), len(seq2)) and seq1[prefix] == seq2[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < min(len(seq1), len(seq2)) - prefix and seq1[-1 - suffix] == seq2[-1 - suffix]:
+        suffix += 1
+    return prefix + suffix
+
+@pytest.mark.parametrize("window", [diff_engine.ANCHOR_WINDOW, 3])
+@pytest.mark.parametrize("seed", range(5))
+def test_anchored_matches_are_bounded_by_the_lcs(seed, window, monkeypatch):
+    # No edit budget, so everything but identical ranges goes through anchoring
+    monkeypatch.setattr(diff_engine, "MYERS_WORK_FACTOR", 0)
+    monkeypatch.setattr(diff_engine, "ANCHOR_WINDOW", window)
+    rng = random.Random(seed)
+    for _ in range(50):
+        seq1 = random_lines(rng, max_lines=25, alphabet="abcdefgh")
+        seq2 = random_lines(rng, max_lines=25, alphabet="abcdefgh")
+        lcs = (len(seq1) + len(seq2) - lcs_distance(seq1, seq2)) // 2
+        matches, exact = aligned_matches(seq1, seq2)
+        assert common_ends(seq1, seq2) <= matches <= lcs
+        if exact:
+            assert matches == lcs
+
+def test_anchoring_resynchronises_after_a_long_insertion(monkeypatch):
+    monkeypatch.setattr(diff_engine, "MYERS_WORK_FACTOR", 0)
+    monkeypatch.setattr(diff_engine, "ANCHOR_WINDOW", 10)
+    seq1 = list(range(100))
+    assert aligned_matches(seq1, list(range(-50, 0)) + seq1 + [-1]) == (100, False)
+    assert aligned_matches(seq1 + [-1], list(range(-50, 0)) + seq1) == (100, False)
+
+def test_myers_backend_aligns_divergent_files():
+    lines1 = [f"old {i}\n" for i in range(MYERS_MAX_EDITS)]
+    lines2 = [f"new {i}\n" for i in range(MYERS_MAX_EDITS)] + lines1[:10]
+    stats = compute_myers_diff(lines1, lines2)
+    assert (stats["added"], stats["removed"]) == (MYERS_MAX_EDITS, MYERS_MAX_EDITS - 10)
+    assert stats["similarity"] == pytest.approx(2 * 10 / (2 * MYERS_MAX_EDITS + 10) * 100)
+
+@pytest.mark.parametrize("threshold", [0, 50, 90, 100])
+def test_tiered_diff_agrees_with_exact_diff_on_the_threshold(threshold):
+    rng = random.Random(threshold)
+    for _ in range(100):
+        lines1 = random_lines(rng)
+        lines2 = random_lines(rng)
+        exact = compute_myers_diff(lines1, lines2)
+        comparison, tier = tiered_diff(lines1, lines2, threshold, compute_myers_diff, lcs_exact=True)
+        assert (comparison["similarity"] >= threshold) == (exact["similarity"] >= threshold)
+        if tier == "exact":
+            assert comparison == exact
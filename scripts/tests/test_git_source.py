@@ -0,0 +1,141 @@
+import multiprocessing
+import os
+import shutil
+import subprocess
+
+import pytest
+
+import git_source
+from git_source import GitBatchReader, GitTreeSource, get_batch_reader
+from version_comparator import VersionComparator
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+V1_FILES = {
+    "README": "Demo project\n",
+    "app.py": "def main():\n    return 1\n",
+    "lib/util.py": "".join(f"value_{i} = {i}\n" for i in range(200)),
+    "lib/old_name.py": "".join(f"# moved line {i}\n" for i in range(40)),
+    "docs/guide with spaces.md": "# Guide\n\nFirst version.\n",
+    "docs/ünïcode.txt": "héllo\n",
+    "empty.txt": "",
+    "config.json": "{\n  \"debug\": false\n}\n",
+    "node_modules/dep/index.js": "module.exports = 1\n",
+    "image.png": "not compared\n"
+}
+
+V2_FILES = {
+    "README": "Demo project\n",
+    "app.py": "def main():\n    return 2\n\ndef helper():\n    pass\n",
+    "lib/util.py": "".join(f"value_{i} = {i * 2 if i % 10 == 0 else i}\n" for i in range(200)),
+    "lib/new_name.py": "".join(f"# moved line {i}\n" for i in range(40)),
+    "docs/guide with spaces.md": "# Guide\n\nSecond version.\n",
+    "docs/ünïcode.txt": "héllo\n",
+    "empty.txt": "",
+    "added.yaml": "key: value\n",
+    "node_modules/dep/index.js": "module.exports = 2\n",
+    "image.png": "still not compared\n"
+}
+
+def write_tree(root, files):
+    for rel_path, content in files.items():
+        path = root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+def git(repo, *args):
+    subprocess.run(
+        ["git", "-C", str(repo), "-c", "user.name=Test", "-c", "user.email=test@example.com", *args],
+        check=True, capture_output=True
+    )
+
+@pytest.fixture
+def versions(tmp_path):
+    """A repository with tags v1 and v2, plus the same two trees as plain directories."""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    git(repo, "init", "-q")
+    for tag, files in (("v1", V1_FILES), ("v2", V2_FILES)):
+        for child in repo.iterdir():
+            if child.is_dir() and child.name != ".git":
+                shutil.rmtree(child)
+            elif child.is_file() or child.is_symlink():
+                child.unlink()
+        write_tree(repo, files)
+        if tag == "v1":
+            # Symlinks have no content to compare and are skipped
+            os.symlink("app.py", repo / "link.py")
+        git(repo, "add", "-A")
+        git(repo, "commit", "-q", "-m", tag)
+        git(repo, "tag", tag)
+        write_tree(tmp_path / tag, files)
+    yield repo, tmp_path / "v1", tmp_path / "v2"
+    git_source._close_batch_readers()
+
+def comparison_rows(comparator):
+    return sorted(
+        (fc.filename, fc.status, round(fc.similarity_score, 6), fc.lines_added,
+         fc.lines_removed, fc.lines_changed, fc.old_filename)
+        for fc in comparator.file_comparisons
+    )
+
+def test_list_files_matches_directory_scan(versions):
+    repo, dir1, _ = versions
+    comparator = VersionComparator(dir1, dir1)
+    scanned = comparator.list_version_files(str(dir1))
+    listed = GitTreeSource(repo, "v1").list_files()
+    
+    assert sorted(listed) == sorted(scanned)
+    for rel_path, blob in listed.items():
+        content = scanned[rel_path].read_bytes()
+        assert blob.read_bytes() == content
+        assert blob.size == len(content)
+        assert blob.name == rel_path.replace(os.sep, "/")
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_git_comparison_equals_directory_comparison(versions, workers):
+    repo, dir1, dir2 = versions
+    # Start the cat-file process before the pool forks, so the workers must drop it
+    get_batch_reader(str(repo))
+    
+    from_dirs = VersionComparator(str(dir1), str(dir2), workers=workers, chunk_size=2)
+    from_git = VersionComparator(GitTreeSource(repo, "v1"), GitTreeSource(repo, "v2"),
+                                 workers=workers, chunk_size=2)
+    results_dirs = from_dirs.run_comparison()
+    results_git = from_git.run_comparison()
+    
+    assert comparison_rows(from_git) == comparison_rows(from_dirs)
+    for key in ("total_files", "unchanged_count", "modified_count", "added_count",
+                "deleted_count", "renamed_count", "total_lines_added", "total_lines_removed"):
+        assert results_git[key] == results_dirs[key], key
+    assert results_git["renamed_count"] == 1
+    assert results_git["modified_count"] == 3
+
+def test_batch_reader_reads_consecutive_objects(versions):
+    repo, dir1, _ = versions
+    blobs = GitTreeSource(repo, "v1").list_files()
+    reader = GitBatchReader(str(repo))
+    try:
+        # Back and forth over the same pipe, including an empty blob
+        for rel_path in sorted(blobs) * 2:
+            assert reader.read(blobs[rel_path].sha) == (dir1 / rel_path).read_bytes()
+        with pytest.raises(KeyError):
+            reader.read("0" * 40)
+        # The pipe is still in sync after a missing object
+        assert reader.read(blobs["app.py"].sha) == (dir1 / "app.py").read_bytes()
+    finally:
+        reader.close()
+
+def _reader_state_in_child(repo_path):
+    inherited = len(git_source._batch_readers)
+    reader = get_batch_reader(repo_path)
+    return inherited, reader.process.pid
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_forked_process_starts_its_own_reader(versions):
+    repo = str(versions[0])
+    parent_pid = get_batch_reader(repo).process.pid
+    with multiprocessing.get_context("fork").Pool(1) as pool:
+        inherited, child_pid = pool.apply(_reader_state_in_child, (repo,))
+    assert inherited == 0
+    assert child_pid != parent_pid
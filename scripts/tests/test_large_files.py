@@ -0,0 +1,52 @@
+import random
+
+from comparison_cache import ComparisonCache
+from diff_engine import compute_myers_diff
+from large_files import compare_large_files
+from report_generator import file_comparison_record
+from version_comparator import VersionComparator
+
+LINES = [f"entry {i} value {i * 7919 % 10007}\n" for i in range(2000)]
+
+def write_lines(path, lines):
+    path.write_text("".join(lines), encoding="utf-8")
+    return path
+
+def test_few_edits_are_exact(tmp_path):
+    edited = list(LINES)
+    edited[100:110] = ["changed\n"] * 5
+    del edited[1500]
+    comparison = compare_large_files(write_lines(tmp_path / "a.txt", LINES), write_lines(tmp_path / "b.txt", edited))
+    assert comparison == compute_myers_diff(LINES, edited)
+    assert "estimated" not in comparison
+
+def test_shuffled_lines_are_not_unchanged(tmp_path):
+    shuffled = list(LINES)
+    random.Random(0).shuffle(shuffled)
+    comparison = compare_large_files(write_lines(tmp_path / "a.txt", LINES), write_lines(tmp_path / "b.txt", shuffled))
+    assert comparison["estimated"] is True
+    assert comparison["similarity"] < 10
+    assert comparison["added"] == comparison["removed"] > 1800
+
+def test_moved_block_keeps_line_order(tmp_path):
+    moved = LINES[1000:] + LINES[:1000]
+    comparison = compare_large_files(write_lines(tmp_path / "a.txt", LINES), write_lines(tmp_path / "b.txt", moved))
+    # Half the file can stay aligned, the other half has to move
+    assert comparison["similarity"] == 50.0
+    assert comparison["estimated"] is True
+
+def test_estimates_are_flagged_through_the_cache(tmp_path):
+    for version, lines in (("v1", LINES), ("v2", LINES[::-1])):
+        (tmp_path / version).mkdir()
+        write_lines(tmp_path / version / "data.txt", lines)
+    
+    for _ in range(2):
+        # The second run answers from the cache
+        cache = ComparisonCache(tmp_path / "cache")
+        comparator = VersionComparator(tmp_path / "v1", tmp_path / "v2", cache=cache, large_file_threshold=1)
+        results = comparator.run_comparison()
+        cache.close()
+        assert results["estimated_count"] == 1
+        fc = comparator.file_comparisons[0]
+        assert fc.status == "modified" and fc.estimated
+        assert file_comparison_record(fc)["estimated"] is True
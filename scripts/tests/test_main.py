@@ -0,0 +1,25 @@
+import pytest
+
+from main import DEMO_VERSIONS, parse_args
+
+@pytest.mark.parametrize("option", [
+    ["--setup-demo"], ["--stages", "compare"], ["--formats", "json"], ["--no-renames"],
+    ["--rename-threshold", "60"], ["--similarity-threshold", "50"], ["--structural"],
+    ["--manifest", "m.json"], ["--max-listed", "3"], ["--chart-format", "svg"], ["--dpi", "72"],
+    ["--profile", "p.json"], ["--prometheus", "p.prom"]
+])
+def test_matrix_rejects_pipeline_only_options(option, capsys):
+    with pytest.raises(SystemExit):
+        parse_args(["a", "b", "c", "--matrix"] + option)
+    assert f"not supported with --matrix: {option[0]}" in capsys.readouterr().err
+
+def test_matrix_and_pipeline_arguments():
+    args = parse_args(["a", "b", "c", "--matrix", "--workers", "2", "--algorithm", "myers",
+                       "--normalize", "all", "--cache-dir", "cache"])
+    assert args.versions == ["a", "b", "c"]
+    assert (args.old, args.new) == ("a", "c")
+    assert parse_args([]).versions == list(DEMO_VERSIONS)
+    with pytest.raises(SystemExit):
+        parse_args(["a", "b", "c"])
+    with pytest.raises(SystemExit):
+        parse_args(["a", "--matrix"])
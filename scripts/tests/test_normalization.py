@@ -0,0 +1,71 @@
+import pytest
+
+from normalization import bytes_line_normalizer, normalized_line_ids, strip_comments, validate_modes
+
+@pytest.mark.parametrize("extension, lines, expected", [
+    (".py", ['s = "# not a comment"  # comment\n', "t = '#'\n"], ['s = "# not a comment"\n', "t = '#'\n"]),
+    (".py", ['"""Docstring\n', '# inside the docstring\n', '"""  # after\n'],
+     ['"""Docstring\n', '# inside the docstring\n', '"""\n']),
+    (".c", ['puts("// not /* a comment */"); // comment\n'], ['puts("// not /* a comment */");\n']),
+    (".js", ["const url = `http://x\n", "// still the template`; // comment\n"],
+     ["const url = `http://x\n", "// still the template`;\n"]),
+    (".md", ["Text <!-- note --> more\n"], ["Text more\n"])
+])
+def test_comment_markers_inside_strings(extension, lines, expected):
+    assert strip_comments(lines, extension) == expected
+
+@pytest.mark.parametrize("extension, lines, expected", [
+    (".c", ["int a; /* start\n", "   still a comment\n", "end */ int b;\n", "int c;\n"],
+     ["int a;\n", " int b;\n", "int c;\n"]),
+    (".java", ["/**\n", " * Javadoc\n", " */\n", "class A {}\n"], ["class A {}\n"]),
+    (".md", ["<!--\n", "hidden\n", "-->\n", "# Title\n"], ["# Title\n"])
+])
+def test_block_comments_across_lines(extension, lines, expected):
+    assert strip_comments(lines, extension) == expected
+
+def test_yaml_hash_only_starts_a_comment_after_whitespace():
+    lines = [
+        "# header\n",
+        "url: http://example.com/#anchor\n",
+        "color: '#fff' # comment\n",
+        'title: "Issue #4"\n',
+        "key: value # comment\n",
+        "  # indented comment\n"
+    ]
+    assert strip_comments(lines, ".yml") == [
+        "url: http://example.com/#anchor\n",
+        "color: '#fff'\n",
+        'title: "Issue #4"\n',
+        "key: value\n"
+    ]
+
+@pytest.mark.parametrize("extension, lines, comment", [
+    (".py", ['s = "abc\\\n', '# still string"\n'], "# comment\n"),
+    (".py", ["s = 'abc\\\r\n", "# still string'\r\n"], "# comment\r\n"),
+    (".c", ['char *s = "abc\\\n', '// still string";\n'], "// comment\n"),
+    (".yaml", ['key: "abc\\\n', '  # still string"\n'], "# comment\n")
+])
+def test_backslash_continued_strings(extension, lines, comment):
+    assert strip_comments(lines, extension) == lines
+    # The string ends on the second line, so a following comment is still removed
+    assert strip_comments(lines + [comment], extension) == lines
+
+def test_files_without_comment_syntax_are_unchanged():
+    lines = ['{"url": "http://x"}  // not JSON comments\n']
+    assert strip_comments(lines, ".json") is lines
+
+def test_normalized_line_ids():
+    ids = normalized_line_ids(["a = 1\r\n", "\n", "b  =  2"], {"whitespace", "blank_lines"})
+    assert ids == normalized_line_ids(["a=1\n", "b=2\n"], {"whitespace"})
+    assert normalized_line_ids(["x\r\n"], {"line_endings"}) == normalized_line_ids(["x"], {"line_endings"})
+    assert normalized_line_ids(["x = 1  # note\n"], {"comments"}, ".py") == \
+        normalized_line_ids(["x = 1\n"], set(), ".py")
+    with pytest.raises(ValueError, match="Unknown normalization mode"):
+        validate_modes(["tabs"])
+
+def test_bytes_line_normalizer_matches_text_modes():
+    assert bytes_line_normalizer(set()) is None
+    normalize = bytes_line_normalizer({"whitespace", "blank_lines"})
+    assert normalize(b"  \r\n") is None
+    assert normalize(b"a  =  1\r\n") == b"a=1"
+    assert bytes_line_normalizer({"line_endings"})(b"x\r\n") == b"x"
@@ -0,0 +1,94 @@
+import pytest
+
+pytest.importorskip("pypdf")
+matplotlib = pytest.importorskip("matplotlib")
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_pdf import PdfPages
+
+import pdf_comparator
+from pdf_comparator import PdfComparator, PdfTextCache
+
+DOC1_PAGES = [
+    ["Introduction", "Alpha line one", "Alpha line two"],
+    ["Details", "Beta removed line", "Shared closing line"]
+]
+DOC2_PAGES = [
+    ["Introduction", "Alpha line one", "Alpha line 2"],
+    ["Details", "Shared closing line"],
+    ["Appendix added"]
+]
+
+def write_pdf(path, pages):
+    """One PDF page per list of text lines."""
+    with PdfPages(path) as pdf:
+        for lines in pages:
+            figure = plt.figure(figsize=(8.5, 11))
+            for index, line in enumerate(lines):
+                figure.text(0.1, 0.9 - index * 0.05, line)
+            pdf.savefig(figure)
+            plt.close(figure)
+    return path
+
+@pytest.fixture
+def documents(tmp_path):
+    return write_pdf(tmp_path / "doc1.pdf", DOC1_PAGES), write_pdf(tmp_path / "doc2.pdf", DOC2_PAGES)
+
+def chars(*lines):
+    return sum(len(line) for line in lines)
+
+def test_differences_pages_and_percentages(documents):
+    results = PdfComparator(*documents).run_comparison()
+    
+    assert results["doc1_pages"] == 2
+    assert results["doc2_pages"] == 3
+    assert results["differences"] == [
+        {"type": "modified", "text": "Alpha line 2", "page": 1},
+        {"type": "removed", "text": "Beta removed line", "page": 2},
+        {"type": "added", "text": "Appendix added", "page": 3}
+    ]
+    # 4 of 6 lines on each side match
+    assert results["similarity"] == pytest.approx(2 * 4 / 12 * 100)
+    assert (results["lines_added"], results["lines_removed"]) == (2, 2)
+    
+    common = chars("Introduction", "Alpha line one", "Details", "Shared closing line")
+    unique1 = chars("Alpha line two", "Beta removed line")
+    unique2 = chars("Alpha line 2", "Appendix added")
+    total = common + unique1 + unique2
+    assert results["common_percentage"] == pytest.approx(common / total * 100)
+    assert results["unique1_percentage"] == pytest.approx(unique1 / total * 100)
+    assert results["unique2_percentage"] == pytest.approx(unique2 / total * 100)
+    assert results["common_text"].startswith("Introduction Alpha line one")
+
+def test_identical_documents(documents):
+    results = PdfComparator(documents[0], documents[0]).run_comparison()
+    assert results["similarity"] == 100.0
+    assert results["common_percentage"] == 100.0
+    assert results["differences"] == []
+
+def test_text_cache_hit_skips_extraction(documents, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    first = PdfComparator(*documents, cache_dir=cache_dir).run_comparison()
+    assert len(list((cache_dir / "pdf_text").glob("*.json"))) == 2
+    
+    def fail_open(pdf_path):
+        raise AssertionError(f"{pdf_path} was read again despite the cache")
+    
+    monkeypatch.setattr(pdf_comparator, "_open_pdf", fail_open)
+    second = PdfComparator(*documents, cache_dir=cache_dir).run_comparison()
+    assert second == first
+
+def test_text_cache_round_trip(tmp_path):
+    cache = PdfTextCache(tmp_path)
+    assert cache.get("missing") is None
+    cache.put("digest", ["page one", ""])
+    assert cache.get("digest") == ["page one", ""]
+
+def test_parallel_extraction_matches_serial(documents, monkeypatch):
+    serial = PdfComparator(*documents).run_comparison()
+    monkeypatch.setattr(pdf_comparator, "PARALLEL_PAGE_THRESHOLD", 2)
+    monkeypatch.setattr(pdf_comparator, "PAGES_PER_TASK", 1)
+    comparator = PdfComparator(*documents, workers=2)
+    assert comparator.extract_pages(documents[1]) == ["\n".join(lines) for lines in DOC2_PAGES]
+    assert comparator.run_comparison() == serial
@@ -0,0 +1,66 @@
+import textwrap
+
+from structural_diff import compare_symbols, symbol_fingerprints
+
+SOURCE = textwrap.dedent('''
+    from typing import TYPE_CHECKING
+    
+    if TYPE_CHECKING:
+        def typed(): pass
+    
+    try:
+        from fast import speedup
+    except ImportError:
+        def speedup(x):
+            return x
+    else:
+        def accelerated(): pass
+    finally:
+        def cleanup(): pass
+    
+    class Widget:
+        if PY2:
+            def size(self): return 1
+        else:
+            def size(self): return 2
+        
+        with lock:
+            def locked(self): pass
+    
+    def outer():
+        for i in range(3):
+            def inner(): return i
+        return 1
+''')
+
+def symbols(source):
+    return symbol_fingerprints(source)["symbols"]
+
+def test_definitions_in_compound_statements_are_symbols():
+    assert list(symbols(SOURCE)) == [
+        "typed", "speedup", "accelerated", "cleanup",
+        "Widget", "Widget.size", "Widget.size#2", "Widget.locked",
+        "outer", "outer.inner"
+    ]
+
+def test_nested_change_is_reported_once():
+    changed = SOURCE.replace("def size(self): return 2", "def size(self): return 3") \
+                    .replace("def inner(): return i", "def inner(): return i + 1")
+    assert compare_symbols(symbol_fingerprints(SOURCE), symbol_fingerprints(changed)) == {
+        "added": [],
+        "removed": [],
+        "modified": ["Widget.size#2", "outer.inner"]
+    }
+
+def test_fallback_definition_added():
+    before = "try:\n    from fast import speedup\nexcept ImportError:\n    pass\n"
+    after = "try:\n    from fast import speedup\nexcept ImportError:\n    def speedup(x):\n        return x\n"
+    assert compare_symbols(symbol_fingerprints(before), symbol_fingerprints(after))["added"] == ["speedup"]
+
+def test_moved_code_and_unparsable_sources():
+    moved = "\n\n" + SOURCE
+    assert compare_symbols(symbol_fingerprints(SOURCE), symbol_fingerprints(moved)) == {
+        "added": [], "removed": [], "modified": []
+    }
+    assert "error" in symbol_fingerprints("def broken(:\n")
+    assert compare_symbols(symbol_fingerprints("def broken(:\n"), symbol_fingerprints(SOURCE)) is None
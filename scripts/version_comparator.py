@@ -4,113 +4,675 @@ Generates detailed metrics about code changes, file modifications, and features.
 """
 
 import os
+import io
 import json
-import difflib
+import hashlib
+import time
+from functools import partial
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from diff_engine import SIMILARITY_TIERS, get_diff_function, tiered_diff
+from archive_source import align_archive_roots
+from large_files import compare_large_files
+from file_scanner import scan_directory
+from instrumentation import NULL_PROFILER
+from normalization import bytes_line_normalizer, normalized_line_ids, validate_modes
+from structural_diff import FINGERPRINT_VERSION, compare_symbols, is_python_file, symbol_fingerprints
+from comparison_manifest import ComparisonManifest
+from rename_detection import find_candidates, line_shingles, match_exact, match_similar, minhash_signature
 from collections import defaultdict
 from dataclasses import dataclass, asdict
 
 @dataclass
 class FileComparison:
     filename: str
-    status: str  # "unchanged", "modified", "added", "deleted"
+    status: str  # "unchanged", "modified", "added", "deleted", "renamed"
     similarity_score: float = 0.0
     lines_added: int = 0
     lines_removed: int = 0
     lines_changed: int = 0
+    old_filename: str = None  # previous path of a renamed file
+    symbols: dict = None  # added/removed/modified functions and classes (structural mode)
+    estimated: bool = False  # similarity approximated in large-file mode
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def hash_file(file_path):
+    """Stream a file through BLAKE2b and return its hex digest (None if unreadable)."""
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+# Bump when a change to the diff logic would alter cached results
+ALGORITHM_VERSION = 7
+
+IDENTICAL_COMPARISON = {
+    "similarity": 100.0,
+    "added": 0,
+    "removed": 0,
+    "changed": 0
+}
+
+def count_symbols(counts, comparison):
+    """Add a comparison's structural changes to running totals."""
+    symbols = comparison.get("symbols")
+    if symbols is not None:
+        counts["files"] += 1
+        for kind in ("added", "removed", "modified"):
+            counts[kind] += len(symbols[kind])
+
+def is_version_source(version):
+    """True for version sources (e.g. GitTreeSource) rather than plain directories."""
+    return hasattr(version, "list_files")
+
+def is_source_entry(file_ref):
+    """True for files that come from a version source instead of the filesystem."""
+    return not isinstance(file_ref, (str, Path)) and hasattr(file_ref, "read_bytes")
+
+def file_extension(file_ref):
+    """Suffix of a file path, or of the path a source entry was listed under."""
+    return os.path.splitext(str(getattr(file_ref, "name", file_ref)))[1]
+
+def _compare_chunk(version1_path, version2_path, options, pairs, known_different=False):
+    """Compare a chunk of file pairs inside a worker process."""
+    comparator = VersionComparator(version1_path, version2_path, **options)
+    compare = comparator.diff_files if known_different else comparator.compare_files
+    comparisons = [compare(file1, file2) for file1, file2 in pairs]
+    # The worker's measurements travel back with its results
+    return comparisons, options.get("profiler")
+
+def _fingerprint_chunk(options, files):
+    """Parse a chunk of Python files inside a worker process."""
+    comparator = VersionComparator(".", ".", **options)
+    return [comparator.fingerprint_file(file_ref) for file_ref in files], options.get("profiler")
 
 class VersionComparator:
-    def __init__(self, version1_path, version2_path):
-        self.version1_path = Path(version1_path)
-        self.version2_path = Path(version2_path)
+    def __init__(self, version1_path, version2_path, workers=1, chunk_size=64, cache=None,
+                 algorithm="difflib", large_file_threshold=32 * 1024 * 1024,
+                 ignore_patterns=None, use_gitignore=True, manifest_path=None,
+                 detect_renames=True, rename_threshold=50.0, similarity_threshold=None,
+                 structural=False, normalize=(), profiler=None):
+        """
+        Args:
+            version1_path: Directory (or version source, e.g. GitTreeSource) of the old version
+            version2_path: Directory (or version source) of the new version
+            workers: Number of worker processes (1 = serial, None or 0 = all CPUs)
+            chunk_size: Number of file pairs handed to a worker at a time
+            cache: Optional ComparisonCache reused across runs
+            algorithm: Diff backend name ("difflib" or "myers")
+            large_file_threshold: Files at or above this many bytes are compared
+                in memory-bounded large-file mode (None disables it)
+            ignore_patterns: gitignore-style patterns to skip (None = build/vendor/VCS dirs)
+            use_gitignore: Also honour .gitignore files inside the versions
+            manifest_path: Optional JSON manifest; when set, paths whose files are
+                unchanged since the previous run reuse their recorded results
+            detect_renames: Match deleted files to added files by content
+            rename_threshold: Minimum similarity (percent) for a match to count as a rename
+            similarity_threshold: Tiered mode (percent); a modified file is only diffed
+                exactly when cheap bounds cannot tell whether it is above or below
+                this similarity, otherwise it reports the deciding bound
+            structural: Also compare changed Python files function by function and
+                class by class (fingerprints are cached by content hash)
+            normalize: Normalization modes applied before diffing (any of
+                normalization.NORMALIZATION_MODES), e.g. ("whitespace", "comments")
+            profiler: Optional instrumentation.Profiler that records stage times
+                and per-file diff latencies
+        """
+        self.version1_path = version1_path if is_version_source(version1_path) else Path(version1_path)
+        self.version2_path = version2_path if is_version_source(version2_path) else Path(version2_path)
+        self.workers = workers if workers else (os.cpu_count() or 1)
+        self.chunk_size = max(1, chunk_size)
+        self.cache = cache
+        self.algorithm = algorithm
+        self.diff_function = get_diff_function(algorithm)
+        self.normalize = validate_modes(normalize)
+        self.large_line_normalizer = bytes_line_normalizer(self.normalize)
+        # Cache entries are only valid for the backend (and normalization) that produced them
+        self.normalize_id = "-norm:" + ",".join(sorted(self.normalize)) if self.normalize else ""
+        self.algorithm_id = f"{algorithm}-{ALGORITHM_VERSION}{self.normalize_id}"
+        self.large_file_threshold = large_file_threshold
+        self.ignore_patterns = ignore_patterns
+        self.use_gitignore = use_gitignore
+        self.manifest_path = manifest_path
+        self.detect_renames = detect_renames
+        self.rename_threshold = rename_threshold
+        self.similarity_threshold = similarity_threshold
+        self.structural = structural
+        self.profiler = profiler if profiler is not None else NULL_PROFILER
+        # Stat data gathered while scanning, so later stages don't re-stat
+        self.file_stats = {}
         self.file_comparisons = []
         self.results = {}
+        self._executor = None
     
     def get_all_files(self, directory, extensions=None):
         """Get all files from a directory with optional extension filtering."""
-        if extensions is None:
-            extensions = [".py", ".java", ".js", ".cpp", ".c", ".json", ".yaml", ".yml", ".txt", ".md"]
+        scanned = scan_directory(
+            directory,
+            extensions=extensions,
+            ignore_patterns=self.ignore_patterns,
+            use_gitignore=self.use_gitignore
+        )
         
         files = {}
-        for root, _, filenames in os.walk(directory):
-            for filename in filenames:
-                if any(filename.endswith(ext) for ext in extensions) or filename == "README":
-                    full_path = Path(root) / filename
-                    relative_path = full_path.relative_to(directory)
-                    files[str(relative_path)] = full_path
+        for relative_path, entry in scanned.items():
+            files[relative_path] = entry.path
+            self.file_stats[entry.path] = entry
         return files
     
+    def list_version_files(self, version):
+        """Files of one version: a directory scan, or the listing of a version source."""
+        with self.profiler.stage("scan"):
+            if is_version_source(version):
+                return version.list_files(ignore_patterns=self.ignore_patterns)
+            return self.get_all_files(version)
+    
+    def file_size(self, file_path):
+        """Size of a file, from the scan results when available."""
+        if is_source_entry(file_path):
+            return file_path.size
+        entry = self.file_stats.get(file_path)
+        if entry is None:
+            return os.path.getsize(file_path)
+        return entry.size
+    
+    def file_state(self, file_path):
+        """Size plus mtime (or content hash for source entries) recorded in the manifest."""
+        if is_source_entry(file_path):
+            return {"size": file_path.size, "hash": file_path.digest}
+        entry = self.file_stats.get(file_path)
+        if entry is None:
+            stat = os.stat(file_path)
+            return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        return {"size": entry.size, "mtime_ns": entry.mtime_ns}
+    
+    def content_hash(self, file_path):
+        """Content hash of a file (git blobs already carry one)."""
+        if is_source_entry(file_path):
+            return file_path.digest
+        with self.profiler.stage("hash"):
+            return hash_file(file_path)
+    
     def get_file_content(self, file_path):
         """Read file content safely."""
+        with self.profiler.stage("read"):
+            return self._read_lines(file_path)
+    
+    def get_file_lines(self, file_path):
+        """
+        What gets diffed for a file: its text lines, or with normalization on,
+        one hashed ID per normalized line (computed once per file read).
+        """
+        lines = self.get_file_content(file_path)
+        if not self.normalize:
+            return lines
+        with self.profiler.stage("normalize"):
+            return normalized_line_ids(lines, self.normalize, file_extension(file_path))
+    
+    def _read_lines(self, file_path):
         try:
+            if is_source_entry(file_path):
+                # Decode exactly like the text-mode open() below
+                stream = io.TextIOWrapper(io.BytesIO(file_path.read_bytes()), encoding='utf-8', errors='ignore')
+                return stream.readlines()
             with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
                 return f.readlines()
         except Exception:
             return []
     
     def calculate_similarity(self, lines1, lines2):
-        """Calculate similarity ratio between two files using difflib."""
-        if not lines1 and not lines2:
-            return 100.0
-        if not lines1 or not lines2:
-            return 0.0
-        
-        matcher = difflib.SequenceMatcher(None, lines1, lines2)
-        return matcher.ratio() * 100
+        """Calculate similarity ratio between two files using the configured diff backend."""
+        return self.diff_function(lines1, lines2)["similarity"]
     
     def get_diff_stats(self, lines1, lines2):
         """Calculate added, removed, and changed lines."""
-        diff = difflib.unified_diff(lines1, lines2, lineterm='')
-        
-        added = 0
-        removed = 0
-        
-        for line in diff:
-            if line.startswith('+') and not line.startswith('+++'):
-                added += 1
-            elif line.startswith('-') and not line.startswith('---'):
-                removed += 1
+        stats = self.diff_function(lines1, lines2)
+        return stats["added"], stats["removed"], stats["changed"]
+    
+    def files_identical(self, file1_path, file2_path):
+        """
+        Check whether two files are byte-identical without decoding them.
+        Sizes are compared first so that only same-size files get hashed.
+        """
+        try:
+            if self.file_size(file1_path) != self.file_size(file2_path):
+                return False
+        except OSError:
+            return False
         
-        return added, removed, max(added, removed)
+        hash1 = self.content_hash(file1_path)
+        return hash1 is not None and hash1 == self.content_hash(file2_path)
     
     def compare_files(self, file1_path, file2_path):
         """Compare two individual files."""
-        lines1 = self.get_file_content(file1_path)
-        lines2 = self.get_file_content(file2_path)
+        if self.files_identical(file1_path, file2_path):
+            # Identical bytes always diff to 100% similarity with no changed lines
+            return dict(IDENTICAL_COMPARISON)
+        return self.diff_files(file1_path, file2_path)
+    
+    def is_large_pair(self, file1_path, file2_path):
+        """Check whether either file is big enough for large-file mode."""
+        if self.large_file_threshold is None:
+            return False
+        try:
+            return max(self.file_size(file1_path), self.file_size(file2_path)) >= self.large_file_threshold
+        except OSError:
+            return False
+    
+    def cache_algorithm_id(self, file1_path, file2_path):
+        """Algorithm identifier under which this pair's result is cached."""
+        if self.is_large_pair(file1_path, file2_path):
+            return f"large-myers-{ALGORITHM_VERSION}{self.normalize_id}"
+        if self.similarity_threshold is not None:
+            # Bounded results only answer the question for this threshold
+            return f"{self.algorithm_id}-tiered{self.similarity_threshold:g}"
+        return self.algorithm_id
+    
+    @contextmanager
+    def exact_similarity(self):
+        """Compute exact diffs inside this block even in tiered mode."""
+        threshold = self.similarity_threshold
+        self.similarity_threshold = None
+        try:
+            yield
+        finally:
+            self.similarity_threshold = threshold
+    
+    def diff_files(self, file1_path, file2_path):
+        """Diff two files that are already known to differ."""
+        if not self.profiler.enabled:
+            return self._diff_files(file1_path, file2_path)
+        
+        started = time.perf_counter()
+        comparison = self._diff_files(file1_path, file2_path)
+        seconds = time.perf_counter() - started
+        try:
+            size = self.file_size(file1_path) + self.file_size(file2_path)
+        except OSError:
+            size = 0
+        self.profiler.record_file(file2_path, seconds, size)
+        return comparison
+    
+    def _diff_files(self, file1_path, file2_path):
+        if self.is_large_pair(file1_path, file2_path):
+            # Line hashes + Myers distance keep memory bounded whatever the backend
+            # (reading happens inside, so large files count entirely as "diff")
+            with self.profiler.stage("diff"):
+                comparison = compare_large_files(file1_path, file2_path, self.large_line_normalizer)
+            if self.similarity_threshold is not None:
+                comparison["tier"] = "exact"
+            return comparison
+        
+        lines1 = self.get_file_lines(file1_path)
+        lines2 = self.get_file_lines(file2_path)
         
-        similarity = self.calculate_similarity(lines1, lines2)
-        added, removed, changed = self.get_diff_stats(lines1, lines2)
+        with self.profiler.stage("diff"):
+            if self.normalize and lines1 == lines2:
+                # Formatting-only change
+                return dict(IDENTICAL_COMPARISON)
+            if self.similarity_threshold is not None:
+                comparison, tier = tiered_diff(
+                    lines1, lines2, self.similarity_threshold, self.diff_function,
+                    lcs_exact=self.algorithm == "myers"
+                )
+                comparison["tier"] = tier
+                return comparison
+            
+            # One diff pass gives both the similarity ratio and the line counts
+            return self.diff_function(lines1, lines2)
+    
+    def compare_common_files(self, pairs):
+        """
+        Compare (file1, file2) pairs, in parallel when more than one worker is configured.
+        Results are returned in the same order as the input pairs.
+        """
+        if self.cache is None:
+            return self._map_pairs(pairs)
         
+        # Resolve identical and previously seen pairs from their content hashes,
+        # then only diff the remaining pairs
+        comparisons = [None] * len(pairs)
+        pending = []
+        hashes = []
+        for index, (file1, file2) in enumerate(pairs):
+            hash1, hash2 = self.content_hash(file1), self.content_hash(file2)
+            hashes.append((hash1, hash2))
+            if hash1 is None or hash2 is None:
+                pending.append(index)
+            elif hash1 == hash2:
+                comparisons[index] = dict(IDENTICAL_COMPARISON)
+            else:
+                cached = self.cache.get(hash1, hash2, self.cache_algorithm_id(file1, file2))
+                if cached is None:
+                    pending.append(index)
+                else:
+                    comparisons[index] = cached
+        
+        computed = self._map_pairs([pairs[i] for i in pending], known_different=True)
+        for index, comparison in zip(pending, computed):
+            comparisons[index] = comparison
+            hash1, hash2 = hashes[index]
+            if hash1 is not None and hash2 is not None:
+                file1, file2 = pairs[index]
+                self.cache.put(hash1, hash2, self.cache_algorithm_id(file1, file2), comparison)
+        self.cache.flush()
+        
+        return comparisons
+    
+    def fingerprint_file(self, file_ref):
+        """Symbol fingerprints of one Python file."""
+        try:
+            with self.profiler.stage("read"):
+                source = file_ref.read_bytes() if is_source_entry(file_ref) else Path(file_ref).read_bytes()
+        except OSError as e:
+            return {"error": str(e)}
+        with self.profiler.stage("parse"):
+            return symbol_fingerprints(source)
+    
+    def fingerprint_files(self, files):
+        """
+        Symbol fingerprints for a dict of content hash -> file, taken from the
+        cache where possible and parsed (on the worker pool) otherwise.
+        """
+        fingerprints = {}
+        missing = []
+        for digest in files:
+            cached = None
+            if self.cache is not None:
+                cached = self.cache.get_symbols(digest, FINGERPRINT_VERSION)
+            if cached is None:
+                missing.append(digest)
+            else:
+                fingerprints[digest] = cached
+        
+        if self.workers <= 1 or len(missing) <= self.chunk_size:
+            parsed = [self.fingerprint_file(files[digest]) for digest in missing]
+        else:
+            chunks = [
+                [files[digest] for digest in missing[i:i + self.chunk_size]]
+                for i in range(0, len(missing), self.chunk_size)
+            ]
+            parsed = []
+            with self.worker_pool() as executor:
+                for chunk_result, chunk_profiler in executor.map(
+                    _fingerprint_chunk, [self.worker_options()] * len(chunks), chunks
+                ):
+                    parsed.extend(chunk_result)
+                    if chunk_profiler is not None:
+                        self.profiler.merge(chunk_profiler)
+        
+        for digest, result in zip(missing, parsed):
+            fingerprints[digest] = result
+            if self.cache is not None:
+                self.cache.put_symbols(digest, FINGERPRINT_VERSION, result)
+        if self.cache is not None and missing:
+            self.cache.flush()
+        return fingerprints
+    
+    def add_symbol_changes(self, filenames, pairs, comparisons):
+        """
+        Structural mode: give the comparison of each changed Python file a
+        "symbols" entry with its added, removed and modified functions and classes.
+        Comparisons are replaced by updated copies, never changed in place.
+        """
+        selected = []
+        files = {}
+        for index, (filename, (file1, file2)) in enumerate(zip(filenames, pairs)):
+            if comparisons[index]["similarity"] == 100.0 or not is_python_file(filename):
+                continue
+            # Large files are never read whole, so they are not parsed either
+            if self.is_large_pair(file1, file2):
+                continue
+            hash1, hash2 = self.content_hash(file1), self.content_hash(file2)
+            if hash1 is None or hash2 is None:
+                continue
+            files[hash1], files[hash2] = file1, file2
+            selected.append((index, hash1, hash2))
+        
+        if not selected:
+            return comparisons
+        fingerprints = self.fingerprint_files(files)
+        for index, hash1, hash2 in selected:
+            changes = compare_symbols(fingerprints[hash1], fingerprints[hash2])
+            if changes is not None:
+                comparisons[index] = dict(comparisons[index], symbols=changes)
+        return comparisons
+    
+    def find_renames(self, deleted_files, added_files):
+        """
+        Match deleted files to added files by content: identical files through a
+        hash index, similar ones through MinHash sketches and a verifying diff.
+        
+        Args:
+            deleted_files, added_files: Dicts mapping relative path -> file
+        
+        Returns:
+            Dict mapping added path -> (deleted path, comparison dict)
+        """
+        if not deleted_files or not added_files:
+            return {}
+        
+        def sizes(files):
+            result = {}
+            for path, file_ref in files.items():
+                try:
+                    result[path] = self.file_size(file_ref)
+                except OSError:
+                    pass
+            return result
+        
+        deleted_sizes, added_sizes = sizes(deleted_files), sizes(added_files)
+        
+        # Only files whose size occurs on the other side can be exact moves
+        deleted_size_set, added_size_set = set(deleted_sizes.values()), set(added_sizes.values())
+        exact = match_exact(
+            {p: self.content_hash(deleted_files[p]) for p, size in deleted_sizes.items() if size in added_size_set},
+            {p: self.content_hash(added_files[p]) for p, size in added_sizes.items() if size in deleted_size_set}
+        )
+        renames = {path: (source, dict(IDENTICAL_COMPARISON)) for path, source in exact.items()}
+        
+        def signatures(files, sizes, matched):
+            result = {}
+            for path, size in sizes.items():
+                if path in matched:
+                    continue
+                # Large files are left alone rather than read whole for a sketch
+                if self.large_file_threshold is not None and size >= self.large_file_threshold:
+                    continue
+                signature = minhash_signature(line_shingles(self.get_file_content(files[path])))
+                if signature is not None:
+                    result[path] = signature
+            return result
+        
+        candidates = find_candidates(
+            signatures(deleted_files, deleted_sizes, set(exact.values())),
+            signatures(added_files, added_sizes, exact)
+        )
+        # Renames are decided by their own threshold, so they need exact similarities
+        with self.exact_similarity():
+            comparisons = self.compare_common_files(
+                [(deleted_files[source], added_files[path]) for _, path, source in candidates]
+            )
+        renames.update(match_similar(candidates, comparisons, self.rename_threshold))
+        
+        if renames:
+            print(f"🔀 Renames: {len(renames)} detected ({len(exact)} exact, "
+                  f"{len(candidates)} candidate pairs diffed)")
+        return renames
+    
+    def manifest_id(self):
+        """Options that must match for manifest results to be reused."""
+        manifest_id = f"{self.algorithm_id};large>={self.large_file_threshold}"
+        if self.similarity_threshold is not None:
+            manifest_id += f";tiered={self.similarity_threshold:g}"
+        return manifest_id
+    
+    def compare_batch_with_manifest(self, filenames, files_v1, files_v2, manifest):
+        """
+        Compare a batch of common files, reusing manifest results for paths that did not change.
+        Only the changed paths are read, hashed, and diffed.
+        """
+        comparisons = {}
+        pending = []
+        for filename in filenames:
+            file1, file2 = files_v1[filename], files_v2[filename]
+            state1, state2 = self.file_state(file1), self.file_state(file2)
+            result = manifest.lookup(
+                filename, state1, state2,
+                partial(self.content_hash, file1), partial(self.content_hash, file2)
+            )
+            if result is None:
+                pending.append((filename, state1, state2))
+            else:
+                # Reused results were not resolved by any tier in this run
+                result.pop("tier", None)
+                comparisons[filename] = result
+        
+        pairs = [(files_v1[filename], files_v2[filename]) for filename, _, _ in pending]
+        for (filename, state1, state2), comparison in zip(pending, self.compare_common_files(pairs)):
+            comparisons[filename] = comparison
+            file1, file2 = files_v1[filename], files_v2[filename]
+            manifest.record(
+                filename, state1, state2, comparison,
+                partial(self.content_hash, file1), partial(self.content_hash, file2)
+            )
+        
+        return [comparisons[filename] for filename in filenames]
+    
+    def iter_common_comparisons(self, common_files, files_v1, files_v2):
+        """
+        Yield the comparison dict of each common file, in order, batch by batch,
+        so results are available before the whole tree has been diffed.
+        """
+        manifest = None
+        if self.manifest_path is not None:
+            manifest = ComparisonManifest(self.manifest_path, self.manifest_id())
+        
+        # Large enough to keep every worker busy, small enough to stream
+        batch_size = self.chunk_size * self.workers * 4
+        with self.worker_pool():
+            for start in range(0, len(common_files), batch_size):
+                batch = common_files[start:start + batch_size]
+                pairs = [(files_v1[f], files_v2[f]) for f in batch]
+                if manifest is not None:
+                    comparisons = self.compare_batch_with_manifest(batch, files_v1, files_v2, manifest)
+                else:
+                    comparisons = self.compare_common_files(pairs)
+                if self.structural:
+                    self.add_symbol_changes(batch, pairs, comparisons)
+                yield from comparisons
+        
+        if manifest is not None:
+            manifest.save()
+            print(f"♻️  Manifest: reused {manifest.reused} results, re-compared {manifest.recompared} files")
+    
+    def worker_options(self):
+        """Constructor options that worker processes need to diff like this instance."""
         return {
-            "similarity": similarity,
-            "added": added,
-            "removed": removed,
-            "changed": changed
+            "algorithm": self.algorithm,
+            "large_file_threshold": self.large_file_threshold,
+            "ignore_patterns": self.ignore_patterns,
+            "use_gitignore": self.use_gitignore,
+            "similarity_threshold": self.similarity_threshold,
+            "normalize": tuple(self.normalize),
+            # A fresh profiler per chunk (None when not profiling)
+            "profiler": self.profiler.child()
         }
     
-    def run_comparison(self):
-        """Run full comparison between two versions."""
+    @contextmanager
+    def worker_pool(self):
+        """Keep one process pool alive for all batches of a run."""
+        if self.workers <= 1 or self._executor is not None:
+            yield self._executor
+            return
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            self._executor = executor
+            try:
+                yield executor
+            finally:
+                self._executor = None
+    
+    def _map_pairs(self, pairs, known_different=False):
+        """Run compare_files (or diff_files) over pairs, serially or on a process pool."""
+        if self.workers <= 1 or len(pairs) <= self.chunk_size:
+            compare = self.diff_files if known_different else self.compare_files
+            return [compare(file1, file2) for file1, file2 in pairs]
+        
+        chunks = [pairs[i:i + self.chunk_size] for i in range(0, len(pairs), self.chunk_size)]
+        comparisons = []
+        with self.worker_pool() as executor:
+            # executor.map yields chunk results in submission order
+            for chunk_result, chunk_profiler in executor.map(
+                _compare_chunk,
+                [self.version1_path] * len(chunks),
+                [self.version2_path] * len(chunks),
+                [self.worker_options()] * len(chunks),
+                chunks,
+                [known_different] * len(chunks)
+            ):
+                comparisons.extend(chunk_result)
+                if chunk_profiler is not None:
+                    self.profiler.merge(chunk_profiler)
+        return comparisons
+    
+    def iter_comparisons(self):
+        """
+        Compare the two versions and yield one FileComparison per file in path order
+        as soon as it is known. Records are not kept; self.results is filled in
+        once the generator is exhausted.
+        """
         print("\n🔍 Starting version comparison...")
         
-        files_v1 = self.get_all_files(self.version1_path)
-        files_v2 = self.get_all_files(self.version2_path)
+        files_v1, files_v2 = align_archive_roots([
+            (self.version1_path, self.list_version_files(self.version1_path)),
+            (self.version2_path, self.list_version_files(self.version2_path))
+        ])
+        
+        all_files = sorted(set(files_v1.keys()) | set(files_v2.keys()))
         
-        all_files = set(files_v1.keys()) | set(files_v2.keys())
+        common_files = [f for f in all_files if f in files_v1 and f in files_v2]
+        
+        renames = {}
+        if self.detect_renames:
+            renames = self.find_renames(
+                {f: files_v1[f] for f in all_files if f not in files_v2},
+                {f: files_v2[f] for f in all_files if f not in files_v1}
+            )
+        if self.structural and renames:
+            paths = list(renames)
+            comparisons = self.add_symbol_changes(
+                paths,
+                [(files_v1[renames[path][0]], files_v2[path]) for path in paths],
+                [renames[path][1] for path in paths]
+            )
+            renames = {path: (renames[path][0], comparison) for path, comparison in zip(paths, comparisons)}
+        renamed_sources = {source for source, _ in renames.values()}
+        
+        common_comparisons = self.iter_common_comparisons(common_files, files_v1, files_v2)
         
         unchanged_count = 0
         modified_count = 0
         added_count = 0
         deleted_count = 0
-        total_lines_v1 = 0
-        total_lines_v2 = 0
+        renamed_count = 0
         total_added = 0
         total_removed = 0
         total_similarity = 0
+        tier_counts = defaultdict(int)
+        below_threshold_count = 0
+        symbol_counts = defaultdict(int)
+        estimated_count = 0
         
-        for filename in sorted(all_files):
+        for filename in all_files:
             if filename in files_v1 and filename in files_v2:
                 # File exists in both versions
-                comparison = self.compare_files(files_v1[filename], files_v2[filename])
+                comparison = next(common_comparisons)
                 
                 if comparison["similarity"] == 100.0:
                     status = "unchanged"
@@ -122,34 +684,72 @@ class VersionComparator:
                 total_similarity += comparison["similarity"]
                 total_added += comparison["added"]
                 total_removed += comparison["removed"]
+                if self.similarity_threshold is not None:
+                    # Identical pairs are settled by their hashes, cached ones by an earlier run
+                    tier_counts[comparison.get("tier") or ("identical" if status == "unchanged" else "reused")] += 1
+                    below_threshold_count += comparison["similarity"] < self.similarity_threshold
+                count_symbols(symbol_counts, comparison)
+                estimated_count += comparison.get("estimated", False)
                 
-                fc = FileComparison(
+                yield FileComparison(
                     filename=filename,
                     status=status,
                     similarity_score=comparison["similarity"],
                     lines_added=comparison["added"],
                     lines_removed=comparison["removed"],
-                    lines_changed=comparison["changed"]
+                    lines_changed=comparison["changed"],
+                    symbols=comparison.get("symbols"),
+                    estimated=comparison.get("estimated", False)
                 )
-                self.file_comparisons.append(fc)
-                
+            
+            elif filename in renamed_sources:
+                # Reported under its new path
+                continue
+            
             elif filename in files_v1:
                 # File deleted in v2
                 deleted_count += 1
-                fc = FileComparison(filename=filename, status="deleted")
-                self.file_comparisons.append(fc)
+                yield FileComparison(filename=filename, status="deleted")
+            
+            elif filename in renames:
+                # File moved or renamed in v2
+                source, comparison = renames[filename]
+                renamed_count += 1
+                total_similarity += comparison["similarity"]
+                total_added += comparison["added"]
+                total_removed += comparison["removed"]
+                if self.similarity_threshold is not None:
+                    below_threshold_count += comparison["similarity"] < self.similarity_threshold
+                count_symbols(symbol_counts, comparison)
+                estimated_count += comparison.get("estimated", False)
                 
+                yield FileComparison(
+                    filename=filename,
+                    status="renamed",
+                    similarity_score=comparison["similarity"],
+                    lines_added=comparison["added"],
+                    lines_removed=comparison["removed"],
+                    lines_changed=comparison["changed"],
+                    old_filename=source,
+                    symbols=comparison.get("symbols"),
+                    estimated=comparison.get("estimated", False)
+                )
+            
             else:
                 # File added in v2
                 added_count += 1
-                fc = FileComparison(filename=filename, status="added")
-                self.file_comparisons.append(fc)
+                yield FileComparison(filename=filename, status="added")
+        
+        # Let the batch generator finish (saves the manifest)
+        for _ in common_comparisons:
+            pass
         
         # Calculate statistics
-        total_files = len(all_files)
+        total_files = len(all_files) - len(renames)
         
-        if modified_count + unchanged_count > 0:
-            avg_similarity = total_similarity / (modified_count + unchanged_count)
+        compared_count = modified_count + unchanged_count + renamed_count
+        if compared_count > 0:
+            avg_similarity = total_similarity / compared_count
         else:
             avg_similarity = 100.0
         
@@ -159,17 +759,47 @@ class VersionComparator:
             "modified_count": modified_count,
             "added_count": added_count,
             "deleted_count": deleted_count,
+            "renamed_count": renamed_count,
             "unchanged_percentage": (unchanged_count / total_files * 100) if total_files > 0 else 0,
             "modified_percentage": (modified_count / total_files * 100) if total_files > 0 else 0,
             "added_percentage": (added_count / total_files * 100) if total_files > 0 else 0,
             "deleted_percentage": (deleted_count / total_files * 100) if total_files > 0 else 0,
+            "renamed_percentage": (renamed_count / total_files * 100) if total_files > 0 else 0,
             "average_similarity": avg_similarity,
             "total_lines_added": total_added,
             "total_lines_removed": total_removed,
             "code_change_percentage": 100 - avg_similarity if total_files > 0 else 0
         }
         
+        if self.similarity_threshold is not None:
+            tiers = {tier: tier_counts[tier] for tier in ("identical", "reused") + SIMILARITY_TIERS}
+            self.results["similarity_threshold"] = self.similarity_threshold
+            self.results["below_threshold_count"] = below_threshold_count
+            self.results["similarity_tiers"] = tiers
+            print("🎚️  Similarity tiers: " + ", ".join(f"{tier} {count}" for tier, count in tiers.items()))
+        
+        if self.structural:
+            self.results["symbol_changes"] = {
+                kind: symbol_counts[kind] for kind in ("files", "added", "removed", "modified")
+            }
+            print(f"🧬 Symbols: {symbol_counts['modified']} modified, {symbol_counts['added']} added, "
+                  f"{symbol_counts['removed']} removed in {symbol_counts['files']} Python files")
+        
+        if estimated_count:
+            self.results["estimated_count"] = estimated_count
+            print(f"📐 Similarity of {estimated_count} large files estimated by anchored alignment")
+        
+        if self.cache is not None:
+            cache_stats = self.cache.stats()
+            print(f"💾 Cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+        
         print("✅ Comparison completed")
+    
+    def run_comparison(self):
+        """Run full comparison between two versions."""
+        # Imported here because the store builds on FileComparison from this module
+        from comparison_store import FileComparisonStore
+        self.file_comparisons = FileComparisonStore(self.iter_comparisons())
         return self.results
     
     def get_summary(self):
@@ -188,6 +818,7 @@ class VersionComparator:
   • Modified: {self.results['modified_count']} ({self.results['modified_percentage']:.1f}%)
   • Added: {self.results['added_count']} ({self.results['added_percentage']:.1f}%)
   • Deleted: {self.results['deleted_count']} ({self.results['deleted_percentage']:.1f}%)
+  • Renamed: {self.results.get('renamed_count', 0)} ({self.results.get('renamed_percentage', 0):.1f}%)
 
 📈 CODE ANALYSIS:
   • Average Code Similarity: {self.results['average_similarity']:.1f}%
@@ -201,8 +832,17 @@ class VersionComparator:
   • New Test Cases Needed: {self.results['added_count']} new files
   • Deprecated Features: {self.results['deleted_count']} deleted files
 """
+        if "similarity_threshold" in self.results:
+            summary += (f"  • Below {self.results['similarity_threshold']:g}% Similarity: "
+                        f"{self.results['below_threshold_count']} files\n")
+        if "symbol_changes" in self.results:
+            symbol_changes = self.results["symbol_changes"]
+            summary += (f"  • Functions/Classes: {symbol_changes['modified']} modified, "
+                        f"{symbol_changes['added']} added, {symbol_changes['removed']} removed\n")
         return summary
     
     def get_modified_files(self):
         """Get list of all modified files that testers should focus on."""
-        return [fc for fc in self.file_comparisons if fc.status in ["modified", "added", "deleted"]]
+        if hasattr(self.file_comparisons, "with_status"):
+            return self.file_comparisons.with_status("modified", "added", "deleted", "renamed")
+        return [fc for fc in self.file_comparisons if fc.status in ["modified", "added", "deleted", "renamed"]]
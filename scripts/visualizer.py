@@ -1,141 +1,248 @@
 """
 Creates visual representations of comparison results.
 Generates charts and graphs for better understanding of changes.
+
+Charts are drawn headless with matplotlib's object-oriented Figure API (no
+pyplot state machine), so matplotlib is only imported by the process that
+actually renders a chart.
 """
 
-import matplotlib.pyplot as plt
+import hashlib
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+IMAGE_FORMATS = {"png", "svg"}
+STAMP_FILENAME = ".chart_stamps.json"
+
+def _label_bars(ax, bars, labels, fontsize):
+    for bar, label in zip(bars, labels):
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height,
+                label, ha='center', va='bottom', fontsize=fontsize, fontweight='bold')
+
+def draw_file_status_pie_chart(fig, results):
+    """Pie chart showing file status distribution."""
+    labels = ['Unchanged', 'Modified', 'Added', 'Deleted']
+    sizes = [
+        results['unchanged_count'],
+        results['modified_count'],
+        results['added_count'],
+        results['deleted_count']
+    ]
+    colors = ['#2ecc71', '#f39c12', '#3498db', '#e74c3c']
+    explode = (0, 0.1, 0, 0)
+    if results['renamed_count']:
+        labels.append('Renamed')
+        sizes.append(results['renamed_count'])
+        colors.append('#9b59b6')
+        explode += (0,)
+    
+    ax = fig.subplots()
+    ax.pie(sizes, explode=explode, labels=labels, colors=colors, autopct='%1.1f%%',
+           shadow=True, startangle=90, textprops={'fontsize': 12})
+    ax.set_title('File Status Distribution\n(Unchanged vs Modified vs Added vs Deleted)',
+                 fontsize=14, fontweight='bold')
+
+def draw_code_similarity_bar_chart(fig, results):
+    """Bar chart showing code similarity metrics."""
+    metrics = ['Similarity', 'Changes']
+    percentages = [
+        results['average_similarity'],
+        results['code_change_percentage']
+    ]
+    colors = ['#2ecc71', '#e74c3c']
+    
+    ax = fig.subplots()
+    bars = ax.bar(metrics, percentages, color=colors, alpha=0.7, edgecolor='black', linewidth=2)
+    _label_bars(ax, bars, [f'{pct:.1f}%' for pct in percentages], 14)
+    
+    ax.set_ylabel('Percentage (%)', fontsize=12)
+    ax.set_title('Code Similarity vs Changes\n(Average across all files)',
+                 fontsize=14, fontweight='bold')
+    ax.set_ylim(0, 105)
+    ax.grid(axis='y', alpha=0.3)
+
+def draw_testing_focus_chart(fig, results):
+    """Chart showing testing focus distribution."""
+    categories = ['Skip Testing\n(Unchanged)', 'Focus Testing\n(Modified)',
+                  'New Tests\n(Added)', 'Update Tests\n(Deleted)']
+    percentages = [
+        results['unchanged_percentage'],
+        results['modified_percentage'],
+        results['added_percentage'],
+        results['deleted_percentage']
+    ]
+    colors = ['#95a5a6', '#e74c3c', '#3498db', '#e67e22']
+    
+    ax = fig.subplots()
+    bars = ax.bar(categories, percentages, color=colors, alpha=0.8, edgecolor='black', linewidth=2)
+    _label_bars(ax, bars, [f'{pct:.1f}%' for pct in percentages], 12)
+    
+    ax.set_ylabel('Percentage of Files (%)', fontsize=12)
+    ax.set_title('Testing Effort Distribution Guide', fontsize=14, fontweight='bold')
+    ax.set_ylim(0, max(percentages) + 10)
+    ax.grid(axis='y', alpha=0.3)
+
+def draw_line_changes_summary(fig, results):
+    """Chart showing line additions and deletions."""
+    metrics = ['Lines Added', 'Lines Removed']
+    values = [
+        results['total_lines_added'],
+        results['total_lines_removed']
+    ]
+    colors = ['#3498db', '#e74c3c']
+    
+    ax = fig.subplots()
+    bars = ax.bar(metrics, values, color=colors, alpha=0.7, edgecolor='black', linewidth=2)
+    _label_bars(ax, bars, [f'{int(val)}' for val in values], 14)
+    
+    ax.set_ylabel('Number of Lines', fontsize=12)
+    ax.set_title('Code Line Changes Summary', fontsize=14, fontweight='bold')
+    ax.grid(axis='y', alpha=0.3)
+
+# name -> (file stem, figure size, draw function, result keys it reads, label)
+CHARTS = {
+    "file_distribution": (
+        "file_status_distribution", (10, 8), draw_file_status_pie_chart,
+        ("unchanged_count", "modified_count", "added_count", "deleted_count", "renamed_count"),
+        "Pie chart"
+    ),
+    "code_similarity": (
+        "code_similarity_metric", (10, 6), draw_code_similarity_bar_chart,
+        ("average_similarity", "code_change_percentage"),
+        "Bar chart"
+    ),
+    "testing_focus": (
+        "testing_focus_distribution", (12, 6), draw_testing_focus_chart,
+        ("unchanged_percentage", "modified_percentage", "added_percentage", "deleted_percentage"),
+        "Testing focus chart"
+    ),
+    "line_changes": (
+        "line_changes_summary", (10, 6), draw_line_changes_summary,
+        ("total_lines_added", "total_lines_removed"),
+        "Line changes chart"
+    )
+}
+
+def render_chart(name, results, output_path, dpi, image_format):
+    """Draw one chart and save it; runs in worker processes, so it takes plain arguments."""
+    from matplotlib.figure import Figure
+    
+    _, figsize, draw, _, _ = CHARTS[name]
+    fig = Figure(figsize=figsize, tight_layout=True)
+    draw(fig, results)
+    fig.savefig(output_path, dpi=dpi, format=image_format)
+    return str(output_path)
+
 class VisualizationGenerator:
-    def __init__(self, comparison_results):
+    def __init__(self, comparison_results, output_dir="reports/visualizations",
+                 image_format="png", dpi=100, workers=None):
+        """
+        Args:
+            comparison_results: Summary dict from VersionComparator
+            output_dir: Directory the charts are written to
+            image_format: "png" or "svg"
+            dpi: Resolution of PNG charts
+            workers: Processes to render charts on (None = one per CPU, 1 = in-process)
+        """
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Unknown image format {image_format!r}; expected one of {sorted(IMAGE_FORMATS)}")
+        
         self.results = comparison_results
-        self.output_dir = Path("reports/visualizations")
+        self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.image_format = image_format
+        self.dpi = dpi
+        self.workers = workers
+    
+    def chart_path(self, name):
+        return self.output_dir / f"{CHARTS[name][0]}.{self.image_format}"
+    
+    def chart_inputs(self, name):
+        """The numbers a chart is drawn from (0 for keys that older results lack)."""
+        return {key: self.results.get(key, 0) for key in CHARTS[name][3]}
+    
+    def chart_stamp(self, name):
+        """Fingerprint of everything that affects a chart's output file."""
+        data = json.dumps([self.chart_inputs(name), self.dpi, self.image_format], sort_keys=True)
+        return hashlib.blake2b(data.encode(), digest_size=16).hexdigest()
+    
+    def load_stamps(self):
+        try:
+            with open(self.output_dir / STAMP_FILENAME, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def save_stamps(self, stamps):
+        with open(self.output_dir / STAMP_FILENAME, 'w') as f:
+            json.dump(stamps, f, indent=2)
+    
+    def generate_chart(self, name, force=False):
+        """Render a single chart on demand."""
+        return self.generate_all_visualizations(charts=[name], force=force)[name]
     
     def generate_file_status_pie_chart(self):
         """Generate pie chart showing file status distribution."""
-        labels = ['Unchanged', 'Modified', 'Added', 'Deleted']
-        sizes = [
-            self.results['unchanged_count'],
-            self.results['modified_count'],
-            self.results['added_count'],
-            self.results['deleted_count']
-        ]
-        colors = ['#2ecc71', '#f39c12', '#3498db', '#e74c3c']
-        explode = (0, 0.1, 0, 0)
-        
-        plt.figure(figsize=(10, 8))
-        plt.pie(sizes, explode=explode, labels=labels, colors=colors, autopct='%1.1f%%',
-                shadow=True, startangle=90, textprops={'fontsize': 12})
-        plt.title('File Status Distribution\n(Unchanged vs Modified vs Added vs Deleted)', 
-                 fontsize=14, fontweight='bold')
-        plt.tight_layout()
-        
-        output_path = self.output_dir / "file_status_distribution.png"
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        print(f"✅ Pie chart saved to {output_path}")
-        plt.close()
-        return str(output_path)
+        return self.generate_chart("file_distribution")
     
     def generate_code_similarity_bar_chart(self):
         """Generate bar chart showing code similarity metrics."""
-        metrics = ['Similarity', 'Changes']
-        percentages = [
-            self.results['average_similarity'],
-            self.results['code_change_percentage']
-        ]
-        colors = ['#2ecc71', '#e74c3c']
-        
-        plt.figure(figsize=(10, 6))
-        bars = plt.bar(metrics, percentages, color=colors, alpha=0.7, edgecolor='black', linewidth=2)
-        
-        # Add value labels on bars
-        for bar, pct in zip(bars, percentages):
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{pct:.1f}%', ha='center', va='bottom', fontsize=14, fontweight='bold')
-        
-        plt.ylabel('Percentage (%)', fontsize=12)
-        plt.title('Code Similarity vs Changes\n(Average across all files)', 
-                 fontsize=14, fontweight='bold')
-        plt.ylim(0, 105)
-        plt.grid(axis='y', alpha=0.3)
-        plt.tight_layout()
-        
-        output_path = self.output_dir / "code_similarity_metric.png"
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        print(f"✅ Bar chart saved to {output_path}")
-        plt.close()
-        return str(output_path)
+        return self.generate_chart("code_similarity")
     
     def generate_testing_focus_chart(self):
         """Generate chart showing testing focus distribution."""
-        categories = ['Skip Testing\n(Unchanged)', 'Focus Testing\n(Modified)', 
-                     'New Tests\n(Added)', 'Update Tests\n(Deleted)']
-        percentages = [
-            self.results['unchanged_percentage'],
-            self.results['modified_percentage'],
-            self.results['added_percentage'],
-            self.results['deleted_percentage']
-        ]
-        colors = ['#95a5a6', '#e74c3c', '#3498db', '#e67e22']
-        
-        plt.figure(figsize=(12, 6))
-        bars = plt.bar(categories, percentages, color=colors, alpha=0.8, edgecolor='black', linewidth=2)
-        
-        for bar, pct in zip(bars, percentages):
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{pct:.1f}%', ha='center', va='bottom', fontsize=12, fontweight='bold')
-        
-        plt.ylabel('Percentage of Files (%)', fontsize=12)
-        plt.title('Testing Effort Distribution Guide', fontsize=14, fontweight='bold')
-        plt.ylim(0, max(percentages) + 10)
-        plt.grid(axis='y', alpha=0.3)
-        plt.tight_layout()
-        
-        output_path = self.output_dir / "testing_focus_distribution.png"
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        print(f"✅ Testing focus chart saved to {output_path}")
-        plt.close()
-        return str(output_path)
+        return self.generate_chart("testing_focus")
     
     def generate_line_changes_summary(self):
         """Generate chart showing line additions and deletions."""
-        metrics = ['Lines Added', 'Lines Removed']
-        values = [
-            self.results['total_lines_added'],
-            self.results['total_lines_removed']
-        ]
-        colors = ['#3498db', '#e74c3c']
+        return self.generate_chart("line_changes")
+    
+    def generate_all_visualizations(self, charts=None, force=False):
+        """
+        Generate visualization charts, skipping any whose inputs are unchanged
+        since the last run and whose file still exists.
         
-        plt.figure(figsize=(10, 6))
-        bars = plt.bar(metrics, values, color=colors, alpha=0.7, edgecolor='black', linewidth=2)
+        Args:
+            charts: Names from CHARTS to render (default: all)
+            force: Re-render even when a chart looks up to date
         
-        for bar, val in zip(bars, values):
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{int(val)}', ha='center', va='bottom', fontsize=14, fontweight='bold')
+        Returns:
+            Dict mapping chart name -> output path
+        """
+        print("\n📊 Generating visualizations...")
+        names = list(CHARTS) if charts is None else list(charts)
+        for name in names:
+            if name not in CHARTS:
+                raise ValueError(f"Unknown chart {name!r}; expected one of {sorted(CHARTS)}")
         
-        plt.ylabel('Number of Lines', fontsize=12)
-        plt.title('Code Line Changes Summary', fontsize=14, fontweight='bold')
-        plt.grid(axis='y', alpha=0.3)
-        plt.tight_layout()
+        stamps = self.load_stamps()
+        pending = []
+        for name in names:
+            stamp = self.chart_stamp(name)
+            if not force and stamps.get(name) == stamp and self.chart_path(name).exists():
+                print(f"⏭️  {CHARTS[name][4]} unchanged, kept {self.chart_path(name)}")
+                continue
+            stamps[name] = stamp
+            pending.append(name)
         
-        output_path = self.output_dir / "line_changes_summary.png"
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        print(f"✅ Line changes chart saved to {output_path}")
-        plt.close()
-        return str(output_path)
-    
-    def generate_all_visualizations(self):
-        """Generate all visualization charts."""
-        print("\n📊 Generating visualizations...")
-        charts = {
-            "file_distribution": self.generate_file_status_pie_chart(),
-            "code_similarity": self.generate_code_similarity_bar_chart(),
-            "testing_focus": self.generate_testing_focus_chart(),
-            "line_changes": self.generate_line_changes_summary()
-        }
-        return charts
+        jobs = [(name, self.chart_inputs(name), self.chart_path(name), self.dpi, self.image_format)
+                for name in pending]
+        workers = (os.cpu_count() or 1) if self.workers is None else self.workers
+        workers = min(workers, len(jobs))
+        if workers > 1:
+            # Load matplotlib once here so forked workers inherit it instead of each importing it
+            import matplotlib.figure
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(render_chart, *job) for job in jobs]
+                for name, future in zip(pending, futures):
+                    print(f"✅ {CHARTS[name][4]} saved to {future.result()}")
+        else:
+            for job in jobs:
+                print(f"✅ {CHARTS[job[0]][4]} saved to {render_chart(*job)}")
+        
+        if pending:
+            self.save_stamps(stamps)
+        return {name: str(self.chart_path(name)) for name in names}